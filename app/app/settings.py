@@ -11,11 +11,14 @@ https://docs.djangoproject.com/en/4.0/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+TESTING = sys.argv[1:2] == ["test"]
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.0/howto/deployment/checklist/
@@ -46,6 +49,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.ServerTimingMiddleware",
+    "core.middleware.ReplicaStickinessMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -80,16 +85,99 @@ WSGI_APPLICATION = "app.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.0/ref/settings/#databases
 
+# Connections come from a per-process pool (core/db/backends/pooled) and are
+# handed back at the end of each request.
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "core.db.backends.pooled",
         "HOST": os.environ.get("DB_HOST"),
         "NAME": os.environ.get("DB_NAME"),
         "USER": os.environ.get("DB_USER"),
         "PASSWORD": os.environ.get("DB_PASS"),
+        "POOL": {
+            "MIN_SIZE": int(os.environ.get("DB_POOL_MIN_SIZE", 2)),
+            "MAX_SIZE": int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+            # Seconds to wait for a free connection when all are in use
+            "TIMEOUT": float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+            # Seconds after which a connection is closed and replaced
+            "MAX_AGE": float(os.environ.get("DB_POOL_MAX_AGE", 3600)),
+            # Seconds a connection may sit idle before it is checked with
+            # SELECT 1 on its way out of the pool
+            "HEALTH_CHECK_INTERVAL": float(
+                os.environ.get("DB_POOL_HEALTH_CHECK_INTERVAL", 10)
+            ),
+        },
     }
 }
 
+# Read replicas, as a comma-separated list of hosts in DB_REPLICA_HOSTS with
+# the primary's database name and credentials. Reads go to the replicas (see
+# core/db/routers.py) except for clients that wrote within the last
+# REPLICA_STICKY_SECONDS, which read from the primary.
+
+DATABASE_ROUTERS = ["core.db.routers.ReplicaRouter"]
+DATABASE_REPLICAS = []
+REPLICA_STICKY_SECONDS = float(os.environ.get("DB_REPLICA_STICKY_SECONDS", 5))
+
+if TESTING:
+    # A separate database for the router tests to route reads to
+    DATABASES["replica"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "replica.sqlite3",
+    }
+else:
+    replica_hosts = os.environ.get("DB_REPLICA_HOSTS", "").split(",")
+    for number, host in enumerate(filter(None, replica_hosts), start=1):
+        DATABASES[f"replica{number}"] = {**DATABASES["default"], "HOST": host}
+        DATABASE_REPLICAS.append(f"replica{number}")
+
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+# Outside DEBUG, point CACHE_BACKEND and CACHE_LOCATION at a cache shared
+# between worker processes. Cached recipe responses need Redis or memcached
+# (the recipe.E002 system check rejects other backends), as invalidating
+# them relies on atomic increments.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", "recipe-api"),
+    }
+}
+
+RECIPE_CACHE_ALIAS = "default"
+RECIPE_CACHE_RESPONSES = True
+
+# Serve recipe list and detail reads from values() rows instead of the
+# serializers (see recipe/rows.py)
+RECIPE_FAST_READS = True
+
+# Requests slower than this are logged with their SQL by
+# core.middleware.ServerTimingMiddleware
+SLOW_REQUEST_THRESHOLD_MS = int(os.environ.get("SLOW_REQUEST_THRESHOLD_MS", 500))
+
+# Keep the per-request log lines out of the test runner's output
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "core.timing": {
+            "handlers": ["console"],
+            "level": os.environ.get(
+                "REQUEST_LOG_LEVEL", "ERROR" if TESTING else "INFO"
+            ),
+            "propagate": False,
+        },
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
@@ -130,6 +218,21 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Uploaded and generated files, such as the exports written by jobs
+MEDIA_URL = "media/"
+MEDIA_ROOT = Path(os.environ.get("MEDIA_ROOT", BASE_DIR / "media"))
+
+# Recipe images (see recipe/images.py): thumbnails are rendered to fit in
+# squares of these sizes, by RECIPE_IMAGE_PROCESSES processes per worker
+# (default: one per CPU)
+RECIPE_IMAGE_SIZES = {"small": 160, "medium": 480, "large": 1200}
+RECIPE_IMAGE_MAX_BYTES = int(os.environ.get("RECIPE_IMAGE_MAX_BYTES", 10 * 1024 * 1024))
+RECIPE_IMAGE_PROCESSES = (
+    int(os.environ["RECIPE_IMAGE_PROCESSES"])
+    if os.environ.get("RECIPE_IMAGE_PROCESSES")
+    else None
+)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.0/ref/settings/#default-auto-field
 
@@ -138,8 +241,53 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_PAGINATION_CLASS": "recipe.pagination.IdCursorPagination",
+    "PAGE_SIZE": 50,
+    "DEFAULT_RENDERER_CLASSES": [
+        "recipe.renderers.ORJSONRenderer",
+        "recipe.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "recipe.parsers.ORJSONParser",
+        "recipe.parsers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+    # Token buckets per client, scope and action (see recipe/throttling.py).
+    # Off in tests, which would otherwise share one client's budget.
+    "DEFAULT_THROTTLE_CLASSES": ["recipe.throttling.TokenBucketThrottle"],
+    # Proxies in front of the API whose X-Forwarded-For entries are trusted
+    # to identify clients; with 0 clients are identified by their address
+    "NUM_PROXIES": int(os.environ.get("NUM_PROXIES", 0)),
+    "DEFAULT_THROTTLE_RATES": {}
+    if TESTING
+    else {
+        "read": os.environ.get("THROTTLE_READ_RATE", "1200/min"),
+        "write": os.environ.get("THROTTLE_WRITE_RATE", "120/min"),
+        # Creating recipes resolves every ingredient name, and bulk requests
+        # carry many recipes
+        "write:recipe.create": os.environ.get("THROTTLE_CREATE_RATE", "60/min"),
+        "write:recipe.bulk": os.environ.get("THROTTLE_BULK_RATE", "10/min"),
+    },
 }
 
+# Where the precomputed OpenAPI schema is kept (see core/schema.py); a
+# temporary directory by default. SCHEMA_CODE_HASH, e.g. a commit id, may
+# stand in for the hash of the code the schema is keyed by.
+SCHEMA_CACHE_DIR = os.environ.get("SCHEMA_CACHE_DIR")
+SCHEMA_CODE_HASH = os.environ.get("SCHEMA_CODE_HASH")
+
+# Background jobs (see recipe/jobs.py): a job still running after
+# JOB_TIMEOUT seconds is queued again, up to JOB_MAX_ATTEMPTS times
+JOB_TIMEOUT = int(os.environ.get("JOB_TIMEOUT", 1800))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 3))
+
+# Cache holding the throttling buckets. It must be shared between workers
+# (see CACHE_BACKEND above) for limits to hold across processes; outside
+# DEBUG a per-process cache fails the recipe.E001 system check.
+THROTTLE_CACHE_ALIAS = "default"
+
 CORS_ALLOWED_ORIGINS = ["http://localhost:3000"]
 
 CORS_ALLOW_ALL_ORIGINS = True
@@ -161,8 +309,12 @@ CORS_ALLOW_HEADERS = [
     "authorization",
     "content-type",
     "dnt",
+    "if-match",
+    "if-none-match",
     "origin",
     "user-agent",
     "x-csrftoken",
     "x-requested-with",
 ]
+
+CORS_EXPOSE_HEADERS = ["etag"]
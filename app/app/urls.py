@@ -13,22 +13,24 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularSwaggerView,
-    SpectacularJSONAPIView,
+from core.views import (
+    JSONSchemaView,
+    SchemaView,
+    docs_view,
+    media_view,
+    metrics_view,
 )
 
 urlpatterns = [
-    path("api/schema/", SpectacularAPIView.as_view(), name="api-schema"),
-    path("api/json/", SpectacularJSONAPIView.as_view(), name="api-json"),
-    path(
-        "api/docs/",
-        SpectacularSwaggerView.as_view(url_name="api-schema"),
-        name="api-docs",
-    ),
+    # Precomputed schema, see core/schema.py
+    path("api/schema/", SchemaView.as_view(), name="api-schema"),
+    path("api/json/", JSONSchemaView.as_view(), name="api-json"),
+    path("api/docs/", docs_view, name="api-docs"),
     path("admin/", admin.site.urls),
     path("api/recipe/", include("recipe.urls")),
+    path("metrics", metrics_view, name="metrics"),
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:path>", media_view, name="media"),
 ]
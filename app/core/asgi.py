@@ -0,0 +1,55 @@
+"""
+ASGI handler for the project
+"""
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+
+_DONE = object()
+
+
+def _headers(response):
+    """Encode the headers and cookies of a response as ASGI does"""
+    headers = []
+    for header, value in response.items():
+        if isinstance(header, str):
+            header = header.encode("ascii")
+        if isinstance(value, str):
+            value = value.encode("latin1")
+        headers.append((bytes(header), bytes(value)))
+    for cookie in response.cookies.values():
+        headers.append(
+            (b"Set-Cookie", cookie.output(header="").encode("ascii").strip())
+        )
+    return headers
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """
+    Django's ASGI handler, reading streaming responses in a worker thread.
+
+    Django 4.0 iterates them on the event loop, where a generator querying
+    the database (such as the recipe export) raises SynchronousOnlyOperation.
+    Each part is read in the request's thread instead, like the view itself.
+    """
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": _headers(response),
+            }
+        )
+        parts = iter(response)
+        read = sync_to_async(next, thread_sensitive=True)
+        while True:
+            part = await read(parts, _DONE)
+            if part is _DONE:
+                break
+            for chunk, _ in self.chunk_bytes(part):
+                await send(
+                    {"type": "http.response.body", "body": chunk, "more_body": True}
+                )
+        await send({"type": "http.response.body"})
@@ -0,0 +1,37 @@
+"""
+PostgreSQL backend that takes its connections from a pool
+"""
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base
+
+from core.db.backends.pooled import pool
+from core.db.backends.pooled.creation import DatabaseCreation
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    _pool = None
+
+    def get_new_connection(self, conn_params):
+        if self.alias == NO_DB_ALIAS:
+            # Maintenance connections to the "postgres" database
+            return super().get_new_connection(conn_params)
+        self._pool = pool.get_pool(
+            self.alias, conn_params, self.settings_dict.get("POOL")
+        )
+        connection = self._pool.acquire(
+            lambda: super(DatabaseWrapper, self).get_new_connection(conn_params)
+        )
+        self.isolation_level = self.settings_dict["OPTIONS"].get(
+            "isolation_level", connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        if self._pool is None or self.connection is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            # Inside an atomic block Django keeps referring to the closed
+            # connection, so it must not be handed to anyone else
+            self._pool.release(self.connection, discard=self.in_atomic_block)
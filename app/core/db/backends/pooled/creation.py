@@ -0,0 +1,23 @@
+from django.db.backends.postgresql import creation
+
+from core.db.backends.pooled import pool
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    """
+    Close idle pooled connections before creating, cloning or dropping a
+    test database, which PostgreSQL refuses while others are connected to
+    it (or to the template it is copied from).
+    """
+
+    def _create_test_db(self, verbosity, autoclobber, keepdb=False):
+        pool.close_all()
+        return super()._create_test_db(verbosity, autoclobber, keepdb)
+
+    def _clone_test_db(self, suffix, verbosity, keepdb=False):
+        pool.close_all()
+        super()._clone_test_db(suffix, verbosity, keepdb)
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        pool.close_all()
+        super()._destroy_test_db(test_database_name, verbosity)
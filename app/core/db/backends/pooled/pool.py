@@ -0,0 +1,268 @@
+"""
+Thread-safe pool of psycopg2 connections
+"""
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+
+DEFAULT_MIN_SIZE = 0
+DEFAULT_MAX_SIZE = 10
+DEFAULT_TIMEOUT = 30
+DEFAULT_MAX_AGE = 3600
+DEFAULT_HEALTH_CHECK_INTERVAL = 10
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """Raised when no connection became free within the pool's timeout"""
+
+
+class _Entry:
+    def __init__(self, connection):
+        self.connection = connection
+        self.created = self.last_used = time.monotonic()
+
+
+class ConnectionPool:
+    """
+    Pool of at most `max_size` open connections, keeping at least `min_size`
+    of them open once used.
+
+    `acquire(connect)` returns an idle connection, opens one with `connect()`
+    if the pool isn't full, or waits up to `timeout` seconds for one to be
+    released. Connections idle for more than `health_check_interval` seconds
+    are checked with `SELECT 1` before being handed out, and connections
+    older than `max_age` seconds are closed instead of being reused.
+    """
+
+    def __init__(
+        self,
+        min_size=DEFAULT_MIN_SIZE,
+        max_size=DEFAULT_MAX_SIZE,
+        timeout=DEFAULT_TIMEOUT,
+        max_age=DEFAULT_MAX_AGE,
+        health_check_interval=DEFAULT_HEALTH_CHECK_INTERVAL,
+        alias=None,
+        database=None,
+    ):
+        if max_size < 1 or min_size > max_size:
+            raise ValueError("pool sizes must satisfy 0 <= min_size <= max_size")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_age = max_age
+        self.health_check_interval = health_check_interval
+        self.alias = alias
+        self.database = database
+        self._condition = threading.Condition()
+        self._idle = deque()
+        self._in_use = {}
+        self._size = 0
+        self._waiting = 0
+        self._counters = dict.fromkeys(
+            ["connects", "acquires", "timeouts", "recycled", "discarded"], 0
+        )
+
+    def acquire(self, connect):
+        """Return a connection for exclusive use until `release`"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            entry = self._take(deadline)
+            if entry is None:
+                entry = self._open(connect)
+            elif not self._reusable(entry):
+                self._close(entry)
+                continue
+            break
+
+        with self._condition:
+            self._in_use[id(entry.connection)] = entry
+        self._count("acquires")
+        self._fill(connect)
+        return entry.connection
+
+    def release(self, connection, discard=False):
+        """
+        Give back a connection, rolling back any open transaction, or close
+        it if `discard`
+        """
+        with self._condition:
+            entry = self._in_use.pop(id(connection))
+        entry.last_used = time.monotonic()
+        if discard:
+            self._count("discarded")
+            self._close(entry)
+        elif self._expired(entry):
+            self._count("recycled")
+            self._close(entry)
+        elif not self._reset(connection):
+            self._count("discarded")
+            self._close(entry)
+        else:
+            with self._condition:
+                self._idle.append(entry)
+                self._condition.notify()
+
+    def close(self):
+        """Close every idle connection; those in use close when released"""
+        with self._condition:
+            idle, self._idle = self._idle, deque()
+        for entry in idle:
+            self._close(entry)
+
+    def stats(self):
+        """Return the pool's size and usage counters"""
+        with self._condition:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "waiting": self._waiting,
+                **self._counters,
+            }
+
+    def _take(self, deadline):
+        """
+        Return an idle entry, or None after reserving room for a new
+        connection
+        """
+        with self._condition:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters["timeouts"] += 1
+                    raise PoolTimeout(
+                        f"no database connection became free within "
+                        f"{self.timeout}s (pool of {self.max_size})"
+                    )
+                self._waiting += 1
+                try:
+                    self._condition.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+    def _open(self, connect):
+        # Room for the connection is already reserved in _size
+        try:
+            connection = connect()
+        except BaseException:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        self._count("connects")
+        return _Entry(connection)
+
+    def _fill(self, connect):
+        """Open idle connections until the pool holds `min_size`"""
+        while True:
+            with self._condition:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            entry = self._open(connect)
+            with self._condition:
+                self._idle.appendleft(entry)
+                self._condition.notify()
+
+    def _close(self, entry):
+        try:
+            entry.connection.close()
+        except psycopg2.Error:
+            pass
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def _count(self, name):
+        with self._condition:
+            self._counters[name] += 1
+
+    def _expired(self, entry):
+        return (
+            self.max_age is not None
+            and time.monotonic() - entry.created >= self.max_age
+        )
+
+    def _reusable(self, entry):
+        if entry.connection.closed:
+            self._count("discarded")
+            return False
+        if self._expired(entry):
+            self._count("recycled")
+            return False
+        if time.monotonic() - entry.last_used < self.health_check_interval:
+            return True
+        try:
+            with entry.connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            return self._reset(entry.connection)
+        except psycopg2.Error:
+            self._count("discarded")
+            return False
+
+    def _reset(self, connection):
+        """Leave the connection outside any transaction, if it still works"""
+        if connection.closed:
+            return False
+        status = connection.info.transaction_status
+        if status == extensions.TRANSACTION_STATUS_IDLE:
+            return True
+        if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        try:
+            connection.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, conn_params, options=None):
+    """
+    Return the pool for connections made with `conn_params`, creating it
+    the first time from `options`, the database's POOL setting, which may
+    hold MIN_SIZE, MAX_SIZE, TIMEOUT, MAX_AGE and HEALTH_CHECK_INTERVAL
+    (see ConnectionPool).
+    """
+    key = (alias, tuple(sorted((k, repr(v)) for k, v in conn_params.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            options = options or {}
+            pool = _pools[key] = ConnectionPool(
+                min_size=options.get("MIN_SIZE", DEFAULT_MIN_SIZE),
+                max_size=options.get("MAX_SIZE", DEFAULT_MAX_SIZE),
+                timeout=options.get("TIMEOUT", DEFAULT_TIMEOUT),
+                max_age=options.get("MAX_AGE", DEFAULT_MAX_AGE),
+                health_check_interval=options.get(
+                    "HEALTH_CHECK_INTERVAL", DEFAULT_HEALTH_CHECK_INTERVAL
+                ),
+                alias=alias,
+                database=conn_params.get("database"),
+            )
+        return pool
+
+
+def pools():
+    """Return every pool of this process"""
+    with _pools_lock:
+        return list(_pools.values())
+
+
+def close_all():
+    """Close the idle connections of every pool"""
+    for pool in pools():
+        pool.close()
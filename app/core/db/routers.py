@@ -0,0 +1,81 @@
+"""
+Route reads to read replicas and writes to the primary database
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PRIMARY = DEFAULT_DB_ALIAS
+
+
+class RoutingState:
+    """How the current request (or other unit of work) is routed"""
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+        self.replica = None
+
+
+_state = contextvars.ContextVar("replica_routing", default=None)
+
+
+def activate(pinned=False):
+    """Start routing a new request, pinned to the primary or not"""
+    return _state.set(RoutingState(pinned))
+
+
+def deactivate(token):
+    _state.reset(token)
+
+
+def current():
+    return _state.get()
+
+
+@contextmanager
+def use_primary():
+    """Send every read in the block to the primary"""
+    token = activate(pinned=True)
+    try:
+        yield
+    finally:
+        deactivate(token)
+
+
+def read_replica():
+    """Return whether the current request has read from a replica"""
+    state = current()
+    return state is not None and state.replica is not None
+
+
+def replicas():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+class ReplicaRouter:
+    """Database router for `DATABASE_REPLICAS`"""
+
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if not aliases or connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        state = current()
+        if state is None or state.pinned or state.wrote:
+            return PRIMARY
+        if state.replica not in aliases:
+            state.replica = random.choice(aliases)
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = current()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every database is the primary or a copy of it
+        return True
@@ -0,0 +1,86 @@
+"""
+Django command to benchmark the recipe API against a throwaway database
+"""
+import json
+import platform
+import subprocess
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from recipe import benchmark
+
+
+class Command(BaseCommand):
+    """Django command to seed a test database and time every endpoint"""
+
+    help = (
+        "Seed a test database with generated recipes, time every recipe and "
+        "ingredient endpoint and print latency percentiles, throughput and "
+        "query counts as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=1000)
+        parser.add_argument("--ingredients-per-recipe", type=int, default=5)
+        parser.add_argument("--iterations", type=int, default=100)
+        parser.add_argument("--warmup", type=int, default=10)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--only",
+            nargs="+",
+            help="Only run scenarios whose names start with these prefixes",
+        )
+        parser.add_argument(
+            "--cache",
+            action="store_true",
+            help="Leave the recipe response cache on",
+        )
+        parser.add_argument("--output", help="File to write the JSON report to")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            report = benchmark.run(
+                recipes=options["recipes"],
+                ingredients_per_recipe=options["ingredients_per_recipe"],
+                iterations=options["iterations"],
+                warmup=options["warmup"],
+                seed_value=options["seed"],
+                only=options["only"],
+                cache_responses=options["cache"],
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report["environment"] = {
+            "commit": self._commit(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+        }
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+    def _commit(self):
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "HEAD"],
+                cwd=settings.BASE_DIR,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,83 @@
+"""
+Django command to compare running API servers under concurrent load
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe import benchmark, server_benchmark
+
+
+def target(value):
+    name, sep, url = value.partition("=")
+    if not sep or not url.startswith("http://"):
+        raise ValueError(value)
+    return server_benchmark.Target(name, url)
+
+
+class Command(BaseCommand):
+    """Django command to load test servers over HTTP"""
+
+    help = (
+        "Drive already running servers with many concurrent clients, with and "
+        "without slow clients, and print latency percentiles and throughput "
+        "per server as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target",
+            dest="targets",
+            action="append",
+            type=target,
+            required=True,
+            metavar="NAME=URL",
+            help="Server to test, e.g. asgi=http://127.0.0.1:8001 (repeatable)",
+        )
+        parser.add_argument(
+            "--path",
+            dest="paths",
+            action="append",
+            help="Path to request, relative to the target URL (repeatable)",
+        )
+        parser.add_argument("--clients", type=int, default=50)
+        parser.add_argument("--duration", type=float, default=10)
+        parser.add_argument("--slow-clients", type=int, default=20)
+        parser.add_argument(
+            "--slow-seconds",
+            type=float,
+            default=2,
+            help="How long each slow client takes to send its request",
+        )
+        parser.add_argument("--timeout", type=float, default=30)
+        parser.add_argument("--output", help="File to write the JSON report to")
+
+    def handle(self, *args, **options):
+        if options["clients"] < 1:
+            raise CommandError("--clients must be at least 1")
+        report = server_benchmark.run(
+            options["targets"],
+            paths=options["paths"],
+            clients=options["clients"],
+            duration=options["duration"],
+            slow_clients=options["slow_clients"],
+            slow_seconds=options["slow_seconds"],
+            timeout=options["timeout"],
+        )
+        throttled = sum(
+            result["throttled"]
+            for scenarios in report["results"].values()
+            for result in scenarios.values()
+        )
+        if throttled:
+            rate = benchmark.UNLIMITED_RATES["read"]
+            self.stderr.write(
+                f"{throttled} requests were throttled (429). Start the servers "
+                f"with THROTTLE_READ_RATE={rate} and THROTTLE_WRITE_RATE={rate}."
+            )
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+        else:
+            self.stdout.write(output)
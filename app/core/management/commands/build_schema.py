@@ -0,0 +1,28 @@
+"""
+Django command to precompute the OpenAPI schema
+"""
+from django.core.management.base import BaseCommand
+
+from core import schema
+
+
+class Command(BaseCommand):
+    """Django command to write the schema served by /api/schema/ to disk"""
+
+    help = (
+        "Generate the OpenAPI schema for the current code and write it to "
+        "SCHEMA_CACHE_DIR, so no request has to."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lang",
+            action="append",
+            default=[],
+            help="Also build the schema translated to this language (repeatable)",
+        )
+
+    def handle(self, *args, **options):
+        for language in [None, *options["lang"]]:
+            for path in schema.build(language):
+                self.stdout.write(f"Wrote {path}")
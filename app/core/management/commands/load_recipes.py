@@ -0,0 +1,86 @@
+"""
+Django command to bulk load recipes from NDJSON or CSV files
+"""
+import multiprocessing
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe import loader
+
+
+class Command(BaseCommand):
+    """Django command to load recipes much faster than through the API"""
+
+    help = (
+        "Load recipes and their ingredients from NDJSON or CSV files, in the "
+        "format written by export_recipes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="Files to load; - for stdin")
+        parser.add_argument(
+            "--format",
+            choices=["ndjson", "csv"],
+            help="Input format; guessed from the file extension by default",
+        )
+        parser.add_argument("--batch-size", type=int, default=loader.BATCH_SIZE)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Processes used to parse NDJSON input",
+        )
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="Use bulk INSERTs even on PostgreSQL",
+        )
+
+    def handle(self, *args, **options):
+        recipe_loader = loader.RecipeLoader(
+            batch_size=options["batch_size"],
+            use_copy=False if options["no_copy"] else None,
+        )
+        started = time.monotonic()
+
+        def progress(loaded):
+            rate = loaded / max(time.monotonic() - started, 1e-9)
+            self.stdout.write(f"Loaded {loaded} recipes ({rate:,.0f} rows/s)")
+
+        pool = None
+        if options["workers"] > 1:
+            pool = multiprocessing.Pool(options["workers"])
+        try:
+            for path in options["paths"]:
+                file_format = options["format"] or self._guess_format(path)
+                with self._open(path) as stream:
+                    recipe_loader.load(
+                        loader.parse(stream, file_format, pool=pool),
+                        progress=progress,
+                    )
+        except loader.LoadError as error:
+            raise CommandError(str(error))
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Loaded {recipe_loader.loaded} recipes in {elapsed:.1f}s"
+            )
+        )
+
+    def _guess_format(self, path):
+        return "csv" if os.path.splitext(path)[1].lower() == ".csv" else "ndjson"
+
+    def _open(self, path):
+        if path == "-":
+            return open(sys.stdin.fileno(), encoding="utf-8", newline="", closefd=False)
+        try:
+            return open(path, encoding="utf-8", newline="")
+        except OSError as error:
+            raise CommandError(str(error))
@@ -0,0 +1,73 @@
+"""
+Django command to run queued background jobs
+"""
+import signal
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from recipe import jobs
+
+
+class Command(BaseCommand):
+    """Django command to run the jobs queued by the API"""
+
+    help = (
+        "Run queued background jobs (see recipe/jobs.py). Start as many "
+        "workers as needed; they share the queue through the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=1,
+            help="Number of jobs run at the same time, each in its own thread",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait before looking again when the queue is empty",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit once the queue is empty instead of waiting for jobs",
+        )
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1:
+            raise CommandError("--concurrency must be at least 1")
+        stop = threading.Event()
+
+        def shutdown(signum, frame):
+            self.stdout.write("Finishing running jobs...")
+            stop.set()
+
+        handlers = {}
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                handlers[signum] = signal.signal(signum, shutdown)
+
+        def work():
+            try:
+                jobs.work(stop, options["poll_interval"], options["burst"])
+            finally:
+                # Each thread has its own database connections
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=work, name=f"worker-{number}")
+            for number in range(options["concurrency"])
+        ]
+        self.stdout.write(f"Running jobs with {len(threads)} threads")
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
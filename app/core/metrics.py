@@ -0,0 +1,113 @@
+"""
+Prometheus metrics for every request
+"""
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from core.db.backends.pooled import pool as db_pool
+
+UNMATCHED = "unmatched"
+
+REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by view, method and status code",
+    ["view", "method", "status"],
+)
+LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by view and method",
+    ["view", "method"],
+)
+QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries per HTTP request by view",
+    ["view"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, float("inf")),
+)
+QUERY_TIME = Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent in database queries per HTTP request by view",
+    ["view"],
+)
+
+
+def view_label(request):
+    """Return the URL name of the view that handled the request"""
+    match = getattr(request, "resolver_match", None)
+    if match is None or not match.url_name:
+        return UNMATCHED
+    return match.url_name
+
+
+def observe(request, response, seconds, query_count, query_seconds):
+    """Record one finished request"""
+    view = view_label(request)
+    REQUESTS.labels(view, request.method, str(response.status_code)).inc()
+    LATENCY.labels(view, request.method).observe(seconds)
+    QUERIES.labels(view).observe(query_count)
+    QUERY_TIME.labels(view).observe(query_seconds)
+
+
+class PoolCollector:
+    """
+    Report the database connection pools of this process.
+
+    Pools are per process, so in multiprocess mode these are the values of
+    whichever worker served `/metrics`, labelled with its pid.
+    """
+
+    GAUGES = {
+        "size": "Open pooled database connections",
+        "idle": "Idle pooled database connections",
+        "in_use": "Pooled database connections in use",
+        "waiting": "Threads waiting for a pooled database connection",
+        "max_size": "Maximum pooled database connections",
+    }
+    COUNTERS = {
+        "connects": "Database connections opened by the pool",
+        "acquires": "Database connections handed out by the pool",
+        "timeouts": "Waits for a pooled database connection that timed out",
+        "recycled": "Pooled database connections closed for their age",
+        "discarded": "Pooled database connections closed as unusable",
+    }
+
+    def collect(self):
+        labels = ["alias", "pid"]
+        families = {
+            name: GaugeMetricFamily(f"db_pool_{name}", doc, labels=labels)
+            for name, doc in self.GAUGES.items()
+        }
+        families.update(
+            (name, CounterMetricFamily(f"db_pool_{name}", doc, labels=labels))
+            for name, doc in self.COUNTERS.items()
+        )
+        pid = str(os.getpid())
+        for pool in db_pool.pools():
+            stats = pool.stats()
+            for name, family in families.items():
+                family.add_metric([pool.alias, pid], stats[name])
+        return families.values()
+
+
+REGISTRY.register(PoolCollector())
+
+
+def exposition():
+    """Return the metrics in the Prometheus text format, and its content type"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(PoolCollector())
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
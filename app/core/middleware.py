@@ -0,0 +1,206 @@
+"""
+Request instrumentation middleware
+"""
+import asyncio
+import json
+import logging
+import math
+import time
+
+from asgiref.sync import markcoroutinefunction
+from django.conf import settings
+
+from core import metrics, timing
+from core.db import routers
+
+logger = logging.getLogger("core.timing")
+
+DEFAULT_SLOW_REQUEST_MS = 500
+DEFAULT_REPLICA_STICKY_SECONDS = 5
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS", "TRACE")
+
+
+class ServerTimingMiddleware:
+    """
+    Time every request and report it in a `Server-Timing` header, a log
+    line and the Prometheus metrics.
+
+    The timings are the database query count and time (over every database
+    alias and thread, see core.timing.install), time spent serializing, the
+    view itself, rendering the response and the request as a whole.
+    Requests slower than `SLOW_REQUEST_THRESHOLD_MS` are also logged at
+    WARNING level with their SQL, slowest query first.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Let Django call the middleware without a thread under ASGI
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timings = timing.RequestTimings()
+        token = timing.activate(timings)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            timing.deactivate(token)
+        return self.finish(request, response, timings, started)
+
+    async def __acall__(self, request):
+        timings = timing.RequestTimings()
+        token = timing.activate(timings)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            timing.deactivate(token)
+        return self.finish(request, response, timings, started)
+
+    def finish(self, request, response, timings, started):
+        timings.add("total", time.perf_counter() - started)
+        if "view" not in timings.durations and hasattr(request, "_view_started"):
+            timings.add("view", time.perf_counter() - request._view_started)
+
+        response["Server-Timing"] = self.header(timings)
+        self.log(request, response, timings)
+        metrics.observe(
+            request,
+            response,
+            timings.durations["total"],
+            timings.query_count,
+            timings.query_time,
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns, so the view
+        # ends and rendering starts here.
+        render_started = time.perf_counter()
+        timings = timing.current()
+        if timings is not None and hasattr(request, "_view_started"):
+            timings.add("view", render_started - request._view_started)
+
+            def rendered(response):
+                timings.add("render", time.perf_counter() - render_started)
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def header(self, timings):
+        metrics = [
+            f'db;dur={timings.query_time * 1000:.2f};desc="{timings.query_count} '
+            'queries"'
+        ]
+        metrics += [
+            f"{name};dur={seconds * 1000:.2f}"
+            for name, seconds in timings.durations.items()
+        ]
+        return ", ".join(metrics)
+
+    def log(self, request, response, timings):
+        match = getattr(request, "resolver_match", None)
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "db_queries": timings.query_count,
+            "db_ms": round(timings.query_time * 1000, 2),
+        }
+        record.update(
+            (f"{name}_ms", round(seconds * 1000, 2))
+            for name, seconds in timings.durations.items()
+        )
+        threshold = getattr(
+            settings, "SLOW_REQUEST_THRESHOLD_MS", DEFAULT_SLOW_REQUEST_MS
+        )
+        if record["total_ms"] < threshold:
+            logger.info(json.dumps(record), extra={"timing": record})
+            return
+
+        record["slow"] = True
+        queries = sorted(timings.queries, key=lambda query: query[0], reverse=True)
+        record["sql"] = [
+            {"ms": round(seconds * 1000, 2), "sql": sql} for seconds, sql in queries
+        ]
+        logger.warning(json.dumps(record), extra={"timing": record})
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Route each request's reads (see core.db.routers), and keep clients that
+    wrote on the primary for `REPLICA_STICKY_SECONDS` afterwards, so they
+    read their own writes despite replication lag.
+
+    The window is kept in a cookie holding when it ends, which is capped at
+    the configured length, so a client can't pin itself for longer.
+    """
+
+    COOKIE = "primary_until"
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = routers.activate(self.pinned(request))
+        state = routers.current()
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.deactivate(token)
+        return self.finish(response, state)
+
+    async def __acall__(self, request):
+        token = routers.activate(self.pinned(request))
+        state = routers.current()
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.deactivate(token)
+        return self.finish(response, state)
+
+    def window(self):
+        return getattr(
+            settings, "REPLICA_STICKY_SECONDS", DEFAULT_REPLICA_STICKY_SECONDS
+        )
+
+    def pinned(self, request):
+        if request.method not in SAFE_METHODS:
+            return True
+        try:
+            until = float(request.COOKIES.get(self.COOKIE, 0))
+        except ValueError:
+            return False
+        now = time.time()
+        return now < until <= now + self.window()
+
+    def finish(self, response, state):
+        window = self.window()
+        if state.wrote and window > 0 and routers.replicas():
+            response.set_cookie(
+                self.COOKIE,
+                f"{time.time() + window:.3f}",
+                max_age=math.ceil(window),
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
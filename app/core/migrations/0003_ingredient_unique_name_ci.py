@@ -0,0 +1,54 @@
+# Generated by Django 4.0.10 on 2026-10-18 18:01
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+def dedupe_ingredients(apps, schema_editor):
+    """Merge ingredients whose names only differ by case into the oldest row"""
+    Ingredient = apps.get_model('core', 'Ingredient')
+    Recipe = apps.get_model('core', 'Recipe')
+    RecipeIngredient = Recipe.ingredients.through
+
+    # Compare names lower-cased by the database, as the constraint does
+    canonical_ids = {}
+    duplicates = []
+    names = Ingredient.objects.annotate(
+        lower_name=django.db.models.functions.text.Lower('name')
+    ).order_by('id').values_list('id', 'lower_name')
+    for ingredient_id, key in names:
+        if key in canonical_ids:
+            duplicates.append((ingredient_id, canonical_ids[key]))
+        else:
+            canonical_ids[key] = ingredient_id
+
+    for duplicate_id, canonical_id in duplicates:
+        already_linked = RecipeIngredient.objects.filter(
+            ingredient_id=canonical_id
+        ).values('recipe_id')
+        RecipeIngredient.objects.filter(ingredient_id=duplicate_id).exclude(
+            recipe_id__in=already_linked
+        ).update(ingredient_id=canonical_id)
+
+    Ingredient.objects.filter(id__in=[d for d, _ in duplicates]).delete()
+
+
+class Migration(migrations.Migration):
+    # PostgreSQL cannot add the index while the deletes above leave deferred
+    # foreign key checks pending in the same transaction, so the data step
+    # commits on its own first
+    atomic = False
+
+    dependencies = [
+        ('core', '0002_ingredient_recipe_ingredients'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            dedupe_ingredients, migrations.RunPython.noop, atomic=True
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('name'), name='unique_ingredient_name_ci'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.0.10 on 2026-10-18 18:40
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def backfill_summaries(apps, schema_editor):
+    """Copy every recipe's ingredient links into its summary"""
+    Recipe = apps.get_model('core', 'Recipe')
+    RecipeIngredient = apps.get_model('core', 'RecipeIngredient')
+    using = schema_editor.connection.alias
+    last_id = 0
+    while True:
+        recipes = list(
+            Recipe.objects.using(using)
+            .filter(pk__gt=last_id)
+            .order_by('pk')
+            .only('pk')[:BATCH_SIZE]
+        )
+        if not recipes:
+            return
+        by_id = {recipe.pk: recipe for recipe in recipes}
+        for recipe in recipes:
+            recipe.ingredient_summary = []
+        links = (
+            RecipeIngredient.objects.using(using)
+            .filter(recipe_id__in=by_id)
+            .order_by('recipe_id', 'ingredient_id')
+            .values_list('recipe_id', 'ingredient_id', 'ingredient__name')
+        )
+        for recipe_id, ingredient_id, name in links:
+            by_id[recipe_id].ingredient_summary.append(
+                {'id': ingredient_id, 'name': name}
+            )
+        for recipe in recipes:
+            recipe.ingredient_count = len(recipe.ingredient_summary)
+        Recipe.objects.using(using).bulk_update(
+            recipes, ['ingredient_count', 'ingredient_summary']
+        )
+        last_id = recipes[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_row_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_summary',
+            field=models.JSONField(default=list, editable=False),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
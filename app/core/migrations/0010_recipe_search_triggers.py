@@ -0,0 +1,88 @@
+# Generated by Django 4.0.10 on 2026-10-19 09:12
+
+from django.db import migrations
+
+CREATE_SQL = """
+CREATE FUNCTION core_recipe_search_vector(bigint, text, text)
+RETURNS tsvector LANGUAGE sql STABLE AS $$
+    SELECT
+        setweight(to_tsvector('english', coalesce($2, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce($3, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(i.name, ' ')
+            FROM core_recipe_ingredients ri
+            JOIN core_ingredient i ON i.id = ri.ingredient_id
+            WHERE ri.recipe_id = $1
+        ), '')), 'C')
+$$;
+
+CREATE FUNCTION core_recipe_search_vector_row() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.search_vector := core_recipe_search_vector(
+        NEW.id, NEW.title, NEW.description
+    );
+    RETURN NEW;
+END
+$$;
+
+CREATE FUNCTION core_recipe_search_vector_links() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE core_recipe r
+    SET search_vector = core_recipe_search_vector(r.id, r.title, r.description)
+    WHERE r.id IN (SELECT recipe_id FROM changed_links);
+    RETURN NULL;
+END
+$$;
+
+CREATE TRIGGER core_recipe_search_vector
+BEFORE INSERT OR UPDATE OF title, description ON core_recipe
+FOR EACH ROW EXECUTE FUNCTION core_recipe_search_vector_row();
+
+CREATE TRIGGER core_recipe_ingredients_insert_search_vector
+AFTER INSERT ON core_recipe_ingredients
+REFERENCING NEW TABLE AS changed_links
+FOR EACH STATEMENT EXECUTE FUNCTION core_recipe_search_vector_links();
+
+CREATE TRIGGER core_recipe_ingredients_delete_search_vector
+AFTER DELETE ON core_recipe_ingredients
+REFERENCING OLD TABLE AS changed_links
+FOR EACH STATEMENT EXECUTE FUNCTION core_recipe_search_vector_links();
+
+UPDATE core_recipe
+SET search_vector = core_recipe_search_vector(id, title, description);
+"""
+
+DROP_SQL = """
+DROP TRIGGER core_recipe_ingredients_delete_search_vector ON core_recipe_ingredients;
+DROP TRIGGER core_recipe_ingredients_insert_search_vector ON core_recipe_ingredients;
+DROP TRIGGER core_recipe_search_vector ON core_recipe;
+DROP FUNCTION core_recipe_search_vector_links();
+DROP FUNCTION core_recipe_search_vector_row();
+DROP FUNCTION core_recipe_search_vector(bigint, text, text);
+"""
+
+
+def create_triggers(apps, schema_editor):
+    """Keep recipe search vectors current in the database (PostgreSQL only)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(CREATE_SQL)
+
+
+def drop_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(DROP_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
@@ -1,4 +1,8 @@
+import uuid
+
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models.functions import Lower
 
 
 class Recipe(models.Model):
@@ -6,7 +10,17 @@ class Recipe(models.Model):
 
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
-    ingredients = models.ManyToManyField("Ingredient")
+    ingredients = models.ManyToManyField("Ingredient", through="RecipeIngredient")
+    search_vector = SearchVectorField(null=True, editable=False)
+    version = models.PositiveIntegerField(default=1, editable=False)
+    # Copies of the ingredient links, as [{"id", "name"}] ordered by id, so
+    # reads need no join (kept up to date by recipe.summary)
+    ingredient_count = models.PositiveIntegerField(default=0, editable=False)
+    ingredient_summary = models.JSONField(default=list, editable=False)
+    # Content-hashed image, and its thumbnails as {size: name} once rendered
+    # (see recipe.images)
+    image = models.ImageField(upload_to="recipes/", blank=True, editable=False)
+    image_thumbnails = models.JSONField(default=dict, editable=False)
 
     def __str__(self):
         return self.title
@@ -16,6 +30,67 @@ class Ingredient(models.Model):
     """Ingredient for recipes"""
 
     name = models.CharField(max_length=255)
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                Lower("name"), name="unique_ingredient_name_ci"
+            ),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class RecipeIngredient(models.Model):
+    """Link between a recipe and one of its ingredients"""
+
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE)
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE)
+
+    class Meta:
+        db_table = "core_recipe_ingredients"
+        unique_together = [["recipe", "ingredient"]]
+        indexes = [
+            # Inverted index: ingredient -> recipes, answered from the index
+            models.Index(
+                fields=["ingredient", "recipe"], name="recipe_ingredient_inv_idx"
+            ),
+        ]
+
+
+class Job(models.Model):
+    """Background job, run by the `run_worker` command (see recipe.jobs)"""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers take the oldest queued job and look for stalled ones
+            models.Index(fields=["status", "created_at"], name="job_queue_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.id} ({self.status})"
@@ -0,0 +1,185 @@
+"""
+Precomputed OpenAPI schema
+"""
+import functools
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import rest_framework
+from django.conf import settings
+from django.utils import translation
+from rest_framework.renderers import BaseRenderer
+
+logger = logging.getLogger(__name__)
+
+YAML = "yaml"
+JSON = "json"
+FORMATS = (YAML, JSON)
+
+_documents = {}
+_lock = threading.Lock()
+
+
+class SchemaRenderer(BaseRenderer):
+    """Passes on a rendered schema document as is"""
+
+    charset = None
+    document_format = YAML
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return b"" if data is None else data
+
+
+# The media types and formats of drf-spectacular's schema renderers
+class OpenApiYamlRenderer(SchemaRenderer):
+    media_type = "application/vnd.oai.openapi"
+    format = "yaml"
+
+
+class OpenApiYamlRenderer2(OpenApiYamlRenderer):
+    media_type = "application/yaml"
+
+
+class OpenApiJsonRenderer(SchemaRenderer):
+    media_type = "application/vnd.oai.openapi+json"
+    format = "json"
+    document_format = JSON
+
+
+class OpenApiJsonRenderer2(OpenApiJsonRenderer):
+    media_type = "application/json"
+
+
+def _project_files():
+    for path in sorted(Path(settings.BASE_DIR).rglob("*.py")):
+        if "tests" not in path.parts:
+            yield path
+
+
+@functools.lru_cache(maxsize=None)
+def _source_hash():
+    from importlib.metadata import version
+
+    digest = hashlib.sha256()
+    for path in _project_files():
+        digest.update(str(path.relative_to(settings.BASE_DIR)).encode())
+        digest.update(path.read_bytes())
+    digest.update(rest_framework.VERSION.encode())
+    digest.update(version("drf-spectacular").encode())
+    return digest
+
+
+def code_hash():
+    """Return the hash of the code that determines the schema"""
+    if getattr(settings, "SCHEMA_CODE_HASH", None):
+        return settings.SCHEMA_CODE_HASH
+    digest = _source_hash().copy()
+    digest.update(repr(getattr(settings, "SPECTACULAR_SETTINGS", {})).encode())
+    return digest.hexdigest()[:32]
+
+
+def cache_dir():
+    return Path(
+        getattr(settings, "SCHEMA_CACHE_DIR", None)
+        or Path(tempfile.gettempdir()) / "recipe-api-schema"
+    )
+
+
+def _path(key, document_format):
+    code, language = key
+    suffix = f"-{language}" if language else ""
+    return cache_dir() / f"schema-{code}{suffix}.{document_format}"
+
+
+def _language(language):
+    """Return `language` if it is one of LANGUAGES, else None"""
+    if language and language in dict(settings.LANGUAGES):
+        return language
+    return None
+
+
+def generate(language=None):
+    """Generate the schema, returning {format: rendered document}"""
+    from drf_spectacular.generators import SchemaGenerator
+    from drf_spectacular.renderers import (
+        OpenApiJsonRenderer as JsonRenderer,
+        OpenApiYamlRenderer as YamlRenderer,
+    )
+
+    with translation.override(language or settings.LANGUAGE_CODE):
+        schema = SchemaGenerator().get_schema(request=None, public=True)
+        return {
+            YAML: YamlRenderer().render(schema, renderer_context={}),
+            JSON: JsonRenderer().render(schema, renderer_context={}),
+        }
+
+
+def _read(key):
+    try:
+        return {
+            document_format: _path(key, document_format).read_bytes()
+            for document_format in FORMATS
+        }
+    except OSError:
+        return None
+
+
+def _write(key, documents):
+    """Write the documents to the cache directory, each atomically"""
+    try:
+        os.makedirs(cache_dir(), exist_ok=True)
+        for document_format, body in documents.items():
+            path = _path(key, document_format)
+            fd, tmp = tempfile.mkstemp(dir=cache_dir(), prefix=".schema-")
+            with os.fdopen(fd, "wb") as out:
+                out.write(body)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+    except OSError:
+        logger.warning("Could not write the schema to %s", cache_dir(), exc_info=True)
+
+
+def _entry(documents):
+    return {
+        document_format: (body, f'"schema-{hashlib.sha256(body).hexdigest()[:32]}"')
+        for document_format, body in documents.items()
+    }
+
+
+def get_document(document_format=YAML, language=None):
+    """
+    Return (body, ETag) of the schema document, reading or generating it
+    the first time
+    """
+    key = (code_hash(), _language(language))
+    entry = _documents.get(key)
+    if entry is None:
+        with _lock:
+            entry = _documents.get(key)
+            if entry is None:
+                documents = _read(key)
+                if documents is None:
+                    documents = generate(key[1])
+                    _write(key, documents)
+                entry = _documents[key] = _entry(documents)
+    return entry[document_format]
+
+
+def build(language=None):
+    """Generate the schema and write it to the cache directory"""
+    key = (code_hash(), _language(language))
+    documents = generate(key[1])
+    _write(key, documents)
+    with _lock:
+        _documents[key] = _entry(documents)
+    return [_path(key, document_format) for document_format in FORMATS]
+
+
+def clear():
+    """Forget the documents held in memory"""
+    with _lock:
+        _documents.clear()
@@ -0,0 +1,50 @@
+"""
+Tests for the ASGI handler
+"""
+from asgiref.testing import ApplicationCommunicator
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from core.asgi import StreamingASGIHandler
+from core.models import Recipe
+
+
+EXPORT_URL = reverse("recipe:recipe-export")
+
+
+async def get(application, path):
+    """Send a GET through an ASGI application, returning its messages"""
+    communicator = ApplicationCommunicator(
+        application,
+        {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "path": path,
+            "query_string": b"",
+            "headers": [(b"host", b"testserver")],
+        },
+    )
+    await communicator.send_input({"type": "http.request"})
+    messages = [await communicator.receive_output(5)]
+    while messages[-1].get("more_body", messages[-1]["type"] != "http.response.body"):
+        messages.append(await communicator.receive_output(5))
+    return messages
+
+
+class StreamingASGIHandlerTests(TransactionTestCase):
+    """Test streaming responses under ASGI"""
+
+    def setUp(self):
+        Recipe.objects.create(title="Soup")
+        Recipe.objects.create(title="Stew")
+
+    async def test_streams_export(self):
+        """Test the export's queries run off the event loop"""
+        messages = await get(StreamingASGIHandler(), EXPORT_URL)
+
+        self.assertEqual(messages[0]["status"], 200)
+        body = b"".join(message.get("body", b"") for message in messages[1:])
+        self.assertEqual(body.count(b"\n"), 2)
+        self.assertIn(b"Stew", body)
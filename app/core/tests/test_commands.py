@@ -1,13 +1,27 @@
 """
 Test custom Django management commands
 """
+import io
+import json
+import os
+import tempfile
+from unittest import skipUnless
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2Error
 
+from django.core.cache import cache
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredient
+from recipe import loader
 
 
 @patch("core.management.commands.wait_for_db.Command.check")
@@ -33,3 +47,169 @@ class CommandTests(SimpleTestCase):
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=["default"])
+
+
+class LoadRecipesCommandTests(TestCase):
+    """Test the load_recipes command"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def load(self, *args):
+        call_command("load_recipes", *args, stdout=io.StringIO())
+
+    def test_load_ndjson(self):
+        """Test loading NDJSON reuses ingredients case-insensitively"""
+        salt = Ingredient.objects.create(name="Salt")
+        lines = [
+            {"title": "Soup", "ingredients": [{"name": "salt"}, {"name": "Leek"}]},
+            {"title": "Chips", "description": "Crisp", "ingredients": ["LEEK"]},
+            {"title": "Water"},
+        ]
+        path = self.write(
+            "recipes.ndjson", "".join(json.dumps(line) + "\n" for line in lines)
+        )
+
+        self.load(path, "--batch-size", "2")
+
+        self.assertEqual(Ingredient.objects.count(), 2)
+        leek = Ingredient.objects.get(name="Leek")
+        soup = Recipe.objects.get(title="Soup")
+        self.assertEqual(set(soup.ingredients.all()), {salt, leek})
+        chips = Recipe.objects.get(title="Chips")
+        self.assertEqual(chips.description, "Crisp")
+        self.assertEqual(list(chips.ingredients.all()), [leek])
+        self.assertFalse(Recipe.objects.get(title="Water").ingredients.exists())
+
+    def test_load_non_ascii_ingredients(self):
+        """Test non-ASCII ingredient names are matched like the API does"""
+        apples = Ingredient.objects.create(name="Äpfel")
+        lines = [
+            {"title": "Strudel", "ingredients": ["Äpfel", "Crème fraîche"]},
+            {"title": "Tarte", "ingredients": ["Crème fraîche"]},
+        ]
+        path = self.write(
+            "recipes.ndjson", "".join(json.dumps(line) + "\n" for line in lines)
+        )
+
+        self.load(path)
+
+        self.assertEqual(Ingredient.objects.count(), 2)
+        strudel = Recipe.objects.get(title="Strudel")
+        self.assertIn(apples, strudel.ingredients.all())
+        self.assertEqual(
+            list(
+                Recipe.objects.get(title="Tarte").ingredients.values_list(
+                    "name", flat=True
+                )
+            ),
+            ["Crème fraîche"],
+        )
+
+    def test_load_exported_csv(self):
+        """Test a CSV export loads back into the same recipes"""
+        recipe = Recipe.objects.create(title="Stew", description="Slow, cooked")
+        recipe.ingredients.add(
+            Ingredient.objects.create(name="Beef"),
+            Ingredient.objects.create(name="Carrot"),
+        )
+        out = io.StringIO()
+        call_command("export_recipes", "--format", "csv", stdout=out)
+        path = self.write("recipes.csv", out.getvalue())
+
+        self.load(path)
+
+        copy = Recipe.objects.exclude(pk=recipe.pk).get()
+        self.assertEqual(copy.title, "Stew")
+        self.assertEqual(copy.description, "Slow, cooked")
+        self.assertEqual(
+            set(copy.ingredients.values_list("name", flat=True)), {"Beef", "Carrot"}
+        )
+        self.assertEqual(Ingredient.objects.count(), 2)
+
+    def test_load_parallel_parsing(self):
+        """Test NDJSON can be parsed by several worker processes"""
+        path = self.write(
+            "recipes.ndjson",
+            "".join(
+                json.dumps({"title": f"Recipe {i}", "ingredients": [f"I{i % 7}"]})
+                + "\n"
+                for i in range(2500)
+            ),
+        )
+
+        self.load(path, "--workers", "2")
+
+        self.assertEqual(Recipe.objects.count(), 2500)
+        self.assertEqual(Ingredient.objects.count(), 7)
+        self.assertEqual(
+            list(Recipe.objects.order_by("id").values_list("title", flat=True)[:2]),
+            ["Recipe 0", "Recipe 1"],
+        )
+
+    def test_load_invalid_row(self):
+        """Test an unparseable row fails the command"""
+        path = self.write("recipes.ndjson", '{"description": "No title"}\n')
+
+        with self.assertRaises(CommandError):
+            self.load(path)
+
+    def test_failed_load_invalidates_cache(self):
+        """Test batches written before a failure are not hidden by the cache"""
+        cache.clear()
+        client = APIClient()
+        url = reverse("recipe:recipe-list")
+        client.get(url)
+        path = self.write(
+            "recipes.csv", "title,description,ingredient_names\nSoup,,\n,No title,\n"
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(CommandError):
+                self.load(path, "--batch-size", "1")
+
+        res = client.get(url)
+        self.assertEqual([r["title"] for r in res.data["results"]], ["Soup"])
+
+    def test_copy_fills_every_required_column(self):
+        """Test COPY writes every NOT NULL column of the recipes table"""
+        required = {
+            field.column
+            for field in Recipe._meta.concrete_fields
+            if not field.null
+        }
+
+        self.assertEqual(required - set(loader.COPY_RECIPE_COLUMNS), set())
+
+    @skipUnless(connection.vendor == "postgresql", "COPY needs PostgreSQL")
+    def test_load_with_copy(self):
+        """Test loading with COPY keeps empty and quoted fields as they are"""
+        salt = Ingredient.objects.create(name="Salt")
+        lines = [
+            {"title": "Soup", "ingredients": ["salt", "Leek"]},
+            {"title": 'Chips, "crisp"', "description": "Line\nbreak"},
+        ]
+        path = self.write(
+            "recipes.ndjson", "".join(json.dumps(line) + "\n" for line in lines)
+        )
+
+        self.load(path)
+
+        soup = Recipe.objects.get(title="Soup")
+        self.assertEqual(soup.description, "")
+        self.assertEqual(soup.ingredient_count, 2)
+        self.assertIn(salt, soup.ingredients.all())
+        chips = Recipe.objects.get(title='Chips, "crisp"')
+        self.assertEqual(chips.description, "Line\nbreak")
+        self.assertEqual(chips.ingredient_summary, [])
+        self.assertFalse(chips.image)
+        self.assertEqual(chips.image_thumbnails, {})
@@ -0,0 +1,106 @@
+"""
+Tests for the Prometheus metrics endpoint
+"""
+import os
+import subprocess
+import sys
+import tempfile
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+
+
+METRICS_URL = reverse("metrics")
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+def sample(name, labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsTests(TestCase):
+    """Test request metrics"""
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def test_request_metrics(self):
+        """Test requests are counted and timed per view"""
+        recipe = Recipe.objects.create(title="Soup")
+        labels = {"view": "recipe-detail", "method": "GET"}
+        before = sample("http_requests_total", {**labels, "status": "200"})
+        observed = sample("http_request_duration_seconds_count", labels)
+        queries = sample("http_request_db_queries_sum", {"view": "recipe-detail"})
+
+        self.client.get(reverse("recipe:recipe-detail", args=[recipe.id]))
+        self.client.get(reverse("recipe:recipe-detail", args=[0]))
+
+        self.assertEqual(
+            sample("http_requests_total", {**labels, "status": "200"}), before + 1
+        )
+        self.assertGreaterEqual(
+            sample("http_requests_total", {**labels, "status": "404"}), 1
+        )
+        self.assertEqual(
+            sample("http_request_duration_seconds_count", labels), observed + 2
+        )
+        self.assertGreater(
+            sample("http_request_db_queries_sum", {"view": "recipe-detail"}), queries
+        )
+
+    def test_unmatched_urls_share_a_label(self):
+        """Test unknown URLs don't create a label per path"""
+        self.client.get("/no/such/page/")
+
+        self.assertGreaterEqual(
+            sample(
+                "http_requests_total",
+                {"view": "unmatched", "method": "GET", "status": "404"},
+            ),
+            1,
+        )
+
+    def test_metrics_endpoint(self):
+        """Test the metrics are exposed in the Prometheus text format"""
+        self.client.get(RECIPES_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res["Content-Type"].startswith("text/plain"))
+        body = res.content.decode()
+        self.assertIn("# TYPE http_request_duration_seconds histogram", body)
+        self.assertIn(
+            'http_requests_total{method="GET",status="200",view="recipe-list"}', body
+        )
+
+    def test_metrics_endpoint_multiprocess(self):
+        """Test the endpoint adds up the values of every worker process"""
+        record = (
+            "from core import metrics; "
+            "metrics.REQUESTS.labels('recipe-list', 'GET', '200').inc()"
+        )
+        with tempfile.TemporaryDirectory() as path:
+            env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": path}
+            for _ in range(2):
+                subprocess.run(
+                    [sys.executable, "-c", record],
+                    cwd=os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+                    env=env,
+                    check=True,
+                )
+            with patch.dict(os.environ, {"PROMETHEUS_MULTIPROC_DIR": path}):
+                res = self.client.get(METRICS_URL)
+
+        self.assertIn(
+            'http_requests_total{method="GET",status="200",view="recipe-list"} 2.0',
+            res.content.decode(),
+        )
@@ -0,0 +1,68 @@
+"""
+Tests for the request instrumentation middleware
+"""
+import json
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import timing
+from core.models import Recipe
+
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+@override_settings(RECIPE_CACHE_RESPONSES=False)
+class ServerTimingMiddlewareTests(TestCase):
+    """Test per-request timings"""
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        Recipe.objects.create(title="Soup")
+
+    def test_server_timing_header(self):
+        """Test responses report query count and timings"""
+        res = self.client.get(RECIPES_URL)
+
+        metrics = {
+            part.split(";")[0]: part for part in res["Server-Timing"].split(", ")
+        }
+        self.assertIn('desc="1 queries"', metrics["db"])
+        for name in ("serialize", "view", "render", "total"):
+            self.assertIn(name, metrics)
+            self.assertIn(";dur=", metrics[name])
+
+    def test_log_line(self):
+        """Test every request is logged as one JSON line"""
+        with self.assertLogs("core.timing", "INFO") as logs:
+            self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(logs.records), 1)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["view"], "recipe:recipe-list")
+        self.assertEqual(record["status"], 200)
+        self.assertEqual(record["db_queries"], 1)
+        self.assertNotIn("sql", record)
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_slow_request_logs_sql(self):
+        """Test slow requests are logged as warnings with their SQL"""
+        with self.assertLogs("core.timing", "WARNING") as logs:
+            self.client.get(RECIPES_URL)
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertTrue(record["slow"])
+        self.assertEqual(len(record["sql"]), 1)
+        self.assertIn("core_recipe", record["sql"][0]["sql"])
+
+    def test_timed_outside_request(self):
+        """Test timing code outside a request does nothing"""
+        with timing.timed("serialize"):
+            pass
+
+        self.assertIsNone(timing.current())
@@ -1,3 +1,4 @@
+from django.db import IntegrityError
 from django.test import TestCase
 
 from core import models
@@ -21,3 +22,10 @@ class ModelTests(TestCase):
         )
 
         self.assertEqual(str(ingredient), ingredient.name)
+
+    def test_ingredient_name_unique_case_insensitive(self):
+        """Test ingredient names are unique regardless of case"""
+        models.Ingredient.objects.create(name="Salt")
+
+        with self.assertRaises(IntegrityError):
+            models.Ingredient.objects.create(name="SALT")
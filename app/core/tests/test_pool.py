@@ -0,0 +1,274 @@
+"""
+Tests for the pooled database backend
+"""
+import threading
+from unittest.mock import patch
+
+import psycopg2
+from psycopg2 import extensions
+from django.db import connections
+from django.test import SimpleTestCase
+
+from core import metrics
+from core.db.backends.pooled import pool
+from core.db.backends.pooled.base import DatabaseWrapper
+
+
+class FakeInfo:
+    transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def execute(self, sql, params=None):
+        if self.connection.broken:
+            raise psycopg2.OperationalError("server closed the connection")
+        self.connection.executed.append(sql)
+
+
+class FakeConnection:
+    """Stand-in for a psycopg2 connection"""
+
+    isolation_level = None
+    autocommit = False
+
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.executed = []
+        self.info = FakeInfo()
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+    def set_client_encoding(self, encoding):
+        pass
+
+    def get_parameter_status(self, name):
+        return "UTC"
+
+
+def fake_connect(**conn_params):
+    return FakeConnection()
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test the connection pool"""
+
+    def setUp(self):
+        self.opened = []
+
+    def connect(self):
+        connection = FakeConnection()
+        self.opened.append(connection)
+        return connection
+
+    def test_reuses_connections(self):
+        """Test a released connection is handed out again"""
+        connection_pool = pool.ConnectionPool()
+
+        first = connection_pool.acquire(self.connect)
+        connection_pool.release(first)
+        second = connection_pool.acquire(self.connect)
+
+        self.assertIs(first, second)
+        self.assertEqual(len(self.opened), 1)
+        stats = connection_pool.stats()
+        self.assertEqual(stats["acquires"], 2)
+        self.assertEqual(stats["connects"], 1)
+        self.assertEqual(stats["in_use"], 1)
+
+    def test_min_size(self):
+        """Test the pool opens min_size connections once used"""
+        connection_pool = pool.ConnectionPool(min_size=3)
+
+        connection_pool.acquire(self.connect)
+
+        self.assertEqual(len(self.opened), 3)
+        self.assertEqual(connection_pool.stats()["idle"], 2)
+
+    def test_max_size_timeout(self):
+        """Test acquiring from a full pool times out"""
+        connection_pool = pool.ConnectionPool(max_size=2, timeout=0.05)
+        connection_pool.acquire(self.connect)
+        connection_pool.acquire(self.connect)
+
+        with self.assertRaises(pool.PoolTimeout):
+            connection_pool.acquire(self.connect)
+
+        self.assertEqual(len(self.opened), 2)
+        self.assertEqual(connection_pool.stats()["timeouts"], 1)
+
+    def test_waits_for_release(self):
+        """Test a waiting thread gets the next released connection"""
+        connection_pool = pool.ConnectionPool(max_size=1, timeout=5)
+        first = connection_pool.acquire(self.connect)
+        acquired = []
+        waiter = threading.Thread(
+            target=lambda: acquired.append(connection_pool.acquire(self.connect))
+        )
+        waiter.start()
+        while not connection_pool.stats()["waiting"]:
+            pass
+
+        connection_pool.release(first)
+        waiter.join()
+
+        self.assertEqual(acquired, [first])
+
+    def test_recycles_old_connections(self):
+        """Test connections past max_age are closed rather than reused"""
+        connection_pool = pool.ConnectionPool(max_age=0)
+        first = connection_pool.acquire(self.connect)
+
+        connection_pool.release(first)
+
+        self.assertTrue(first.closed)
+        self.assertIsNot(connection_pool.acquire(self.connect), first)
+        stats = connection_pool.stats()
+        self.assertEqual(stats["recycled"], 1)
+        self.assertEqual(stats["size"], 1)
+
+    def test_health_check(self):
+        """Test idle connections that fail SELECT 1 are replaced"""
+        connection_pool = pool.ConnectionPool(health_check_interval=0)
+        first = connection_pool.acquire(self.connect)
+        connection_pool.release(first)
+        first.broken = True
+
+        second = connection_pool.acquire(self.connect)
+
+        self.assertIsNot(second, first)
+        self.assertTrue(first.closed)
+        self.assertEqual(connection_pool.stats()["discarded"], 1)
+        connection_pool.release(second)
+        self.assertIs(connection_pool.acquire(self.connect), second)
+        self.assertEqual(second.executed, ["SELECT 1"])
+
+    def test_release_rolls_back(self):
+        """Test connections are returned outside any transaction"""
+        connection_pool = pool.ConnectionPool()
+        connection = connection_pool.acquire(self.connect)
+        connection.info.transaction_status = extensions.TRANSACTION_STATUS_INTRANS
+
+        connection_pool.release(connection)
+
+        self.assertEqual(
+            connection.info.transaction_status, extensions.TRANSACTION_STATUS_IDLE
+        )
+        self.assertEqual(connection_pool.stats()["idle"], 1)
+
+    def test_release_discards_broken(self):
+        """Test connections in an unknown state are closed"""
+        connection_pool = pool.ConnectionPool()
+        connection = connection_pool.acquire(self.connect)
+        connection.info.transaction_status = extensions.TRANSACTION_STATUS_UNKNOWN
+
+        connection_pool.release(connection)
+
+        self.assertTrue(connection.closed)
+        self.assertEqual(connection_pool.stats()["size"], 0)
+
+    def test_failed_connect(self):
+        """Test a failed connect frees its place in the pool"""
+        connection_pool = pool.ConnectionPool(max_size=1, timeout=0)
+
+        def fail():
+            raise psycopg2.OperationalError("could not connect")
+
+        with self.assertRaises(psycopg2.OperationalError):
+            connection_pool.acquire(fail)
+        connection_pool.acquire(self.connect)
+
+
+@patch("psycopg2.extras.register_default_jsonb")
+@patch("django.db.backends.postgresql.base.Database.connect")
+class PooledBackendTests(SimpleTestCase):
+    """Test the database backend takes connections from the pool"""
+
+    def setUp(self):
+        self.wrappers = []
+
+    def tearDown(self):
+        for wrapper in self.wrappers:
+            wrapper.close()
+        pool.close_all()
+
+    def wrapper(self, **pool_settings):
+        settings_dict = {
+            **connections["default"].settings_dict,
+            "ENGINE": "core.db.backends.pooled",
+            "NAME": "pooled",
+            "POOL": pool_settings,
+        }
+        wrapper = DatabaseWrapper(settings_dict, alias=f"pooled-{id(self)}")
+        self.wrappers.append(wrapper)
+        return wrapper
+
+    def test_close_returns_connection(self, connect, _):
+        """Test closing a connection hands it back to the pool"""
+        connect.side_effect = fake_connect
+        wrapper = self.wrapper()
+
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close()
+        wrapper.ensure_connection()
+
+        self.assertIs(wrapper.connection, raw)
+        self.assertFalse(raw.closed)
+        self.assertEqual(connect.call_count, 1)
+
+    def test_shared_between_threads(self, connect, _):
+        """Test every thread's connection wrapper shares one pool"""
+        connect.side_effect = fake_connect
+        first, second = self.wrapper(MAX_SIZE=5), self.wrapper(MAX_SIZE=5)
+
+        first.ensure_connection()
+        second.ensure_connection()
+        first.close()
+        second.close()
+
+        stats = first._pool.stats()
+        self.assertIs(first._pool, second._pool)
+        self.assertEqual(stats["size"], 2)
+        self.assertEqual(stats["idle"], 2)
+        self.assertEqual(stats["max_size"], 5)
+
+    def test_close_in_atomic_block(self, connect, _):
+        """Test a connection closed inside atomic() is not reused"""
+        connect.side_effect = fake_connect
+        wrapper = self.wrapper()
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+
+        wrapper.in_atomic_block = True
+        wrapper.close()
+        wrapper.in_atomic_block = False
+
+        self.assertTrue(raw.closed)
+        self.assertEqual(wrapper._pool.stats()["size"], 0)
+
+    def test_metrics(self, connect, _):
+        """Test pool usage is reported to Prometheus"""
+        connect.side_effect = fake_connect
+        wrapper = self.wrapper()
+        wrapper.ensure_connection()
+
+        body, _ = metrics.exposition()
+
+        self.assertIn(f'db_pool_in_use{{alias="{wrapper.alias}"', body.decode())
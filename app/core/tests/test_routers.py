@@ -0,0 +1,129 @@
+"""
+Tests for read replica routing
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.db import routers
+from core.middleware import ReplicaStickinessMiddleware
+from core.models import Recipe
+
+RECIPES_URL = reverse("recipe:recipe-list")
+COOKIE = ReplicaStickinessMiddleware.COOKIE
+
+
+def titles(res):
+    return sorted(recipe["title"] for recipe in res.data["results"])
+
+
+@override_settings(
+    DATABASE_REPLICAS=["replica"],
+    REPLICA_STICKY_SECONDS=5,
+    RECIPE_CACHE_RESPONSES=False,
+)
+class ReplicaRoutingTests(TransactionTestCase):
+    """Test reads go to the replica unless they must see recent writes"""
+
+    # Not TestCase: its transaction would send every read to the primary
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.recipe = Recipe.objects.using("default").create(title="On primary")
+        Recipe.objects.using("replica").create(title="On replica")
+
+    def test_reads_from_replica(self):
+        """Test reads go to the replica"""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(titles(res), ["On replica"])
+        self.assertNotIn(COOKIE, res.cookies)
+
+    def test_reads_own_writes(self):
+        """Test a client that wrote reads from the primary for a while"""
+        res = self.client.post(RECIPES_URL, {"title": "New"}, format="json")
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.cookies[COOKIE]["max-age"], 5)
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(titles(res), ["New", "On primary"])
+
+        self.client.cookies[COOKIE] = str(time.time() - 1)
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(titles(res), ["On replica"])
+
+    def test_other_clients_read_replica(self):
+        """Test only the client that wrote is kept on the primary"""
+        self.client.post(RECIPES_URL, {"title": "New"}, format="json")
+
+        res = APIClient().get(RECIPES_URL)
+
+        self.assertEqual(titles(res), ["On replica"])
+
+    def test_write_requests_read_primary(self):
+        """Test a request that writes reads what it changes from the primary"""
+        Recipe.objects.using("replica").update(title="Stale")
+        url = reverse("recipe:recipe-detail", args=[self.recipe.id])
+
+        res = self.client.patch(url, {"title": "Renamed"}, format="json")
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            Recipe.objects.using("default").get(pk=self.recipe.id).title, "Renamed"
+        )
+        self.assertEqual(Recipe.objects.using("replica").get().title, "Stale")
+
+    def test_forged_cookie(self):
+        """Test clients can't pin themselves for longer than the window"""
+        self.client.cookies[COOKIE] = str(time.time() + 3600)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(titles(res), ["On replica"])
+
+    def test_transactions_read_primary(self):
+        """Test reads inside a transaction on the primary go to it"""
+        with transaction.atomic():
+            self.assertEqual(Recipe.objects.get().title, "On primary")
+        with routers.use_primary():
+            self.assertEqual(Recipe.objects.get().title, "On primary")
+
+    def test_reads_outside_requests_use_primary(self):
+        """Test code outside requests and jobs, e.g. commands, reads the primary"""
+        self.assertEqual(Recipe.objects.get().title, "On primary")
+
+        token = routers.activate()
+        try:
+            self.assertEqual(Recipe.objects.get().title, "On replica")
+            self.assertEqual(Recipe.objects.get().title, "On replica")
+        finally:
+            routers.deactivate(token)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        """Test everything goes to the primary without replicas"""
+        res = self.client.post(RECIPES_URL, {"title": "New"}, format="json")
+        self.assertNotIn(COOKIE, res.cookies)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(titles(res), ["New", "On primary"])
+
+    @override_settings(RECIPE_CACHE_RESPONSES=True, REPLICA_STICKY_SECONDS=0)
+    def test_replica_responses_cached_briefly(self):
+        """Test responses read from a replica expire with the sticky window"""
+        self.client.get(RECIPES_URL)
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res["X-Cache"], "MISS")
+
+        with self.settings(DATABASE_REPLICAS=[]):
+            self.client.get(RECIPES_URL)
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(res["X-Cache"], "HIT")
@@ -0,0 +1,144 @@
+"""
+Tests for the precomputed OpenAPI schema
+"""
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from unittest.mock import patch
+
+import yaml
+from django.conf import settings
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import schema
+
+SCHEMA_URL = reverse("api-schema")
+JSON_SCHEMA_URL = reverse("api-json")
+
+
+class SchemaTests(SimpleTestCase):
+    """Test serving the schema"""
+
+    def setUp(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        overrides = override_settings(SCHEMA_CACHE_DIR=cache_dir)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        schema.clear()
+        self.addCleanup(schema.clear)
+        self.cache_dir = cache_dir
+        self.client = APIClient()
+
+    def test_schema_formats(self):
+        """Test the schema is served as YAML or JSON"""
+        yaml_res = self.client.get(SCHEMA_URL)
+        json_res = self.client.get(JSON_SCHEMA_URL)
+        negotiated = self.client.get(SCHEMA_URL, HTTP_ACCEPT="application/json")
+
+        self.assertEqual(yaml_res.status_code, 200)
+        self.assertEqual(yaml_res["Content-Type"], "application/vnd.oai.openapi")
+        self.assertEqual(
+            json_res["Content-Type"], "application/vnd.oai.openapi+json"
+        )
+        self.assertEqual(negotiated["Content-Type"], "application/json")
+        document = yaml.safe_load(yaml_res.content)
+        self.assertEqual(document, json.loads(json_res.content))
+        self.assertEqual(document, json.loads(negotiated.content))
+        self.assertIn("/api/recipe/recipes/", document["paths"])
+
+    def test_generated_once(self):
+        """Test the schema is generated once and then kept in memory"""
+        with patch("core.schema.generate", wraps=schema.generate) as generate:
+            self.client.get(SCHEMA_URL)
+            self.client.get(SCHEMA_URL)
+            self.client.get(JSON_SCHEMA_URL)
+
+        self.assertEqual(generate.call_count, 1)
+
+    def test_read_from_disk(self):
+        """Test a schema already on disk is served without generating it"""
+        first = self.client.get(SCHEMA_URL)
+        schema.clear()
+
+        with patch("core.schema.generate") as generate:
+            second = self.client.get(SCHEMA_URL)
+
+        generate.assert_not_called()
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(
+            sorted(os.listdir(self.cache_dir)),
+            [f"schema-{schema.code_hash()}.json", f"schema-{schema.code_hash()}.yaml"],
+        )
+
+    def test_keyed_by_code(self):
+        """Test different code gets its own schema"""
+        with override_settings(SCHEMA_CODE_HASH="old"):
+            self.client.get(SCHEMA_URL)
+
+        with patch("core.schema.generate", wraps=schema.generate) as generate:
+            with override_settings(SCHEMA_CODE_HASH="new"):
+                self.client.get(SCHEMA_URL)
+
+        self.assertEqual(generate.call_count, 1)
+        self.assertTrue(os.path.exists(f"{self.cache_dir}/schema-new.yaml"))
+
+    def test_etag(self):
+        """Test the schema is answered with 304 while unchanged"""
+        res = self.client.get(SCHEMA_URL)
+
+        not_modified = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=res["ETag"])
+        json_res = self.client.get(JSON_SCHEMA_URL, HTTP_IF_NONE_MATCH=res["ETag"])
+
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b"")
+        self.assertEqual(not_modified["ETag"], res["ETag"])
+        self.assertEqual(json_res.status_code, 200)
+        self.assertNotEqual(json_res["ETag"], res["ETag"])
+        self.assertIn("no-cache", res["Cache-Control"])
+
+    def test_build_schema_command(self):
+        """Test the schema can be built ahead of the first request"""
+        out = io.StringIO()
+
+        call_command("build_schema", stdout=out)
+
+        self.assertIn(f"schema-{schema.code_hash()}.yaml", out.getvalue())
+        schema.clear()
+        with patch("core.schema.generate") as generate:
+            res = self.client.get(JSON_SCHEMA_URL)
+        generate.assert_not_called()
+        self.assertEqual(res.status_code, 200)
+
+    def test_unwritable_cache_dir(self):
+        """Test the schema is still served if it cannot be saved"""
+        with override_settings(SCHEMA_CACHE_DIR=os.devnull):
+            with self.assertLogs("core.schema", "WARNING"):
+                res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res.status_code, 200)
+
+    def test_spectacular_imported_lazily(self):
+        """Test loading the URLs does not import drf-spectacular's views"""
+        code = (
+            "import sys, django; django.setup(); import app.urls; "
+            "print('drf_spectacular.generators' in sys.modules)"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, "REQUEST_LOG_LEVEL": "ERROR"},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        self.assertEqual(result.stdout.strip(), "False")
@@ -0,0 +1,82 @@
+"""
+Per-request timings, collected by core.middleware.ServerTimingMiddleware
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+
+MAX_RECORDED_QUERIES = 1000
+
+_current = contextvars.ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    """Durations, in seconds, and the queries of one request"""
+
+    def __init__(self):
+        self.durations = {}
+        self.query_count = 0
+        self.query_time = 0.0
+        self.queries = []
+
+    def add(self, name, seconds):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def record_query(self, seconds, sql):
+        self.query_count += 1
+        self.query_time += seconds
+        if len(self.queries) < MAX_RECORDED_QUERIES:
+            self.queries.append((seconds, sql))
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper adding every query to the current timings"""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.record_query(time.perf_counter() - started, sql)
+
+
+def install(connection, **kwargs):
+    """
+    Add `record_query` to a database connection, for the connection_created
+    signal.
+
+    Connections are per thread, and under ASGI queries run in worker
+    threads rather than the one handling the request, so rather than
+    wrapping the connections of the request's thread the wrapper stays on
+    every connection and finds the request through a context variable.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def current():
+    """Return the timings of the request being handled, if any"""
+    return _current.get()
+
+
+def activate(timings):
+    return _current.set(timings)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+@contextmanager
+def timed(name):
+    """Add the time spent in the block to the current request's `name`"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
@@ -0,0 +1,101 @@
+import functools
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_GET
+from django.views.static import serve
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import metrics, schema
+from recipe import images
+from recipe.conditional import is_not_modified, not_modified
+
+# A year, the longest max-age caches are expected to honour
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+@require_GET
+def metrics_view(request):
+    """Expose request metrics to Prometheus"""
+    body, content_type = metrics.exposition()
+    return HttpResponse(body, content_type=content_type)
+
+
+@require_GET
+def media_view(request, path):
+    """
+    Serve an uploaded or generated file from MEDIA_ROOT, in development
+    only: in production the web server or a storage backend serves them.
+    Content-hashed images never change, so clients and proxies may keep
+    them for good.
+    """
+    if not settings.DEBUG:
+        raise Http404("Media files are not served by the application")
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if response.status_code == 200 and images.is_immutable(path):
+        patch_cache_control(
+            response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True
+        )
+    return response
+
+
+class SchemaView(APIView):
+    """
+    OpenApi3 schema for this API. Format can be selected via content negotiation.
+
+    - YAML: application/vnd.oai.openapi
+    - JSON: application/vnd.oai.openapi+json
+    """
+
+    # Served precomputed from core.schema rather than generated per request
+
+    renderer_classes = [
+        schema.OpenApiYamlRenderer,
+        schema.OpenApiYamlRenderer2,
+        schema.OpenApiJsonRenderer,
+        schema.OpenApiJsonRenderer2,
+    ]
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "lang", str, enum=[code for code, _ in settings.LANGUAGES]
+            )
+        ],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    def get(self, request, *args, **kwargs):
+        document_format = request.accepted_renderer.document_format
+        body, current = schema.get_document(
+            document_format, request.query_params.get("lang")
+        )
+        if is_not_modified(request, current):
+            return not_modified(current)
+        response = Response(body, headers={"ETag": current})
+        response["Content-Disposition"] = (
+            f'inline; filename="schema.{request.accepted_renderer.format}"'
+        )
+        # Cached, but checked with the ETag on every use: new code means a
+        # new schema
+        patch_cache_control(response, no_cache=True)
+        return response
+
+
+class JSONSchemaView(SchemaView):
+    renderer_classes = [schema.OpenApiJsonRenderer, schema.OpenApiJsonRenderer2]
+
+
+@functools.lru_cache(maxsize=None)
+def _swagger_view():
+    from drf_spectacular.views import SpectacularSwaggerView
+
+    return SpectacularSwaggerView.as_view(url_name="api-schema")
+
+
+def docs_view(request, *args, **kwargs):
+    """Swagger UI for the schema, importing drf-spectacular's views on first use"""
+    return _swagger_view()(request, *args, **kwargs)
@@ -0,0 +1,19 @@
+"""
+gunicorn settings, read from the working directory (/app in the image)
+"""
+import os
+
+from prometheus_client import multiprocess
+
+
+def on_starting(server):
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path and os.path.isdir(path):
+        for entry in os.scandir(path):
+            if entry.is_file():
+                os.remove(entry.path)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
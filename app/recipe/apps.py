@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.core import checks
+from django.db.models.signals import m2m_changed
 
 
 class RecipeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipe'
+
+    def ready(self):
+        from core.models import Recipe
+        from recipe import cache, summary, throttling
+
+        m2m_changed.connect(summary.sync_links, sender=Recipe.ingredients.through)
+        checks.register(throttling.check_cache, checks.Tags.caches)
+        checks.register(cache.check_cache, checks.Tags.caches)
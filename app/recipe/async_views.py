@@ -0,0 +1,114 @@
+"""
+Async views for recipe and ingredient reads
+"""
+import asyncio
+
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from django.views import View
+from rest_framework.response import Response
+
+from recipe import cache as response_cache
+from recipe.conditional import is_not_modified, not_modified
+from recipe.views import IngredientViewSet, RecipeViewSet
+
+
+class AsyncReadView(View):
+    """Serve the `action` ("list" or "retrieve") of a DRF viewset"""
+
+    viewset_class = None
+    action = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Django 4.0 only treats function views as async; 4.1 detects
+        # async handlers on class-based views itself.
+        markcoroutinefunction(view)
+        # Authentication is DRF's, which enforces CSRF itself
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        if asyncio.iscoroutine(response):
+            response = await response
+        return response
+
+    async def get(self, request, *args, **kwargs):
+        viewset = self.viewset_class(action_map={"get": self.action})
+        # Bound as ViewSetMixin.as_view does, for the Allow header
+        viewset.get = viewset.head = getattr(viewset, self.action)
+        viewset.args = args
+        viewset.kwargs = kwargs
+        drf_request = viewset.initialize_request(request, *args, **kwargs)
+        viewset.request = drf_request
+        viewset.headers = viewset.default_response_headers
+        try:
+            # Authentication, permissions and throttling may touch the
+            # database or the cache.
+            await sync_to_async(viewset.initial)(drf_request, *args, **kwargs)
+            response = await self.read(viewset, drf_request)
+        except Exception as exc:
+            response = viewset.handle_exception(exc)
+        response = viewset.finalize_response(drf_request, response, *args, **kwargs)
+        if response.accepted_renderer.format == "api":
+            # The browsable API renders forms from the database
+            return await sync_to_async(response.render)()
+        return response.render()
+
+    async def read(self, viewset, request):
+        key, entry = await sync_to_async(self.cache_lookup)(viewset, request)
+        if entry is not None:
+            return viewset.cached_response(request, entry)
+
+        if self.action == "list":
+            rows, paginated, current = await sync_to_async(viewset.read_list)()
+        else:
+            row, current = await sync_to_async(viewset.read_object)()
+            rows = [row]
+
+        if is_not_modified(request, current):
+            return not_modified(current)
+        data = await sync_to_async(viewset.serialize_rows)(rows)
+        if self.action == "list":
+            response = viewset.list_response(data, paginated, current)
+        else:
+            response = Response(data[0], headers={"ETag": current})
+
+        if key is not None:
+            await sync_to_async(viewset.store_response)(key, response)
+        return response
+
+    def cache_lookup(self, viewset, request):
+        key = viewset.cache_key(request)
+        if key is None:
+            return None, None
+        return key, response_cache.get_response(key)
+
+
+class RecipeListView(AsyncReadView):
+    """List recipes"""
+
+    viewset_class = RecipeViewSet
+    action = "list"
+
+
+class RecipeDetailView(AsyncReadView):
+    """Retrieve a recipe"""
+
+    viewset_class = RecipeViewSet
+    action = "retrieve"
+
+
+class IngredientListView(AsyncReadView):
+    """List ingredients"""
+
+    viewset_class = IngredientViewSet
+    action = "list"
+
+
+class IngredientDetailView(AsyncReadView):
+    """Retrieve an ingredient"""
+
+    viewset_class = IngredientViewSet
+    action = "retrieve"
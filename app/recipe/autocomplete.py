@@ -0,0 +1,212 @@
+"""
+In-process ingredient autocomplete index
+"""
+import heapq
+import math
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.db.models import Count
+
+from core.models import Ingredient
+
+DEFAULT_TTL = 300
+MIN_SIMILARITY = 0.3
+RESULT_CACHE_SIZE = 1024
+
+
+def trigrams(text):
+    """Return the set of trigrams of `text`, padded like pg_trgm"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class IngredientIndex:
+    """Prefix and trigram index over ingredient names"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built_at = None
+        self._names = {}
+        self._usage = {}
+        self._sizes = {}
+        self._sorted = []
+        self._trigrams = defaultdict(set)
+        self._results = OrderedDict()
+
+    def _ttl(self):
+        return getattr(settings, "INGREDIENT_AUTOCOMPLETE_TTL", DEFAULT_TTL)
+
+    def _ensure_built(self):
+        built_at = self._built_at
+        if built_at is None or time.monotonic() - built_at > self._ttl():
+            self.build()
+
+    def build(self):
+        """(Re)load every ingredient and its recipe count from the database"""
+        rows = list(
+            Ingredient.objects.annotate(usage=Count("recipe")).values_list(
+                "id", "name", "usage"
+            )
+        )
+        with self._lock:
+            self._names = {}
+            self._usage = {}
+            self._sizes = {}
+            self._sorted = []
+            self._trigrams = defaultdict(set)
+            self._results.clear()
+            for ingredient_id, name, usage in rows:
+                self._insert(ingredient_id, name)
+                self._usage[ingredient_id] = usage
+            self._sorted.sort()
+            self._built_at = time.monotonic()
+
+    def _insert(self, ingredient_id, name, keep_sorted=False):
+        self._results.clear()
+        key = name.lower()
+        self._names[ingredient_id] = name
+        if keep_sorted:
+            insort(self._sorted, (key, ingredient_id))
+        else:
+            self._sorted.append((key, ingredient_id))
+        name_trigrams = trigrams(key)
+        self._sizes[ingredient_id] = len(name_trigrams)
+        for trigram in name_trigrams:
+            self._trigrams[trigram].add(ingredient_id)
+
+    def _discard(self, ingredient_id):
+        name = self._names.pop(ingredient_id, None)
+        if name is None:
+            return
+        self._results.clear()
+        del self._sizes[ingredient_id]
+        key = name.lower()
+        position = bisect_left(self._sorted, (key, ingredient_id))
+        if position < len(self._sorted) and self._sorted[position] == (
+            key,
+            ingredient_id,
+        ):
+            del self._sorted[position]
+        for trigram in trigrams(key):
+            postings = self._trigrams.get(trigram)
+            if postings is not None:
+                postings.discard(ingredient_id)
+                if not postings:
+                    del self._trigrams[trigram]
+
+    def upsert(self, ingredient_id, name):
+        """Add an ingredient or rename an existing one"""
+        with self._lock:
+            if self._built_at is None or self._names.get(ingredient_id) == name:
+                return
+            self._discard(ingredient_id)
+            self._insert(ingredient_id, name, keep_sorted=True)
+            self._usage.setdefault(ingredient_id, 0)
+
+    def remove(self, ingredient_id):
+        """Drop an ingredient from the index"""
+        with self._lock:
+            if self._built_at is None:
+                return
+            self._discard(ingredient_id)
+            self._usage.pop(ingredient_id, None)
+
+    def adjust_usage(self, added=(), removed=()):
+        """Record ingredients being linked to or unlinked from a recipe"""
+        with self._lock:
+            if self._built_at is None:
+                return
+            self._results.clear()
+            for ingredient_id in added:
+                if ingredient_id in self._usage:
+                    self._usage[ingredient_id] += 1
+            for ingredient_id in removed:
+                if ingredient_id in self._usage:
+                    self._usage[ingredient_id] -= 1
+
+    def _prefix_matches(self, key):
+        position = bisect_left(self._sorted, (key,))
+        while position < len(self._sorted):
+            name, ingredient_id = self._sorted[position]
+            if not name.startswith(key):
+                break
+            yield ingredient_id
+            position += 1
+
+    def _fuzzy_matches(self, key, exclude):
+        # A name can only reach MIN_SIMILARITY if it shares at least
+        # `needed` trigrams with the query, so it must appear in one of the
+        # len(query) - needed + 1 rarest posting lists. Only those lists are
+        # scanned for candidates, which skips the huge lists of common
+        # trigrams such as "  s".
+        postings = sorted(
+            (self._trigrams.get(trigram, ()) for trigram in trigrams(key)), key=len
+        )
+        needed = max(1, math.ceil(MIN_SIMILARITY * len(postings)))
+        candidates = set()
+        for posting in postings[: len(postings) - needed + 1]:
+            candidates.update(posting)
+
+        for ingredient_id in candidates - exclude:
+            shared = sum(1 for posting in postings if ingredient_id in posting)
+            size = self._sizes[ingredient_id]
+            similarity = shared / (len(postings) + size - shared)
+            if similarity >= MIN_SIMILARITY:
+                yield similarity, ingredient_id
+
+    def search(self, query, limit=10):
+        """
+        Return up to `limit` suggestions for `query`.
+
+        Prefix matches come first, most used first. Remaining slots are
+        filled with trigram matches ordered by similarity, then usage.
+        """
+        key = query.strip().lower()
+        if not key or limit <= 0:
+            return []
+
+        self._ensure_built()
+        with self._lock:
+            cached = self._results.get((key, limit))
+            if cached is not None:
+                self._results.move_to_end((key, limit))
+                return cached
+
+            usage = self._usage
+            matches = heapq.nsmallest(
+                limit,
+                self._prefix_matches(key),
+                key=lambda i: (-usage[i], self._names[i].lower(), i),
+            )
+            if len(matches) < limit:
+                fuzzy = heapq.nlargest(
+                    limit - len(matches),
+                    self._fuzzy_matches(key, set(matches)),
+                    key=lambda match: (match[0], usage[match[1]], -match[1]),
+                )
+                matches += [ingredient_id for _, ingredient_id in fuzzy]
+
+            suggestions = [
+                {
+                    "id": ingredient_id,
+                    "name": self._names[ingredient_id],
+                    "recipe_count": usage[ingredient_id],
+                }
+                for ingredient_id in matches
+            ]
+            self._results[(key, limit)] = suggestions
+            if len(self._results) > RESULT_CACHE_SIZE:
+                self._results.popitem(last=False)
+            return suggestions
+
+    def reset(self):
+        """Forget the index so that it is rebuilt on next use"""
+        with self._lock:
+            self._built_at = None
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,325 @@
+"""
+In-process benchmark of the recipe API
+"""
+import math
+import random
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.models import Recipe, Ingredient
+from recipe.autocomplete import ingredient_index
+from recipe.loader import RecipeLoader
+from recipe.service import RecipeService
+from recipe.throttling import TokenBucketThrottle
+from recipe.views import RecipeViewSet
+
+# Throttle every request as usual, but never reject one
+UNLIMITED_RATES = {"read": "1000000000/s", "write": "1000000000/s"}
+
+WORDS = (
+    "apple basil bean beef butter carrot cheese chicken chili curry garlic "
+    "ginger lemon lentil mushroom noodle onion pepper potato rice salmon tomato"
+).split()
+
+
+def seed(recipes, ingredients_per_recipe, ingredient_pool=None, rng=None):
+    """Insert a generated catalogue of recipes and ingredients"""
+    rng = rng or random.Random(0)
+    pool = ingredient_pool or max(ingredients_per_recipe * 10, 100)
+    names = [f"{rng.choice(WORDS)} {i}" for i in range(pool)]
+    rows = (
+        (
+            f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {i}",
+            " ".join(rng.choices(WORDS, k=12)),
+            rng.sample(names, min(ingredients_per_recipe, pool)),
+        )
+        for i in range(recipes)
+    )
+    RecipeLoader().load(rows)
+
+
+def percentile(ordered, percent):
+    """Nearest-rank percentile of an ascending list"""
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Scenario:
+    """
+    One thing to time.
+
+    `prepare(count)` runs untimed and returns one argument per call of
+    `call`, e.g. a fresh recipe for every delete.
+    """
+
+    def __init__(self, name, call, prepare=None):
+        self.name = name
+        self.call = call
+        self.prepare = prepare or (lambda count: [None] * count)
+
+    def measure(self, iterations, warmup):
+        arguments = self.prepare(warmup + iterations + 1)
+        # The log is capped, so a full one would hide the queries counted
+        connection.queries_log.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.call(arguments.pop())
+        query_count = len(queries)
+        for argument in arguments[:warmup]:
+            self.call(argument)
+
+        timings = []
+        for argument in arguments[warmup:]:
+            started = time.perf_counter_ns()
+            self.call(argument)
+            timings.append((time.perf_counter_ns() - started) / 1e6)
+
+        ordered = sorted(timings)
+        return {
+            "iterations": len(timings),
+            "p50_ms": round(percentile(ordered, 50), 3),
+            "p95_ms": round(percentile(ordered, 95), 3),
+            "p99_ms": round(percentile(ordered, 99), 3),
+            "mean_ms": round(sum(timings) / len(timings), 3),
+            "throughput_per_s": round(len(timings) / (sum(timings) / 1e3), 1),
+            "queries": query_count,
+        }
+
+
+def _expect(response, status_code):
+    if response.status_code != status_code:
+        raise AssertionError(
+            f"{response.request['REQUEST_METHOD']} {response.request['PATH_INFO']}"
+            f" returned {response.status_code}, expected {status_code}"
+        )
+    return response
+
+
+def scenarios(rng):
+    """Return every scenario, in the order they are run"""
+    client = APIClient()
+    service = RecipeService()
+    recipes_url = reverse("recipe:recipe-list")
+    ingredients_url = reverse("recipe:ingredient-list")
+
+    def recipe_url(pk):
+        return reverse("recipe:recipe-detail", args=[pk])
+
+    def ingredient_url(pk):
+        return reverse("recipe:ingredient-detail", args=[pk])
+
+    recipe_ids = list(Recipe.objects.values_list("id", flat=True))
+    ingredient_ids = list(Ingredient.objects.values_list("id", flat=True))
+    counter = iter(range(10**9))
+
+    def get(url, params=None):
+        return lambda _: _expect(client.get(url, params), 200)
+
+    def random_recipe(count):
+        return [rng.choice(recipe_ids) for _ in range(count)]
+
+    def new_recipe_payload(_=None):
+        n = next(counter)
+        return {
+            "title": f"Benchmark {n}",
+            "description": "Benchmark recipe",
+            "ingredients": [{"name": rng.choice(WORDS)}, {"name": f"extra {n}"}],
+        }
+
+    def fresh_recipes(count):
+        return [
+            service.create(new_recipe_payload()).pk for _ in range(count)
+        ]
+
+    def fresh_ingredients(count):
+        return [
+            Ingredient.objects.create(name=f"Disposable {next(counter)}").pk
+            for _ in range(count)
+        ]
+
+    throttle = TokenBucketThrottle()
+    throttled_request = Request(APIRequestFactory().post(recipes_url))
+    throttled_view = RecipeViewSet(basename="recipe", action="create")
+
+    def pantry_params(count):
+        return [
+            {"ingredients": ",".join(map(str, rng.sample(ingredient_ids, 5)))}
+            for _ in range(count)
+        ]
+
+    return [
+        Scenario("recipe.list", get(recipes_url)),
+        Scenario("recipe.list.expand", get(recipes_url, {"expand": "ingredients"})),
+        Scenario("recipe.list.fields", get(recipes_url, {"fields": "id,title"})),
+        Scenario(
+            "recipe.list.search",
+            lambda word: _expect(client.get(recipes_url, {"search": word}), 200),
+            lambda count: rng.choices(WORDS, k=count),
+        ),
+        Scenario(
+            "recipe.list.ingredients",
+            lambda pk: _expect(client.get(recipes_url, {"ingredients": pk}), 200),
+            lambda count: rng.choices(ingredient_ids, k=count),
+        ),
+        Scenario(
+            "recipe.retrieve",
+            lambda pk: _expect(client.get(recipe_url(pk)), 200),
+            random_recipe,
+        ),
+        Scenario(
+            "recipe.create",
+            lambda payload: _expect(
+                client.post(recipes_url, payload, format="json"), 201
+            ),
+            lambda count: [new_recipe_payload() for _ in range(count)],
+        ),
+        Scenario(
+            "recipe.update",
+            lambda pk: _expect(
+                client.put(recipe_url(pk), new_recipe_payload(), format="json"), 200
+            ),
+            random_recipe,
+        ),
+        Scenario(
+            "recipe.partial_update",
+            lambda pk: _expect(
+                client.patch(recipe_url(pk), {"title": "Renamed"}, format="json"),
+                200,
+            ),
+            random_recipe,
+        ),
+        Scenario(
+            "recipe.destroy",
+            lambda pk: _expect(client.delete(recipe_url(pk)), 204),
+            fresh_recipes,
+        ),
+        Scenario(
+            "recipe.pantry",
+            lambda params: _expect(
+                client.get(reverse("recipe:recipe-pantry"), params), 200
+            ),
+            pantry_params,
+        ),
+        Scenario(
+            "recipe.bulk",
+            lambda items: _expect(
+                client.post(reverse("recipe:recipe-bulk"), items, format="json"),
+                200,
+            ),
+            lambda count: [
+                [{"op": "create", **new_recipe_payload()} for _ in range(50)]
+                for _ in range(count)
+            ],
+        ),
+        Scenario(
+            "recipe.export",
+            lambda _: b"".join(
+                _expect(client.get(reverse("recipe:recipe-export")), 200)
+            ),
+        ),
+        Scenario("ingredient.list", get(ingredients_url)),
+        Scenario(
+            "ingredient.update",
+            lambda pk: _expect(
+                client.put(
+                    ingredient_url(pk), {"name": f"Renamed {pk}"}, format="json"
+                ),
+                200,
+            ),
+            fresh_ingredients,
+        ),
+        Scenario(
+            "ingredient.partial_update",
+            lambda pk: _expect(
+                client.patch(
+                    ingredient_url(pk),
+                    {"name": f"Patched {next(counter)}"},
+                    format="json",
+                ),
+                200,
+            ),
+            lambda count: rng.choices(ingredient_ids, k=count),
+        ),
+        Scenario(
+            "ingredient.destroy",
+            lambda pk: _expect(client.delete(ingredient_url(pk)), 204),
+            fresh_ingredients,
+        ),
+        Scenario(
+            "ingredient.autocomplete",
+            lambda q: _expect(
+                client.get(reverse("recipe:ingredient-autocomplete"), {"q": q}),
+                200,
+            ),
+            lambda count: [
+                rng.choice(WORDS)[: rng.randint(2, 5)] for _ in range(count)
+            ],
+        ),
+        Scenario(
+            "throttle.allow_request",
+            lambda _: throttle.allow_request(throttled_request, throttled_view),
+        ),
+        Scenario(
+            "service.create",
+            lambda payload: service.create(payload),
+            lambda count: [new_recipe_payload() for _ in range(count)],
+        ),
+        Scenario(
+            "service.update",
+            lambda pk: service.update(
+                Recipe.objects.get(pk=pk), new_recipe_payload()
+            ),
+            random_recipe,
+        ),
+    ]
+
+
+def run(
+    recipes=1000,
+    ingredients_per_recipe=5,
+    iterations=100,
+    warmup=10,
+    seed_value=0,
+    only=None,
+    cache_responses=False,
+):
+    """Seed the database, run the scenarios and return the report"""
+    rng = random.Random(seed_value)
+    started = time.perf_counter()
+    seed(recipes, ingredients_per_recipe, rng=rng)
+    seeded_in = time.perf_counter() - started
+    ingredient_index.reset()
+
+    results = {}
+    with override_settings(
+        RECIPE_CACHE_RESPONSES=cache_responses,
+        REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK,
+            "DEFAULT_THROTTLE_RATES": UNLIMITED_RATES,
+        },
+    ):
+        for scenario in scenarios(rng):
+            if only and not any(scenario.name.startswith(o) for o in only):
+                continue
+            results[scenario.name] = scenario.measure(iterations, warmup)
+
+    return {
+        "dataset": {
+            "database": connection.vendor,
+            "recipes": recipes,
+            "ingredients_per_recipe": ingredients_per_recipe,
+            "seed": seed_value,
+            "seed_seconds": round(seeded_in, 3),
+        },
+        "settings": {
+            "iterations": iterations,
+            "warmup": warmup,
+            "cache_responses": cache_responses,
+        },
+        "results": results,
+    }
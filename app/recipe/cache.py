@@ -0,0 +1,139 @@
+"""
+Versioned response cache for recipe reads
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.db import transaction
+
+from core.db import routers
+
+TABLE_VERSION_KEY = "recipe:version"
+HITS_KEY = "recipe:cache:hits"
+MISSES_KEY = "recipe:cache:misses"
+RESPONSE_TIMEOUT = 60 * 60 * 24
+# Backends whose entries are per process, or whose incr() is a read and a
+# write that concurrent bumps can interleave, losing an invalidation
+UNSUPPORTED_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+    "django.core.cache.backends.filebased.FileBasedCache",
+    "django.core.cache.backends.db.DatabaseCache",
+)
+
+
+def _alias():
+    return getattr(settings, "RECIPE_CACHE_ALIAS", "default")
+
+
+def _cache():
+    return caches[_alias()]
+
+
+def is_enabled():
+    return getattr(settings, "RECIPE_CACHE_RESPONSES", True)
+
+
+def _recipe_version_key(recipe_id):
+    return f"recipe:version:{recipe_id}"
+
+
+def _get_version(key):
+    cache = _cache()
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock rather than 1 so that a version evicted from
+        # the cache can never come back as a number used before.
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(keys):
+    cache = _cache()
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), timeout=None)
+
+
+def _incr(key):
+    cache = _cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def _digest(request):
+    return hashlib.md5(request.get_full_path().encode()).hexdigest()
+
+
+def list_key(request):
+    """Return the cache key for a recipe list request"""
+    version = _get_version(TABLE_VERSION_KEY)
+    return f"recipe:list:{version}:{_digest(request)}"
+
+
+def detail_key(request, recipe_id):
+    """Return the cache key for a recipe detail request"""
+    version = _get_version(_recipe_version_key(recipe_id))
+    return f"recipe:detail:{recipe_id}:{version}:{_digest(request)}"
+
+
+def get_response(key):
+    """Return the cached response data for `key`, or None"""
+    data = _cache().get(key)
+    _incr(MISSES_KEY if data is None else HITS_KEY)
+    return data
+
+
+def set_response(key, data):
+    timeout = RESPONSE_TIMEOUT
+    if routers.read_replica():
+        timeout = settings.REPLICA_STICKY_SECONDS
+    _cache().set(key, data, timeout=timeout)
+
+
+def invalidate_recipes(recipe_ids=()):
+    """
+    Invalidate the recipe list and the given recipes once the current
+    transaction commits.
+    """
+    keys = [TABLE_VERSION_KEY] + [_recipe_version_key(pk) for pk in recipe_ids]
+    transaction.on_commit(lambda: _bump(keys))
+
+
+def stats():
+    """Return the hit and miss counters"""
+    counters = _cache().get_many([HITS_KEY, MISSES_KEY])
+    return {
+        "hits": counters.get(HITS_KEY, 0),
+        "misses": counters.get(MISSES_KEY, 0),
+    }
+
+
+def check_cache(app_configs=None, **kwargs):
+    """System check that cached responses are invalidated in every worker"""
+    if settings.DEBUG or getattr(settings, "TESTING", False):
+        return []
+    if not is_enabled():
+        return []
+    backend = settings.CACHES[_alias()]["BACKEND"]
+    if backend not in UNSUPPORTED_BACKENDS:
+        return []
+    return [
+        checks.Error(
+            f"Recipe responses are cached in {backend}, where invalidations "
+            "are not seen by every worker process or can be lost.",
+            hint=(
+                "Point RECIPE_CACHE_ALIAS at Redis or memcached, whose "
+                "increments are atomic, or set RECIPE_CACHE_RESPONSES to False."
+            ),
+            id="recipe.E002",
+        )
+    ]
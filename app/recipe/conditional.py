@@ -0,0 +1,246 @@
+"""
+Conditional request handling based on the `version` column
+"""
+import hashlib
+
+from django.db.models import prefetch_related_objects
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from core.timing import timed
+from recipe import cache as response_cache
+from recipe.service import VersionConflict
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = "The resource has been modified since it was fetched."
+    default_code = "precondition_failed"
+
+
+def _version(row):
+    """Return (pk, version) of a model instance or a values() row"""
+    if isinstance(row, dict):
+        return row["id"], row["version"]
+    return row.pk, row.version
+
+
+def etag(instance, model=None, variant=""):
+    """
+    Return the ETag of a versioned model instance, or of a values() row of
+    `model`.
+
+    `variant` tells apart representations of the same version, such as
+    sparse fieldsets. It is ignored when checking If-Match.
+    """
+    model = model or type(instance)
+    pk, version = _version(instance)
+    suffix = f";{variant}" if variant else ""
+    return f'"{model._meta.model_name}-{pk}-v{version}{suffix}"'
+
+
+def list_etag(instances, has_next=False, variant=""):
+    """Return the ETag of a page of versioned model instances or rows"""
+    digest = hashlib.md5()
+    for instance in instances:
+        digest.update("{}:{},".format(*_version(instance)).encode())
+    digest.update(b"next" if has_next else b"last")
+    if variant:
+        digest.update(f";{variant}".encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def _parse(header, weak=True):
+    """
+    Return the entity tags of a header, dropping weak ones unless `weak`
+    (If-Match uses the strong comparison, RFC 9110 13.1.1)
+    """
+    tags = set()
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            if not weak:
+                continue
+            tag = tag[2:]
+        if tag:
+            tags.add(tag)
+    return tags
+
+
+def _without_variant(tag):
+    if ";" not in tag:
+        return tag
+    return tag[: tag.index(";")] + '"'
+
+
+def is_not_modified(request, current_etag):
+    """Return whether the request's If-None-Match matches `current_etag`"""
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    tags = _parse(header)
+    return "*" in tags or current_etag in tags
+
+
+def not_modified(current_etag):
+    """Return an empty 304 response carrying the ETag"""
+    return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": current_etag})
+
+
+def expected_version(request, instance):
+    """
+    Check the request's If-Match header against the instance.
+
+    Returns the version the client expects to be overwriting, or None when
+    the request is unconditional. Raises PreconditionFailed if the client's
+    copy is already out of date.
+    """
+    header = request.headers.get("If-Match")
+    if not header:
+        return None
+    tags = {_without_variant(tag) for tag in _parse(header, weak=False)}
+    if "*" in tags:
+        return None
+    if etag(instance) not in tags:
+        raise PreconditionFailed()
+    return instance.version
+
+
+class ConditionalViewMixin:
+    """
+    ETag support for viewsets over versioned models.
+
+    `conditional_list` and `conditional_retrieve` compute the ETag from the
+    fetched rows and answer a matching If-None-Match with 304 before any
+    related objects are prefetched or serialized. Writes honour If-Match and
+    responses to creates and updates carry the new ETag.
+
+    The rows may be model instances or values() dicts, as long as
+    `serialize_rows` knows how to render them. Views that return a key from
+    `cache_key` also have their reads served from the response cache.
+    """
+
+    read_prefetch = ()
+
+    def get_read_prefetch(self):
+        return self.read_prefetch
+
+    def etag_variant(self):
+        """Return what tells this response apart from others of the rows"""
+        return ""
+
+    def serialize_rows(self, rows):
+        """Return the response data for a list of fetched rows"""
+        prefetch_related_objects(rows, *self.get_read_prefetch())
+        return self.get_serializer(rows, many=True).data
+
+    def if_match(self, instance):
+        """Return the version If-Match expects for `instance`, if any"""
+        return expected_version(self.request, instance)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, VersionConflict):
+            exc = PreconditionFailed()
+        return super().handle_exception(exc)
+
+    def read_list(self):
+        """
+        Fetch the rows of a list response.
+
+        Returns the rows, whether they are a page, and their ETag.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        rows = list(queryset) if page is None else page
+        current = list_etag(
+            rows,
+            getattr(self.paginator, "has_next", False),
+            variant=self.etag_variant(),
+        )
+        return rows, page is not None, current
+
+    def read_object(self):
+        """Fetch the row of a detail response; returns it and its ETag"""
+        queryset = self.get_queryset()
+        instance = self.get_object()
+        return instance, etag(instance, queryset.model, variant=self.etag_variant())
+
+    def list_response(self, data, paginated, current):
+        if paginated:
+            response = self.get_paginated_response(data)
+        else:
+            response = Response(data)
+        response["ETag"] = current
+        return response
+
+    def conditional_list(self, request):
+        rows, paginated, current = self.read_list()
+        if is_not_modified(request, current):
+            return not_modified(current)
+
+        with timed("serialize"):
+            data = self.serialize_rows(rows)
+        return self.list_response(data, paginated, current)
+
+    def conditional_retrieve(self, request):
+        instance, current = self.read_object()
+        if is_not_modified(request, current):
+            return not_modified(current)
+
+        with timed("serialize"):
+            data = self.serialize_rows([instance])[0]
+        return Response(data, headers={"ETag": current})
+
+    def cache_key(self, request):
+        """Return the response cache key for a read, or None not to cache it"""
+        return None
+
+    def cached(self, request, view):
+        """
+        Serve the response from the cache, filling it on a miss.
+
+        Entries hold the response data along with its ETag, so cached
+        responses can still be answered with 304.
+        """
+        key = self.cache_key(request)
+        if key is None:
+            return view(request)
+        entry = response_cache.get_response(key)
+        if entry is not None:
+            return self.cached_response(request, entry)
+        response = view(request)
+        self.store_response(key, response)
+        return response
+
+    def cached_response(self, request, entry):
+        data, current = entry
+        if is_not_modified(request, current):
+            response = not_modified(current)
+        else:
+            response = Response(data, headers={"ETag": current})
+        response["X-Cache"] = "HIT"
+        return response
+
+    def store_response(self, key, response):
+        if response.status_code == 200:
+            response_cache.set_response(key, (response.data, response["ETag"]))
+        response["X-Cache"] = "MISS"
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        self.written_instance = serializer.instance
+
+    def perform_update(self, serializer):
+        serializer.save(expected_version=self.if_match(serializer.instance))
+        self.written_instance = serializer.instance
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        response["ETag"] = etag(self.written_instance)
+        return response
+
+    def update(self, request, *args, **kwargs):
+        response = super().update(request, *args, **kwargs)
+        response["ETag"] = etag(self.written_instance)
+        return response
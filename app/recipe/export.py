@@ -0,0 +1,66 @@
+"""
+Streaming export of the recipe catalogue
+"""
+import csv
+import json
+
+from core.models import Recipe
+from recipe.rows import SUMMARY, attach_ingredients
+
+CHUNK_SIZE = 1000
+CSV_HEADER = ["id", "title", "description", "ingredient_ids", "ingredient_names"]
+
+
+def iter_recipes(chunk_size=CHUNK_SIZE):
+    """Yield every recipe as a dict with its ingredients, in id order"""
+    last_id = 0
+    while True:
+        recipes = list(
+            Recipe.objects.filter(pk__gt=last_id)
+            .order_by("pk")
+            .values("id", "title", "description", SUMMARY)[:chunk_size]
+        )
+        if not recipes:
+            return
+
+        attach_ingredients(recipes)
+        yield from recipes
+        last_id = recipes[-1]["id"]
+
+
+def iter_ndjson(recipes):
+    """Yield one JSON document per line"""
+    for recipe in recipes:
+        yield json.dumps(recipe, ensure_ascii=False) + "\n"
+
+
+class _Line:
+    """File-like object that hands back what csv.writer writes"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(recipes):
+    """Yield CSV lines, with ingredients as `|` separated columns"""
+    writer = csv.writer(_Line())
+    yield writer.writerow(CSV_HEADER)
+    for recipe in recipes:
+        ingredients = recipe["ingredients"]
+        yield writer.writerow(
+            [
+                recipe["id"],
+                recipe["title"],
+                recipe["description"],
+                "|".join(str(ingredient["id"]) for ingredient in ingredients),
+                "|".join(ingredient["name"] for ingredient in ingredients),
+            ]
+        )
+
+
+EXPORTERS = {"ndjson": iter_ndjson, "csv": iter_csv}
+
+
+def export(file_format, chunk_size=CHUNK_SIZE):
+    """Yield the whole catalogue as text in the given format"""
+    return EXPORTERS[file_format](iter_recipes(chunk_size))
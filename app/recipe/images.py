@@ -0,0 +1,91 @@
+"""
+Recipe images and their thumbnails
+"""
+import hashlib
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from recipe import thumbnails
+
+ORIGINAL = "original"
+DIRECTORY = "recipes"
+DEFAULT_SIZES = {"small": 160, "medium": 480, "large": 1200}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def sizes():
+    """Return {size name: longest side in pixels} of the thumbnails"""
+    return getattr(settings, "RECIPE_IMAGE_SIZES", DEFAULT_SIZES)
+
+
+def size_names():
+    return [ORIGINAL, *sizes()]
+
+
+def hashed_name(content, image_format):
+    """Return the storage name of an image file from its content"""
+    digest = hashlib.sha256()
+    for chunk in content.chunks() if hasattr(content, "chunks") else [content]:
+        digest.update(chunk)
+    extension = thumbnails.extension(image_format)
+    return f"{DIRECTORY}/{digest.hexdigest()[:32]}.{extension}"
+
+
+def store(content, image_format):
+    """Save an image under its content hash, returning its name"""
+    name = hashed_name(content, image_format)
+    if not default_storage.exists(name):
+        if isinstance(content, bytes):
+            content = ContentFile(content)
+        content.seek(0)
+        name = default_storage.save(name, content)
+    return name
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Spawned rather than forked: job workers run several threads
+            _executor = ProcessPoolExecutor(
+                max_workers=getattr(settings, "RECIPE_IMAGE_PROCESSES", None),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def make_thumbnails(name):
+    """
+    Render and store every thumbnail size of the stored image `name`,
+    returning {size name: storage name}
+    """
+    with default_storage.open(name, "rb") as original:
+        data = original.read()
+    futures = {
+        size: _pool().submit(thumbnails.make_thumbnail, data, pixels)
+        for size, pixels in sizes().items()
+    }
+    return {size: store(*future.result()) for size, future in futures.items()}
+
+
+def image_url(name, thumbnail_names, size=ORIGINAL):
+    """
+    Return the URL of an image at `size`, falling back to the original
+    until the thumbnail exists. URLs are relative to the site, so cached
+    responses can be served on any host name.
+    """
+    if not name:
+        return None
+    return default_storage.url(thumbnail_names.get(size) or name)
+
+
+def is_immutable(path):
+    """Whether a media path is a content-hashed image, safe to cache forever"""
+    return path.startswith(f"{DIRECTORY}/")
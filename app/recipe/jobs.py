@@ -0,0 +1,213 @@
+"""
+Database-backed queue of background jobs
+"""
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.db import routers
+from core.models import Job
+from recipe import export, images
+from recipe.serializers import RecipeDetailSerializer
+from recipe.service import IngredientService, RecipeService
+
+logger = logging.getLogger(__name__)
+
+CREATE = "recipe.create"
+BULK = "recipe.bulk"
+EXPORT = "recipe.export"
+THUMBNAILS = "recipe.thumbnails"
+REFRESH_RECIPES = "recipe.refresh_recipes"
+CLAIM_BATCH_SIZE = 10
+STALLED_CHECK_INTERVAL = 60
+DEFAULT_TIMEOUT = 1800
+DEFAULT_MAX_ATTEMPTS = 3
+
+_tasks = {}
+
+
+def task(kind, atomic=True):
+    """Register the decorated function as the task run for jobs of `kind`"""
+
+    def register(function):
+        _tasks[kind] = (function, atomic)
+        return function
+
+    return register
+
+
+def submit(kind, payload):
+    """Queue a job and return it"""
+    if kind not in _tasks:
+        raise ValueError(f"Unknown job kind: {kind}")
+    return Job.objects.create(kind=kind, payload=payload)
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def claim(worker=""):
+    """Mark the oldest queued job as running and return it, or None"""
+    with routers.use_primary():
+        while True:
+            candidates = list(
+                Job.objects.filter(status=Job.QUEUED)
+                .order_by("created_at")
+                .values_list("pk", flat=True)[:CLAIM_BATCH_SIZE]
+            )
+            if not candidates:
+                return None
+            for pk in candidates:
+                # Another worker may have taken it since the SELECT
+                claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+                    status=Job.RUNNING,
+                    worker=worker,
+                    started_at=timezone.now(),
+                    attempts=F("attempts") + 1,
+                )
+                if claimed:
+                    return Job.objects.get(pk=pk)
+
+
+def _finish(job, status, result=None, error=""):
+    """Record the outcome of a job, returning False if it was taken away"""
+    job.status = status
+    job.result = result
+    job.error = error
+    job.finished_at = timezone.now()
+    # Only the worker that claimed the job may record its outcome
+    return bool(
+        Job.objects.filter(pk=job.pk, status=Job.RUNNING, worker=job.worker).update(
+            status=status, result=result, error=error, finished_at=job.finished_at
+        )
+    )
+
+
+def run(job):
+    """Run a claimed job and record its outcome"""
+    function, atomic = _tasks[job.kind]
+    # One routing state per job, like a request: reads outside transactions
+    # go to a single replica
+    token = routers.activate()
+    try:
+        if atomic:
+            with transaction.atomic():
+                if not _finish(job, Job.SUCCEEDED, function(job)):
+                    # Requeued as stalled: its next run will do the work
+                    transaction.set_rollback(True)
+        else:
+            _finish(job, Job.SUCCEEDED, function(job))
+    except Exception as exc:
+        logger.exception("Job %s (%s) failed", job.pk, job.kind)
+        _finish(job, Job.FAILED, error=f"{type(exc).__name__}: {exc}")
+    finally:
+        routers.deactivate(token)
+    return job
+
+
+def requeue_stalled(timeout=None, max_attempts=None):
+    """
+    Queue again the jobs running for longer than `timeout` seconds, or fail
+    them once they have been attempted `max_attempts` times. Returns the
+    number of jobs queued again.
+    """
+    if timeout is None:
+        timeout = getattr(settings, "JOB_TIMEOUT", DEFAULT_TIMEOUT)
+    if max_attempts is None:
+        max_attempts = getattr(settings, "JOB_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS)
+    stalled = Job.objects.filter(
+        status=Job.RUNNING, started_at__lt=timezone.now() - timedelta(seconds=timeout)
+    )
+    stalled.filter(attempts__gte=max_attempts).update(
+        status=Job.FAILED,
+        error="The job did not finish in time.",
+        finished_at=timezone.now(),
+    )
+    return stalled.filter(attempts__lt=max_attempts).update(
+        status=Job.QUEUED, worker=""
+    )
+
+
+def work(stop, poll_interval=1.0, burst=False):
+    """
+    Run queued jobs until the `stop` event is set, checking for new jobs
+    every `poll_interval` seconds, or until the queue is empty if `burst`
+    """
+    worker = worker_name()
+    checked = None
+    while not stop.is_set():
+        close_old_connections()
+        if checked is None or time.monotonic() - checked > STALLED_CHECK_INTERVAL:
+            with routers.use_primary():
+                requeue_stalled()
+            checked = time.monotonic()
+        job = claim(worker)
+        if job is not None:
+            run(job)
+        elif burst:
+            return
+        else:
+            stop.wait(poll_interval)
+
+
+@task(CREATE)
+def create_recipe(job):
+    """Create one recipe from validated RecipeDetailSerializer data"""
+    recipe = RecipeService().create(dict(job.payload))
+    return RecipeDetailSerializer(recipe).data
+
+
+@task(BULK)
+def bulk(job):
+    """Apply validated bulk items, as the bulk endpoint does"""
+    return {"results": RecipeService().bulk_operations(job.payload["items"])}
+
+
+@task(EXPORT, atomic=False)
+def export_recipes(job):
+    """Write the catalogue to the default storage, returning its URL"""
+    file_format = job.payload.get("format", "ndjson")
+    with tempfile.TemporaryFile("w+b") as out:
+        for line in export.export(file_format):
+            out.write(line.encode("utf-8"))
+        out.seek(0)
+        name = default_storage.save(
+            f"exports/recipes-{job.pk}.{file_format}", File(out)
+        )
+    return {"format": file_format, "url": default_storage.url(name)}
+
+
+@task(THUMBNAILS, atomic=False)
+def recipe_thumbnails(job):
+    """Render the thumbnails of a recipe's new image"""
+    recipe_id, name = job.payload["recipe"], job.payload["image"]
+    thumbnail_names = images.make_thumbnails(name)
+    recorded = RecipeService().set_thumbnails(recipe_id, name, thumbnail_names)
+    return {
+        "recipe": recipe_id,
+        "recorded": recorded,
+        "images": {
+            size: images.image_url(name, thumbnail_names, size)
+            for size in images.size_names()
+        },
+    }
+
+
+@task(REFRESH_RECIPES)
+def refresh_recipes(job):
+    """Refresh the recipes using a renamed or deleted ingredient"""
+    recipe_ids = job.payload["recipes"]
+    IngredientService().refresh_recipes(recipe_ids)
+    return {"recipes": len(recipe_ids)}
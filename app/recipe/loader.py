@@ -0,0 +1,268 @@
+"""
+Bulk loading of recipes from NDJSON or CSV files
+"""
+import csv
+import io
+import json
+from itertools import islice
+
+from django.db import connection, transaction
+from django.db.models.functions import Lower
+
+from core.models import Recipe, Ingredient, RecipeIngredient
+from recipe import cache
+from recipe.autocomplete import ingredient_index
+from recipe.service import lower_names
+
+BATCH_SIZE = 5000
+PARSE_CHUNK_SIZE = 1000
+
+# Django does not give columns database defaults, so COPY has to fill in
+# every NOT NULL column of the recipes table
+COPY_RECIPE_COLUMNS = [
+    "id",
+    "title",
+    "description",
+    "version",
+    "ingredient_count",
+    "ingredient_summary",
+    "image",
+    "image_thumbnails",
+]
+
+
+class LoadError(Exception):
+    """A row of the input could not be parsed"""
+
+
+def _names(value):
+    """Return ingredient names from a list of names or of {"name": ...}"""
+    if isinstance(value, str):
+        value = value.split("|")
+    names = (item["name"] if isinstance(item, dict) else item for item in value)
+    return [name.strip() for name in names if name.strip()]
+
+
+def parse_ndjson_lines(lines):
+    """Parse NDJSON lines into (title, description, ingredient names)"""
+    rows = []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+            rows.append(
+                (
+                    data["title"],
+                    data.get("description") or "",
+                    _names(data.get("ingredients") or []),
+                )
+            )
+        except (ValueError, KeyError, TypeError) as error:
+            raise LoadError(f"Invalid recipe {line.strip()[:80]!r}: {error}")
+    return rows
+
+
+def _parse_csv(stream):
+    for record in csv.DictReader(stream):
+        if not record.get("title"):
+            raise LoadError(f"Recipe without a title: {record!r}")
+        yield (
+            record["title"],
+            record.get("description") or "",
+            _names(record.get("ingredient_names") or ""),
+        )
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def parse(stream, file_format, pool=None):
+    """
+    Yield (title, description, ingredient names) for every recipe in the
+    stream.
+
+    With a multiprocessing `pool`, NDJSON lines are decoded by the worker
+    processes. CSV records can span lines, so CSV is always parsed here by
+    the C csv reader.
+    """
+    if file_format == "csv":
+        yield from _parse_csv(stream)
+        return
+    chunks = _chunks(stream, PARSE_CHUNK_SIZE)
+    if pool is None:
+        parsed = map(parse_ndjson_lines, chunks)
+    else:
+        parsed = pool.imap(parse_ndjson_lines, chunks)
+    for rows in parsed:
+        yield from rows
+
+
+class RecipeLoader:
+    """Insert parsed recipes in batches"""
+
+    def __init__(self, batch_size=BATCH_SIZE, use_copy=None):
+        self.batch_size = batch_size
+        if use_copy is None:
+            use_copy = connection.vendor == "postgresql"
+        self.use_copy = use_copy
+        self.ingredient_ids = {}
+        self.ingredient_names = {}
+        self._remember(Ingredient.objects.all())
+        self.loaded = 0
+
+    def load(self, rows, progress=None):
+        """
+        Insert every row, calling `progress(loaded)` after each batch.
+
+        Returns the number of recipes loaded.
+        """
+        loaded = self.loaded
+        try:
+            for batch in _chunks(rows, self.batch_size):
+                self._load_batch(batch)
+                self.loaded += len(batch)
+                if progress is not None:
+                    progress(self.loaded)
+        finally:
+            if self.loaded > loaded:
+                # Invalidating once at the end, even of a failed load, is
+                # enough: bumping the table version makes every cached list
+                # unreachable, and new recipes have no cached detail
+                # responses yet.
+                cache.invalidate_recipes()
+                ingredient_index.reset()
+        return self.loaded
+
+    @transaction.atomic
+    def _load_batch(self, batch):
+        keys = self._resolve_ingredients(
+            name for _, _, names in batch for name in names
+        )
+        ingredient_ids = [
+            sorted({self.ingredient_ids[keys[name]] for name in names})
+            for _, _, names in batch
+        ]
+        summaries = [
+            [{"id": pk, "name": self.ingredient_names[pk]} for pk in ids]
+            for ids in ingredient_ids
+        ]
+        if self.use_copy:
+            recipe_ids = self._copy_recipes(batch, summaries)
+        else:
+            recipe_ids = self._create_recipes(batch, summaries)
+
+        links = [
+            (recipe_id, ingredient_id)
+            for recipe_id, ids in zip(recipe_ids, ingredient_ids)
+            for ingredient_id in ids
+        ]
+        if self.use_copy:
+            self._copy(RecipeIngredient, ["recipe_id", "ingredient_id"], links)
+        else:
+            self._insert(RecipeIngredient, ["recipe_id", "ingredient_id"], links)
+
+    def _remember(self, ingredients):
+        rows = ingredients.annotate(lower_name=Lower("name")).values_list(
+            "lower_name", "id", "name"
+        )
+        for lower_name, pk, name in rows:
+            self.ingredient_ids[lower_name] = pk
+            self.ingredient_names[pk] = name
+
+    def _resolve_ingredients(self, names):
+        """
+        Add ingredients missing from the name -> id map, returning
+        {name: key in the map} for the given names
+        """
+        keys = lower_names(names)
+        missing = {}
+        for name, key in keys.items():
+            if key not in self.ingredient_ids:
+                missing.setdefault(key, name)
+        if not missing:
+            return keys
+        Ingredient.objects.bulk_create(
+            [Ingredient(name=name) for name in missing.values()],
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+        self._remember(
+            Ingredient.objects.annotate(lower_name=Lower("name")).filter(
+                lower_name__in=list(missing)
+            )
+        )
+        return keys
+
+    def _create_recipes(self, batch, summaries):
+        recipes = Recipe.objects.bulk_create(
+            [
+                Recipe(
+                    title=title,
+                    description=description,
+                    ingredient_count=len(summary),
+                    ingredient_summary=summary,
+                )
+                for (title, description, _), summary in zip(batch, summaries)
+            ],
+            batch_size=self.batch_size,
+        )
+        return [recipe.pk for recipe in recipes]
+
+    def _copy_recipes(self, batch, summaries):
+        """COPY the recipes in with ids reserved from their sequence"""
+        table = Recipe._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) "
+                "FROM generate_series(1, %s)",
+                [table, len(batch)],
+            )
+            recipe_ids = [row[0] for row in cursor.fetchall()]
+        self._copy(
+            Recipe,
+            COPY_RECIPE_COLUMNS,
+            [
+                (
+                    recipe_id,
+                    title,
+                    description,
+                    1,
+                    len(summary),
+                    json.dumps(summary),
+                    "",
+                    "{}",
+                )
+                for recipe_id, (title, description, _), summary in zip(
+                    recipe_ids, batch, summaries
+                )
+            ],
+        )
+        return recipe_ids
+
+    def _insert(self, model, columns, rows):
+        """INSERT plain tuples, without building a model instance per row"""
+        quote = connection.ops.quote_name
+        sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            quote(model._meta.db_table),
+            ", ".join(quote(c) for c in columns),
+            ", ".join(["%s"] * len(columns)),
+        )
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+
+    def _copy(self, model, columns, rows):
+        # COPY reads an unquoted empty field as NULL, so every field is
+        # quoted to keep empty strings, e.g. descriptions, empty
+        buffer = io.StringIO()
+        csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(rows)
+        buffer.seek(0)
+        quote = connection.ops.quote_name
+        sql = "COPY {} ({}) FROM STDIN WITH (FORMAT csv)".format(
+            quote(model._meta.db_table), ", ".join(quote(c) for c in columns)
+        )
+        with connection.cursor() as cursor:
+            cursor.copy_expert(sql, buffer)
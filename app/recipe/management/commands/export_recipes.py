@@ -0,0 +1,32 @@
+"""
+Django command to export every recipe as NDJSON or CSV
+"""
+from django.core.management.base import BaseCommand
+
+from recipe import export
+
+
+class Command(BaseCommand):
+    """Django command to stream the recipe catalogue to a file or stdout"""
+
+    help = "Export every recipe with its ingredients as NDJSON or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format", choices=list(export.EXPORTERS), default="ndjson"
+        )
+        parser.add_argument(
+            "--output", help="File to write to; defaults to standard output"
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=export.CHUNK_SIZE
+        )
+
+    def handle(self, *args, **options):
+        rows = export.export(options["format"], chunk_size=options["chunk_size"])
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8", newline="") as out:
+                out.writelines(rows)
+            return
+        for row in rows:
+            self.stdout.write(row, ending="")
@@ -0,0 +1,41 @@
+"""
+Django command to check or rebuild the recipes' ingredient summaries
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe import summary
+
+
+class Command(BaseCommand):
+    """Django command to compare the summaries with the link table"""
+
+    help = (
+        "Rebuild every recipe's ingredient count and summary from the "
+        "recipe/ingredient links, or with --check only report the recipes "
+        "whose summary is out of date."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Report stale summaries and fail if there are any",
+        )
+        parser.add_argument("--chunk-size", type=int, default=summary.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options["check"]:
+            stale = list(summary.stale_summaries(options["chunk_size"]))
+            if stale:
+                raise CommandError(
+                    f"{len(stale)} recipes have stale ingredient summaries: "
+                    + ", ".join(map(str, stale[:20]))
+                    + (", ..." if len(stale) > 20 else "")
+                )
+            self.stdout.write(self.style.SUCCESS("Ingredient summaries are up to date"))
+            return
+
+        rebuilt = summary.rebuild_summaries(options["chunk_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {rebuilt} ingredient summaries")
+        )
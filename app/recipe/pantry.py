@@ -0,0 +1,51 @@
+"""
+Matching recipes against a set of ingredients
+"""
+from django.db.models import Count, F, OuterRef, Subquery
+
+from core.models import RecipeIngredient
+
+
+def _count_links(**filters):
+    return Subquery(
+        RecipeIngredient.objects.filter(recipe_id=OuterRef("pk"), **filters)
+        .values("recipe_id")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+
+
+def match_pantry(queryset, ingredient_ids):
+    """
+    Return recipes using any of the ingredients, best coverage first.
+
+    Recipes are annotated with `matched_count` and `missing_count` and
+    ordered so that fully makeable recipes come first, then by the fewest
+    missing ingredients.
+    """
+    candidates = RecipeIngredient.objects.filter(
+        ingredient_id__in=ingredient_ids
+    ).values("recipe_id")
+    return (
+        queryset.filter(pk__in=candidates)
+        .annotate(
+            matched_count=_count_links(ingredient_id__in=ingredient_ids),
+            missing_count=F("ingredient_count") - F("matched_count"),
+        )
+        .order_by("missing_count", "-matched_count", "id")
+    )
+
+
+def filter_by_ingredients(queryset, ingredient_ids):
+    """Return recipes that use every one of the ingredients, or all recipes"""
+    ingredient_ids = set(ingredient_ids)
+    if not ingredient_ids:
+        return queryset
+    covering = (
+        RecipeIngredient.objects.filter(ingredient_id__in=ingredient_ids)
+        .values("recipe_id")
+        .annotate(matched=Count("pk"))
+        .filter(matched=len(ingredient_ids))
+        .values("recipe_id")
+    )
+    return queryset.filter(pk__in=covering)
@@ -0,0 +1,39 @@
+"""
+Serializer-free read path for recipes
+"""
+from recipe import images
+
+SUMMARY = "ingredient_summary"
+THUMBNAILS = "image_thumbnails"
+
+
+def recipe_values(queryset, fields):
+    """
+    Return `queryset` as values() rows holding `fields`, the id and version
+    and any annotations (which the cursor paginator may order by).
+    """
+    columns = [field for field in fields if field not in ("id", "ingredients")]
+    if "ingredients" in fields:
+        columns.append(SUMMARY)
+    if "image" in fields:
+        columns.append(THUMBNAILS)
+    return queryset.values("id", *columns, "version", *queryset.query.annotations)
+
+
+def attach_ingredients(rows):
+    """Move every row's ingredient summary to `ingredients`"""
+    for row in rows:
+        row["ingredients"] = row.pop(SUMMARY)
+    return rows
+
+
+def represent(rows, fields, image_size=images.ORIGINAL):
+    """Shape rows like the recipe serializer for `fields` would"""
+    if "ingredients" in fields:
+        attach_ingredients(rows)
+    if "image" in fields:
+        for row in rows:
+            row["image"] = images.image_url(
+                row["image"], row.pop(THUMBNAILS), image_size
+            )
+    return [{field: row[field] for field in fields} for row in rows]
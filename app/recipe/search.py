@@ -0,0 +1,69 @@
+"""
+Full-text search over recipes
+"""
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.contrib.postgres.search import SearchVectorField
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Case, Exists, F, Func, OuterRef, Q, Value, When
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+
+from core.models import Recipe, RecipeIngredient
+
+SEARCH_CONFIG = "english"
+
+# PostgreSQL's default ts_rank weights for the A, B and C labels
+WEIGHTS = {"title": 1.0, "description": 0.4, "ingredients": 0.2}
+
+
+def uses_postgres_search(using=DEFAULT_DB_ALIAS):
+    return connections[using].vendor == "postgresql"
+
+
+def update_search_vectors(recipe_ids):
+    """Recompute the stored search vectors of the given recipes"""
+    if not uses_postgres_search() or not recipe_ids:
+        return
+    Recipe.objects.filter(pk__in=recipe_ids).update(
+        search_vector=Func(
+            "id",
+            "title",
+            "description",
+            function="core_recipe_search_vector",
+            output_field=SearchVectorField(),
+        )
+    )
+
+
+def search_recipes(queryset, text):
+    """Filter the queryset to recipes matching `text`, annotated with `rank`"""
+    if uses_postgres_search(queryset.db):
+        query = SearchQuery(text, search_type="websearch", config=SEARCH_CONFIG)
+        # ts_rank() returns a real; as a double it round-trips through the
+        # pagination cursor exactly, so ties compare equal
+        return queryset.filter(search_vector=query).annotate(
+            rank=Cast(SearchRank(F("search_vector"), query), FloatField())
+        )
+
+    rank = Value(0.0)
+    for term in text.split():
+        in_ingredients = Exists(
+            RecipeIngredient.objects.filter(
+                recipe_id=OuterRef("pk"), ingredient__name__icontains=term
+            )
+        )
+        queryset = queryset.filter(
+            Q(title__icontains=term) | Q(description__icontains=term) | in_ingredients
+        )
+        for condition, weight in (
+            (Q(title__icontains=term), WEIGHTS["title"]),
+            (Q(description__icontains=term), WEIGHTS["description"]),
+            (in_ingredients, WEIGHTS["ingredients"]),
+        ):
+            rank = rank + Case(
+                When(condition, then=Value(weight)),
+                default=Value(0.0),
+                output_field=FloatField(),
+            )
+
+    return queryset.annotate(rank=rank)
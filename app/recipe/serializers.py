@@ -1,27 +1,99 @@
+from django.conf import settings
+from django.db.models import Value
+from django.db.models.functions import Lower
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
-from core.models import Recipe, Ingredient
-from recipe.service import RecipeService
+from core.models import Job, Recipe, Ingredient
+from recipe import images
+from recipe.service import NAME_TAKEN_MESSAGE, IngredientService, RecipeService
 
 
 class IngredientSerializer(serializers.ModelSerializer):
     """Serializer for ingredient objects"""
 
+    ingredientService = IngredientService()
+
     class Meta:
         model = Ingredient
         fields = ["id", "name"]
         read_only_fields = ["id"]
 
+    def validate_name(self, value):
+        """Reject renames that clash with another ingredient's name"""
+        if self.instance is not None:
+            # Lower-case in the database, as the unique constraint does
+            clash = (
+                Ingredient.objects.alias(lower_name=Lower("name"))
+                .filter(lower_name=Lower(Value(value)))
+                .exclude(pk=self.instance.pk)
+            )
+            if clash.exists():
+                raise serializers.ValidationError(NAME_TAKEN_MESSAGE)
+        return value
+
+    def update(self, instance, validated_data):
+        expected_version = validated_data.pop("expected_version", None)
+        return self.ingredientService.update(
+            instance, validated_data, expected_version=expected_version
+        )
+
+
+class IngredientSuggestionSerializer(serializers.Serializer):
+    """Serializer for ingredient autocomplete suggestions"""
+
+    id = serializers.IntegerField(read_only=True)
+    name = serializers.CharField(read_only=True)
+    recipe_count = serializers.IntegerField(read_only=True)
+
+
+class CacheStatsSerializer(serializers.Serializer):
+    """Serializer for the response cache counters"""
+
+    hits = serializers.IntegerField(read_only=True)
+    misses = serializers.IntegerField(read_only=True)
+
+
+class SparseFieldsMixin:
+    """Keep only the fields named by the `fields` argument, if given"""
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
 
-class RecipeSerializer(serializers.ModelSerializer):
+@extend_schema_field(OpenApiTypes.URI)
+class RecipeImageURLField(serializers.Field):
+    """
+    URL of a recipe's image at the size in the `image_size` context entry,
+    or None without an image
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(source="*", read_only=True, **kwargs)
+
+    def to_representation(self, recipe):
+        return images.image_url(
+            recipe.image.name,
+            recipe.image_thumbnails,
+            self.context.get("image_size", images.ORIGINAL),
+        )
+
+
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for recipe objects"""
 
     ingredients = IngredientSerializer(many=True, required=False)
+    image = RecipeImageURLField(allow_null=True)
     recipeService = RecipeService()
 
     class Meta:
         model = Recipe
-        fields = ["id", "title", "ingredients"]
+        fields = ["id", "title", "ingredients", "image"]
         read_only_fields = ["id"]
 
     def create(self, validated_data):
@@ -29,7 +101,10 @@ class RecipeSerializer(serializers.ModelSerializer):
         return self.recipeService.create(validated_data)
 
     def update(self, instance, validated_data):
-        return self.recipeService.update(instance, validated_data)
+        expected_version = validated_data.pop("expected_version", None)
+        return self.recipeService.update(
+            instance, validated_data, expected_version=expected_version
+        )
 
 
 class RecipeDetailSerializer(RecipeSerializer):
@@ -37,3 +112,108 @@ class RecipeDetailSerializer(RecipeSerializer):
 
     class Meta(RecipeSerializer.Meta):
         fields = RecipeSerializer.Meta.fields + ["description"]
+
+
+class RecipeImageSerializer(serializers.Serializer):
+    """Serializer for uploading a recipe image"""
+
+    image = serializers.ImageField()
+
+    def validate_image(self, value):
+        max_bytes = getattr(settings, "RECIPE_IMAGE_MAX_BYTES", None)
+        if max_bytes and value.size > max_bytes:
+            raise serializers.ValidationError(
+                f"Images may be at most {max_bytes // (1024 * 1024)} MB."
+            )
+        return value
+
+
+class PantryMatchSerializer(RecipeSerializer):
+    """Serializer for recipes matched against a set of ingredients"""
+
+    matched_count = serializers.IntegerField(read_only=True)
+    missing_count = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ["matched_count", "missing_count"]
+
+
+class RecipeBulkItemSerializer(RecipeDetailSerializer):
+    """Serializer for one operation of a bulk recipe request"""
+
+    OPERATIONS = ["create", "update", "delete"]
+
+    op = serializers.ChoiceField(choices=OPERATIONS)
+    id = serializers.IntegerField(required=False)
+
+    class Meta(RecipeDetailSerializer.Meta):
+        fields = ["op"] + RecipeDetailSerializer.Meta.fields
+        extra_kwargs = {"title": {"required": False}}
+
+    def validate(self, attrs):
+        if attrs["op"] == "create":
+            if "title" not in attrs:
+                raise serializers.ValidationError(
+                    {"title": "This field is required."}
+                )
+            attrs.pop("id", None)
+        elif "id" not in attrs:
+            raise serializers.ValidationError({"id": "This field is required."})
+        return attrs
+
+
+class RecipeBulkResultSerializer(serializers.Serializer):
+    """Serializer for the outcome of one bulk recipe operation"""
+
+    index = serializers.IntegerField()
+    op = serializers.ChoiceField(choices=RecipeBulkItemSerializer.OPERATIONS)
+    id = serializers.IntegerField()
+    status = serializers.IntegerField()
+
+
+class RecipeBulkResponseSerializer(serializers.Serializer):
+    """Serializer for a successful bulk recipe response"""
+
+    results = RecipeBulkResultSerializer(many=True)
+
+
+class RecipeBulkErrorSerializer(serializers.Serializer):
+    """Serializer for the validation errors of one bulk recipe operation"""
+
+    index = serializers.IntegerField()
+    errors = serializers.DictField()
+
+
+class RecipeBulkErrorResponseSerializer(serializers.Serializer):
+    """Serializer for a rejected bulk recipe response"""
+
+    errors = RecipeBulkErrorSerializer(many=True)
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Serializer for background jobs"""
+
+    result = serializers.JSONField(read_only=True)
+
+    class Meta:
+        model = Job
+        fields = [
+            "id",
+            "kind",
+            "status",
+            "result",
+            "error",
+            "attempts",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+        read_only_fields = fields
+
+
+class RecipeImageResponseSerializer(serializers.Serializer):
+    """Serializer for an uploaded recipe image"""
+
+    id = serializers.IntegerField()
+    images = serializers.DictField(child=serializers.CharField())
+    job = JobSerializer()
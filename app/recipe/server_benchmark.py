@@ -0,0 +1,166 @@
+"""
+Load generator comparing the API served by different servers
+"""
+import asyncio
+import time
+from http import HTTPStatus
+from urllib.parse import urlsplit
+
+from recipe.benchmark import percentile
+
+DEFAULT_PATHS = ["/api/recipe/recipes/", "/api/recipe/ingredients/"]
+
+
+class Target:
+    """A server to send requests to"""
+
+    def __init__(self, name, url):
+        parts = urlsplit(url)
+        self.name = name
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+
+    def request(self, path):
+        return (
+            f"GET {self.prefix}{path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            "Accept: application/json\r\n"
+            "Connection: close\r\n\r\n"
+        ).encode()
+
+
+async def fetch(target, path, trickle=0):
+    """
+    Send one GET and read the whole response, returning its status code.
+
+    With `trickle`, the request is sent a byte at a time over that many
+    seconds.
+    """
+    reader, writer = await asyncio.open_connection(target.host, target.port)
+    try:
+        request = target.request(path)
+        if trickle:
+            delay = trickle / len(request)
+            for i in range(len(request)):
+                writer.write(request[i:i + 1])
+                await writer.drain()
+                await asyncio.sleep(delay)
+        else:
+            writer.write(request)
+            await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    return int(response.split(b" ", 2)[1])
+
+
+async def _client(target, paths, deadline, timeout, latencies, errors, throttled):
+    n = 0
+    while time.perf_counter() < deadline:
+        path = paths[n % len(paths)]
+        n += 1
+        started = time.perf_counter()
+        try:
+            status = await asyncio.wait_for(fetch(target, path), timeout)
+        except (OSError, IndexError, ValueError, asyncio.TimeoutError):
+            errors.append(path)
+            continue
+        if status == HTTPStatus.TOO_MANY_REQUESTS:
+            throttled.append(path)
+            continue
+        if status != 200:
+            errors.append(path)
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def _slow_client(target, paths, deadline, slow_seconds):
+    n = 0
+    while time.perf_counter() < deadline:
+        try:
+            await fetch(target, paths[n % len(paths)], trickle=slow_seconds)
+        except (OSError, IndexError, ValueError):
+            await asyncio.sleep(slow_seconds)
+        n += 1
+
+
+async def measure(
+    target, paths, clients, duration, slow_clients=0, slow_seconds=1, timeout=30
+):
+    """Run one scenario against `target` and summarise its latencies"""
+    deadline = time.perf_counter() + duration
+    latencies, errors, throttled = [], [], []
+    slow = [
+        asyncio.ensure_future(_slow_client(target, paths, deadline, slow_seconds))
+        for _ in range(slow_clients)
+    ]
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            _client(target, paths, deadline, timeout, latencies, errors, throttled)
+            for _ in range(clients)
+        )
+    )
+    elapsed = time.perf_counter() - started
+    for task in slow:
+        task.cancel()
+    await asyncio.gather(*slow, return_exceptions=True)
+
+    ordered = sorted(latencies)
+    result = {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "throttled": len(throttled),
+        "throughput_per_s": round(len(latencies) / elapsed, 1),
+    }
+    if ordered:
+        result.update(
+            p50_ms=round(percentile(ordered, 50), 3),
+            p95_ms=round(percentile(ordered, 95), 3),
+            p99_ms=round(percentile(ordered, 99), 3),
+            max_ms=round(ordered[-1], 3),
+        )
+    return result
+
+
+def run(
+    targets,
+    paths=None,
+    clients=50,
+    duration=10,
+    slow_clients=20,
+    slow_seconds=2,
+    timeout=30,
+):
+    """Run both scenarios against every target and return the report"""
+    paths = paths or DEFAULT_PATHS
+    results = {}
+    for target in targets:
+        results[target.name] = {
+            "concurrency": asyncio.run(
+                measure(target, paths, clients, duration, timeout=timeout)
+            ),
+            "slow_clients": asyncio.run(
+                measure(
+                    target,
+                    paths,
+                    clients,
+                    duration,
+                    slow_clients=slow_clients,
+                    slow_seconds=slow_seconds,
+                    timeout=timeout,
+                )
+            ),
+        }
+    return {
+        "settings": {
+            "paths": paths,
+            "clients": clients,
+            "duration_s": duration,
+            "slow_clients": slow_clients,
+            "slow_seconds": slow_seconds,
+            "timeout_s": timeout,
+        },
+        "results": results,
+    }
@@ -1,36 +1,398 @@
-from core.models import Recipe, Ingredient
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.db.models.functions import Lower
+from rest_framework.exceptions import ValidationError
+
+from core.models import Recipe, Ingredient, RecipeIngredient
+from recipe import cache
+from recipe.autocomplete import ingredient_index
+from recipe.search import update_search_vectors
+from recipe.summary import summary_fields, update_ingredient_summaries
 
 """
 For more complex data types/data types that diverge from the django models,
 I would define some DTOs here.
 """
 
+BULK_BATCH_SIZE = 500
+BULK_STATUS_CODES = {"create": 201, "update": 200, "delete": 204}
+LOWER_BATCH_SIZE = 500
+NAME_TAKEN_MESSAGE = "An ingredient with this name already exists."
+
+
+class VersionConflict(Exception):
+    """The row changed since the version the caller expected"""
+
+
+def claim_version(instance, expected_version=None):
+    """
+    Bump the version of a recipe or ingredient row.
+
+    With `expected_version` the bump is a compare-and-set: it fails with
+    VersionConflict if another write got there first. Because the bump
+    happens before any other write in the transaction, it also locks the row
+    for the rest of the transaction on PostgreSQL.
+    """
+    model = type(instance)
+    current = instance.version if expected_version is None else expected_version
+    if model.objects.filter(pk=instance.pk, version=current).update(
+        version=current + 1
+    ):
+        instance.version = current + 1
+        return
+    if expected_version is not None:
+        raise VersionConflict()
+    model.objects.filter(pk=instance.pk).update(version=F("version") + 1)
+    instance.refresh_from_db(fields=["version"])
+
+
+def lower_names(names):
+    """
+    Return {name: lower-cased name} for ingredient names, in the order given.
+
+    Names are lower-cased as the database's LOWER() does, which is what the
+    case-insensitive unique constraint on ingredient names compares. That
+    can differ from str.lower() outside ASCII (SQLite only folds ASCII), so
+    non-ASCII names are lower-cased by the database itself.
+    """
+    lowered = {}
+    other = []
+    for name in dict.fromkeys(names):
+        if name.isascii():
+            lowered[name] = name.lower()
+        else:
+            lowered[name] = None
+            other.append(name)
+    with connection.cursor() as cursor:
+        for start in range(0, len(other), LOWER_BATCH_SIZE):
+            chunk = other[start:start + LOWER_BATCH_SIZE]
+            cursor.execute(
+                "SELECT {}".format(", ".join(["LOWER(%s)"] * len(chunk))), chunk
+            )
+            lowered.update(zip(chunk, cursor.fetchone()))
+    return lowered
+
 
 class RecipeService:
     """Recipe API service layer"""
 
-    def _get_or_create_ingredients(self, ingredients, recipe):
+    def _resolve_ingredients(self, ingredients):
+        """
+        Return ingredient objects for the given payloads, keyed by name as
+        given, in payload order.
+
+        Names are matched case-insensitively (see lower_names). Existing
+        ingredients are looked up in one query and missing ones are bulk
+        inserted; inserts that lose a race against a concurrent request are
+        ignored and picked up by the re-fetch, so no duplicate rows are
+        created.
+        """
+        lowered = lower_names(ingredient["name"] for ingredient in ingredients)
+        names = {}
+        for name, key in lowered.items():
+            names.setdefault(key, name)
+        if not names:
+            return {}
+
+        def fetch(keys):
+            queryset = Ingredient.objects.annotate(lower_name=Lower("name"))
+            return {
+                obj.lower_name: obj
+                for obj in queryset.filter(lower_name__in=list(keys))
+            }
+
+        resolved = fetch(names)
+        missing = [key for key in names if key not in resolved]
+        if missing:
+            Ingredient.objects.bulk_create(
+                [Ingredient(name=names[key]) for key in missing],
+                ignore_conflicts=True,
+            )
+            resolved.update(fetch(missing))
+
+        return {name: resolved[key] for name, key in lowered.items()}
+
+    def _distinct_ingredients(self, ingredients):
+        """Return the distinct ingredient objects of the payloads, in order"""
+        return list(dict.fromkeys(self._resolve_ingredients(ingredients).values()))
+
+    def _set_ingredients(self, recipe, resolved, clear=False):
+        """Link the recipe to the resolved ingredients with batched queries"""
+        removed = set()
+        if clear:
+            links = RecipeIngredient.objects.filter(recipe=recipe)
+            removed = set(links.values_list("ingredient_id", flat=True))
+            links.delete()
+
+        RecipeIngredient.objects.bulk_create(
+            [
+                RecipeIngredient(recipe=recipe, ingredient=ingredient)
+                for ingredient in resolved
+            ],
+            ignore_conflicts=True,
+        )
+        getattr(recipe, "_prefetched_objects_cache", {}).pop("ingredients", None)
+
+        added = {ingredient.pk for ingredient in resolved}
+        transaction.on_commit(
+            lambda: self._update_index(resolved, added - removed, removed - added)
+        )
+
+    def _update_index(self, ingredients, added, removed):
         for ingredient in ingredients:
-            ingredient_obj, _ = Ingredient.objects.get_or_create(**ingredient)
-            recipe.ingredients.add(ingredient_obj)
+            ingredient_index.upsert(ingredient.pk, ingredient.name)
+        ingredient_index.adjust_usage(added=added, removed=removed)
 
+    @transaction.atomic
     def create(self, validated_data):
         """Create a recipe"""
         ingredients = validated_data.pop("ingredients", [])
-        recipe = Recipe.objects.create(**validated_data)
-        self._get_or_create_ingredients(ingredients, recipe)
+        resolved = self._distinct_ingredients(ingredients)
+        recipe = Recipe.objects.create(**validated_data, **summary_fields(resolved))
+        self._set_ingredients(recipe, resolved)
+        cache.invalidate_recipes()
         return recipe
 
-    def update(self, instance, validated_data):
+    @transaction.atomic
+    def update(self, instance, validated_data, expected_version=None):
+        claim_version(instance, expected_version)
         ingredients = validated_data.pop("ingredients", None)
 
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+            resolved = self._distinct_ingredients(ingredients)
+            self._set_ingredients(instance, resolved, clear=True)
+            validated_data.update(summary_fields(resolved))
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
 
         instance.save()
+        cache.invalidate_recipes([instance.pk])
+
+        return instance
+
+    @transaction.atomic
+    def delete(self, instance, expected_version=None):
+        """Delete a recipe"""
+        if expected_version is not None:
+            claim_version(instance, expected_version)
+        ingredient_ids = list(
+            RecipeIngredient.objects.filter(recipe=instance).values_list(
+                "ingredient_id", flat=True
+            )
+        )
+        recipe_id = instance.pk
+        instance.delete()
+        cache.invalidate_recipes([recipe_id])
+        transaction.on_commit(
+            lambda: ingredient_index.adjust_usage(removed=ingredient_ids)
+        )
+
+    @transaction.atomic
+    def set_image(self, instance, name, expected_version=None):
+        """Replace a recipe's image with the stored image `name`"""
+        claim_version(instance, expected_version)
+        instance.image = name
+        instance.image_thumbnails = {}
+        instance.save(update_fields=["image", "image_thumbnails"])
+        cache.invalidate_recipes([instance.pk])
+        return instance
+
+    @transaction.atomic
+    def set_thumbnails(self, recipe_id, name, thumbnails):
+        """
+        Record the thumbnails of image `name`, unless the recipe has had
+        its image replaced since. Returns whether they were recorded.
+        """
+        updated = Recipe.objects.filter(pk=recipe_id, image=name).update(
+            image_thumbnails=thumbnails, version=F("version") + 1
+        )
+        if updated:
+            cache.invalidate_recipes([recipe_id])
+        return bool(updated)
+
+    @transaction.atomic
+    def bulk(self, creates=(), updates=None, deletes=()):
+        """
+        Apply many recipe creates, updates and deletes in one transaction.
+
+        `creates` is a list of validated recipe data, `updates` maps recipe
+        ids to validated partial data and `deletes` is a list of recipe ids.
+        Every step is a batched query, so the number of queries does not
+        grow with the number of recipes or ingredients.
+
+        Returns the created recipes, in order. Raises VersionConflict if a
+        recipe to update or delete no longer exists.
+        """
+        creates = [dict(data) for data in creates]
+        updates = {pk: dict(data) for pk, data in (updates or {}).items()}
+        deletes = list(deletes)
+        payloads = creates + list(updates.values())
+
+        resolved = self._resolve_ingredients(
+            [
+                ingredient
+                for data in payloads
+                for ingredient in data.get("ingredients") or []
+            ]
+        )
+
+        def summary(ingredients):
+            return summary_fields(
+                {resolved[ingredient["name"]] for ingredient in ingredients}
+            )
+
+        created = Recipe.objects.bulk_create(
+            [
+                Recipe(
+                    **{k: v for k, v in data.items() if k != "ingredients"},
+                    **summary(data.get("ingredients") or []),
+                )
+                for data in creates
+            ],
+            batch_size=BULK_BATCH_SIZE,
+        )
+
+        locked = (
+            Recipe.objects.select_for_update()
+            .defer("search_vector")
+            .in_bulk(list(updates) + deletes)
+        )
+        if len(locked) != len(updates) + len(deletes):
+            raise VersionConflict()
+
+        updated = [locked[pk] for pk in updates]
+        fields = {"version"}
+        for recipe in updated:
+            data = updates[recipe.pk]
+            if "ingredients" in data:
+                data = {**data, **summary(data["ingredients"])}
+            for attr, value in data.items():
+                if attr != "ingredients":
+                    setattr(recipe, attr, value)
+                    fields.add(attr)
+            recipe.version += 1
+        if updated:
+            Recipe.objects.bulk_update(
+                updated, sorted(fields), batch_size=BULK_BATCH_SIZE
+            )
+
+        replaced = [pk for pk, data in updates.items() if "ingredients" in data]
+        old_links = list(
+            RecipeIngredient.objects.filter(
+                recipe_id__in=replaced + deletes
+            ).values_list("ingredient_id", flat=True)
+        )
+        if replaced:
+            RecipeIngredient.objects.filter(recipe_id__in=replaced).delete()
+
+        new_links = {
+            (recipe.pk, resolved[ingredient["name"]].pk)
+            for recipe, data in zip(created + updated, payloads)
+            for ingredient in data.get("ingredients") or []
+        }
+        RecipeIngredient.objects.bulk_create(
+            [
+                RecipeIngredient(recipe_id=recipe_id, ingredient_id=ingredient_id)
+                for recipe_id, ingredient_id in new_links
+            ],
+            batch_size=BULK_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+        if deletes:
+            Recipe.objects.filter(pk__in=deletes).delete()
+
+        cache.invalidate_recipes(list(updates) + deletes)
+        added = [ingredient_id for _, ingredient_id in new_links]
+        transaction.on_commit(
+            lambda: self._update_index(set(resolved.values()), added, old_links)
+        )
+
+        return created
+
+    def bulk_operations(self, items):
+        """
+        Apply validated bulk API items ({"op", "id", ...fields}) with `bulk`,
+        returning the outcome of each item in order
+        """
+
+        def payload(item):
+            return {k: v for k, v in item.items() if k not in ("op", "id")}
+
+        created = iter(
+            self.bulk(
+                creates=[payload(i) for i in items if i["op"] == "create"],
+                updates={i["id"]: payload(i) for i in items if i["op"] == "update"},
+                deletes=[i["id"] for i in items if i["op"] == "delete"],
+            )
+        )
+        return [
+            {
+                "index": index,
+                "op": item["op"],
+                "id": next(created).pk if item["op"] == "create" else item["id"],
+                "status": BULK_STATUS_CODES[item["op"]],
+            }
+            for index, item in enumerate(items)
+        ]
+
+
+class IngredientService:
+    """Ingredient API service layer"""
+
+    def _recipe_ids(self, ingredient):
+        return list(
+            RecipeIngredient.objects.filter(ingredient=ingredient).values_list(
+                "recipe_id", flat=True
+            )
+        )
+
+    def _touch_recipes(self, recipe_ids):
+        """
+        Queue the refresh of these recipes, so renaming or deleting a common
+        ingredient does not rewrite all its recipes in the request
+        """
+        from recipe import jobs  # recipe.jobs imports this module
+
+        if recipe_ids:
+            jobs.submit(jobs.REFRESH_RECIPES, {"recipes": recipe_ids})
+
+    def refresh_recipes(self, recipe_ids):
+        """
+        Refresh everything derived from the ingredients of these recipes;
+        updating their summaries also bumps their versions and invalidates
+        their cached responses
+        """
+        update_search_vectors(recipe_ids)
+        update_ingredient_summaries(recipe_ids)
+
+    def update(self, instance, validated_data, expected_version=None):
+        """Update an ingredient and refresh the recipes that use it"""
+        try:
+            with transaction.atomic():
+                claim_version(instance, expected_version)
+                for attr, value in validated_data.items():
+                    setattr(instance, attr, value)
+
+                instance.save()
+                self._touch_recipes(self._recipe_ids(instance))
+                transaction.on_commit(
+                    lambda: ingredient_index.upsert(instance.pk, instance.name)
+                )
+        except IntegrityError:
+            # Another request took the name after it was validated
+            raise ValidationError({"name": [NAME_TAKEN_MESSAGE]})
 
         return instance
+
+    @transaction.atomic
+    def delete(self, instance, expected_version=None):
+        """Delete an ingredient and refresh the recipes that used it"""
+        if expected_version is not None:
+            claim_version(instance, expected_version)
+        recipe_ids = self._recipe_ids(instance)
+        ingredient_id = instance.pk
+        instance.delete()
+        self._touch_recipes(recipe_ids)
+        transaction.on_commit(lambda: ingredient_index.remove(ingredient_id))
@@ -0,0 +1,110 @@
+"""
+Denormalized ingredient summaries on recipes
+"""
+from django.db.models import F
+
+from core.models import Recipe, RecipeIngredient
+from recipe import cache
+
+BATCH_SIZE = 500
+
+
+def summary_fields(ingredients):
+    """Return the summary fields of a recipe with these ingredients"""
+    summary = sorted(
+        ({"id": ingredient.pk, "name": ingredient.name} for ingredient in ingredients),
+        key=lambda item: item["id"],
+    )
+    return {"ingredient_count": len(summary), "ingredient_summary": summary}
+
+
+def _chunks(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def compute_summaries(recipe_ids):
+    """Return {recipe id: summary} read from the link table"""
+    summaries = {pk: [] for pk in recipe_ids}
+    links = (
+        RecipeIngredient.objects.filter(recipe_id__in=summaries)
+        .order_by("recipe_id", "ingredient_id")
+        .values_list("recipe_id", "ingredient_id", "ingredient__name")
+    )
+    for recipe_id, ingredient_id, name in links:
+        summaries[recipe_id].append({"id": ingredient_id, "name": name})
+    return summaries
+
+
+def update_ingredient_summaries(recipe_ids):
+    """Recompute the stored summaries of the given recipes"""
+    recipe_ids = set(recipe_ids)
+    if not recipe_ids:
+        return
+    for chunk in _chunks(recipe_ids, BATCH_SIZE):
+        Recipe.objects.bulk_update(
+            [
+                Recipe(
+                    pk=pk,
+                    ingredient_count=len(summary),
+                    ingredient_summary=summary,
+                    version=F("version") + 1,
+                )
+                for pk, summary in compute_summaries(chunk).items()
+            ],
+            ["ingredient_count", "ingredient_summary", "version"],
+        )
+    cache.invalidate_recipes(recipe_ids)
+
+
+def _recipe_chunks(chunk_size):
+    """Yield the stored summaries of every recipe, in id order"""
+    last_id = 0
+    while True:
+        recipes = list(
+            Recipe.objects.filter(pk__gt=last_id)
+            .order_by("pk")
+            .values_list("pk", "ingredient_count", "ingredient_summary")[:chunk_size]
+        )
+        if not recipes:
+            return
+        yield recipes
+        last_id = recipes[-1][0]
+
+
+def stale_summaries(chunk_size=BATCH_SIZE):
+    """Yield the ids of recipes whose summary differs from their links"""
+    for recipes in _recipe_chunks(chunk_size):
+        expected = compute_summaries([pk for pk, _, _ in recipes])
+        for pk, count, summary in recipes:
+            if summary != expected[pk] or count != len(expected[pk]):
+                yield pk
+
+
+def rebuild_summaries(chunk_size=BATCH_SIZE):
+    """Recompute every summary, returning the number of recipes updated"""
+    stale = list(stale_summaries(chunk_size))
+    update_ingredient_summaries(stale)
+    return len(stale)
+
+
+def sync_links(sender, instance, action, reverse, pk_set, **kwargs):
+    """m2m_changed receiver for Recipe.ingredients"""
+    if action not in ("post_add", "post_remove", "post_clear", "pre_clear"):
+        return
+    if not reverse:
+        if action != "pre_clear":
+            update_ingredient_summaries([instance.pk])
+        return
+    # ingredient.recipe_set: the recipes whose links changed
+    if action == "pre_clear":
+        instance._cleared_recipe_ids = list(
+            RecipeIngredient.objects.filter(ingredient=instance).values_list(
+                "recipe_id", flat=True
+            )
+        )
+    elif action == "post_clear":
+        update_ingredient_summaries(instance.__dict__.pop("_cleared_recipe_ids", []))
+    else:
+        update_ingredient_summaries(pk_set)
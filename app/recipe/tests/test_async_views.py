@@ -0,0 +1,115 @@
+"""
+Tests for the async read views
+"""
+import json
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredient
+
+
+class AsyncReadViewTests(TestCase):
+    """Test the async views answer like the viewsets"""
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.leek = Ingredient.objects.create(name="Leek")
+        self.soup = Recipe.objects.create(title="Leek soup", description="Warm")
+        self.soup.ingredients.add(self.leek)
+        Recipe.objects.create(title="Toast")
+
+    def assertSameResponse(self, sync_url, async_url, params=None, **headers):
+        cache.clear()
+        expected = self.client.get(sync_url, params, **headers)
+        cache.clear()
+        res = self.client.get(async_url, params, **headers)
+
+        self.assertEqual(res.status_code, expected.status_code)
+        if expected.content:
+            self.assertEqual(json.loads(res.content), json.loads(expected.content))
+        self.assertEqual(res.get("ETag"), expected.get("ETag"))
+        return res
+
+    def test_recipe_list(self):
+        """Test listing recipes"""
+        sync_url = reverse("recipe:recipe-list")
+        async_url = reverse("recipe:async-recipe-list")
+
+        self.assertSameResponse(sync_url, async_url)
+        self.assertSameResponse(sync_url, async_url, {"expand": "ingredients"})
+        self.assertSameResponse(sync_url, async_url, {"search": "leek"})
+
+        res = self.client.get(async_url, {"page_size": 1})
+        self.assertEqual(len(res.data["results"]), 1)
+        # Pagination links point back at the async endpoint
+        self.assertIn(async_url, res.data["next"])
+        res = self.client.get(res.data["next"])
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_recipe_detail(self):
+        """Test retrieving recipes"""
+        self.assertSameResponse(
+            reverse("recipe:recipe-detail", args=[self.soup.id]),
+            reverse("recipe:async-recipe-detail", args=[self.soup.id]),
+        )
+        self.assertSameResponse(
+            reverse("recipe:recipe-detail", args=[0]),
+            reverse("recipe:async-recipe-detail", args=[0]),
+        )
+
+    def test_ingredients(self):
+        """Test listing and retrieving ingredients"""
+        self.assertSameResponse(
+            reverse("recipe:ingredient-list"),
+            reverse("recipe:async-ingredient-list"),
+        )
+        self.assertSameResponse(
+            reverse("recipe:ingredient-detail", args=[self.leek.id]),
+            reverse("recipe:async-ingredient-detail", args=[self.leek.id]),
+        )
+
+    def test_validation_error(self):
+        """Test bad parameters are reported the same way"""
+        self.assertSameResponse(
+            reverse("recipe:recipe-list"),
+            reverse("recipe:async-recipe-list"),
+            {"fields": "secret"},
+        )
+
+    def test_response_cache_and_etag(self):
+        """Test the async views share the response cache and ETags"""
+        url = reverse("recipe:async-recipe-detail", args=[self.soup.id])
+        first = self.client.get(url)
+        second = self.client.get(url)
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertEqual(second["X-Cache"], "HIT")
+
+        res = self.client.get(
+            reverse("recipe:recipe-detail", args=[self.soup.id]),
+            HTTP_IF_NONE_MATCH=first["ETag"],
+        )
+        self.assertEqual(res.status_code, 304)
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(res.status_code, 304)
+
+    def test_msgpack(self):
+        """Test content negotiation works on the async views"""
+        res = self.client.get(
+            reverse("recipe:async-recipe-list"), HTTP_ACCEPT="application/msgpack"
+        )
+
+        self.assertEqual(res["Content-Type"], "application/msgpack")
+
+    def test_read_only(self):
+        """Test the async views only serve reads"""
+        res = self.client.post(
+            reverse("recipe:async-recipe-list"), {"title": "Soup"}, format="json"
+        )
+
+        self.assertEqual(res.status_code, 405)
+        self.assertEqual(Recipe.objects.count(), 2)
@@ -0,0 +1,107 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredient
+from recipe.autocomplete import ingredient_index
+
+
+AUTOCOMPLETE_URL = reverse("recipe:ingredient-autocomplete")
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+def ingredient_detail_url(ingredient_id):
+    """Return ingredient detail URL"""
+    return reverse("recipe:ingredient-detail", args=[ingredient_id])
+
+
+def create_recipe_using(*ingredients):
+    """Create a recipe that uses the given ingredients"""
+    recipe = Recipe.objects.create(title="Sample recipe")
+    recipe.ingredients.add(*ingredients)
+    return recipe
+
+
+class AutocompleteApiTests(TestCase):
+    """Test the ingredient autocomplete endpoint"""
+
+    def setUp(self):
+        self.client = APIClient()
+        ingredient_index.reset()
+        self.addCleanup(ingredient_index.reset)
+
+    def suggest(self, q, **params):
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": q, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [suggestion["name"] for suggestion in res.data]
+
+    def test_prefix_matches_ranked_by_usage(self):
+        """Test prefix matches are ordered by how many recipes use them"""
+        salt = Ingredient.objects.create(name="Salt")
+        salmon = Ingredient.objects.create(name="Salmon")
+        salami = Ingredient.objects.create(name="Salami")
+        Ingredient.objects.create(name="Pepper")
+        create_recipe_using(salmon, salt)
+        create_recipe_using(salmon)
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "sal"})
+
+        self.assertEqual(
+            res.data,
+            [
+                {"id": salmon.id, "name": "Salmon", "recipe_count": 2},
+                {"id": salt.id, "name": "Salt", "recipe_count": 1},
+                {"id": salami.id, "name": "Salami", "recipe_count": 0},
+            ],
+        )
+
+    def test_typo_tolerant_matches(self):
+        """Test misspelt queries still find the ingredient"""
+        Ingredient.objects.create(name="Tomato")
+        Ingredient.objects.create(name="Potato wedges")
+
+        self.assertEqual(self.suggest("tomatoe")[0], "Tomato")
+
+    def test_limit(self):
+        """Test the number of suggestions can be limited"""
+        for i in range(5):
+            Ingredient.objects.create(name=f"Chilli {i}")
+
+        self.assertEqual(len(self.suggest("chi", limit=2)), 2)
+        self.assertEqual(len(self.suggest("chi", limit=1000)), 5)
+
+    def test_empty_query(self):
+        """Test an empty query returns no suggestions"""
+        Ingredient.objects.create(name="Salt")
+
+        self.assertEqual(self.suggest(""), [])
+
+    def test_index_follows_recipe_creates(self):
+        """Test new ingredients and usage from created recipes are indexed"""
+        Ingredient.objects.create(name="Basil")
+        self.suggest("ba")
+        payload = {"title": "Pesto", "ingredients": [{"name": "Basil leaves"}]}
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(RECIPES_URL, payload, format="json")
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "bas"})
+        self.assertEqual(res.data[0]["name"], "Basil leaves")
+        self.assertEqual(res.data[0]["recipe_count"], 1)
+
+    def test_index_follows_ingredient_updates(self):
+        """Test renamed and deleted ingredients are reflected"""
+        kale = Ingredient.objects.create(name="Kale")
+        leek = Ingredient.objects.create(name="Leek")
+        self.suggest("k")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(ingredient_detail_url(kale.id), {"name": "Cabbage"})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(ingredient_detail_url(leek.id))
+
+        self.assertEqual(self.suggest("k"), [])
+        self.assertEqual(self.suggest("cab"), ["Cabbage"])
+        self.assertEqual(self.suggest("lee"), [])
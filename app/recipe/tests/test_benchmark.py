@@ -0,0 +1,108 @@
+"""
+Tests for the API benchmark
+"""
+import io
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import LiveServerTestCase, TestCase, override_settings
+
+from core.models import Recipe
+from recipe import benchmark, server_benchmark
+
+
+class BenchmarkTests(TestCase):
+    """Test the benchmark seeds data and reports every scenario"""
+
+    def test_seed(self):
+        """Test seeding creates the requested catalogue"""
+        benchmark.seed(20, 3)
+
+        self.assertEqual(Recipe.objects.count(), 20)
+        for recipe in Recipe.objects.all():
+            self.assertEqual(recipe.ingredients.count(), 3)
+
+    def test_run(self):
+        """Test a run reports latency, throughput and queries per scenario"""
+        report = benchmark.run(
+            recipes=30, ingredients_per_recipe=2, iterations=3, warmup=1
+        )
+
+        self.assertEqual(report["dataset"]["recipes"], 30)
+        self.assertIn("recipe.list", report["results"])
+        self.assertIn("ingredient.autocomplete", report["results"])
+        self.assertIn("service.update", report["results"])
+        for result in report["results"].values():
+            self.assertEqual(result["iterations"], 3)
+            self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+            self.assertGreater(result["throughput_per_s"], 0)
+        self.assertEqual(report["results"]["recipe.list"]["queries"], 1)
+
+    def test_run_only(self):
+        """Test scenarios can be selected by prefix"""
+        report = benchmark.run(
+            recipes=5,
+            ingredients_per_recipe=1,
+            iterations=2,
+            warmup=0,
+            only=["ingredient."],
+        )
+
+        self.assertTrue(report["results"])
+        for name in report["results"]:
+            self.assertTrue(name.startswith("ingredient."))
+
+
+class ServerBenchmarkTests(LiveServerTestCase):
+    """Test the server load generator against a live server"""
+
+    def test_run(self):
+        """Test both scenarios report latencies for every target"""
+        Recipe.objects.create(title="Toast")
+        targets = [
+            server_benchmark.Target("sync", f"{self.live_server_url}/api/recipe"),
+            server_benchmark.Target(
+                "async", f"{self.live_server_url}/api/recipe/async"
+            ),
+        ]
+
+        report = server_benchmark.run(
+            targets,
+            paths=["/recipes/", "/missing/"],
+            clients=2,
+            duration=0.5,
+            slow_clients=1,
+            slow_seconds=0.1,
+        )
+
+        for name in ("sync", "async"):
+            for scenario in ("concurrency", "slow_clients"):
+                result = report["results"][name][scenario]
+                self.assertGreater(result["requests"], 0)
+                self.assertGreater(result["errors"], 0)
+                self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+
+    @override_settings(
+        REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK,
+            "DEFAULT_THROTTLE_RATES": {"read": "1/min"},
+        }
+    )
+    def test_throttled(self):
+        """Test throttled requests are counted apart and reported"""
+        cache.clear()
+        stderr = io.StringIO()
+
+        call_command(
+            "benchmark_servers",
+            f"--target=sync={self.live_server_url}",
+            "--path=/api/recipe/recipes/",
+            clients=1,
+            duration=0.2,
+            slow_clients=0,
+            stdout=io.StringIO(),
+            stderr=stderr,
+        )
+
+        self.assertIn("THROTTLE_READ_RATE=", stderr.getvalue())
@@ -0,0 +1,153 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredient
+
+
+BULK_URL = reverse("recipe:recipe-bulk")
+
+
+class BulkApiTests(TestCase):
+    """Test the bulk recipe endpoint"""
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def post(self, items):
+        return self.client.post(BULK_URL, items, format="json")
+
+    def test_bulk_create(self):
+        """Test creating many recipes with nested ingredients"""
+        Ingredient.objects.create(name="Salt")
+        items = [
+            {
+                "op": "create",
+                "title": f"Recipe {i}",
+                "ingredients": [{"name": "salt"}, {"name": f"Spice {i}"}],
+            }
+            for i in range(3)
+        ]
+
+        res = self.post(items)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r["status"] for r in res.data["results"]], [201] * 3)
+        for result, item in zip(res.data["results"], items):
+            recipe = Recipe.objects.get(id=result["id"])
+            self.assertEqual(recipe.title, item["title"])
+            self.assertEqual(
+                sorted(recipe.ingredients.values_list("name", flat=True)),
+                sorted(["Salt", item["ingredients"][1]["name"]]),
+            )
+        self.assertEqual(Ingredient.objects.count(), 4)
+
+    def test_bulk_mixed_operations(self):
+        """Test creates, updates and deletes in the same request"""
+        keep = Recipe.objects.create(title="Keep", description="Old")
+        keep.ingredients.add(Ingredient.objects.create(name="Leek"))
+        keep.refresh_from_db()
+        version = keep.version
+        gone = Recipe.objects.create(title="Gone")
+
+        res = self.post(
+            [
+                {"op": "update", "id": keep.id, "title": "Kept"},
+                {"op": "create", "title": "New"},
+                {"op": "delete", "id": gone.id},
+            ]
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(r["op"], r["status"]) for r in res.data["results"]],
+            [("update", 200), ("create", 201), ("delete", 204)],
+        )
+        keep.refresh_from_db()
+        self.assertEqual(keep.title, "Kept")
+        self.assertEqual(keep.description, "Old")
+        self.assertEqual(keep.version, version + 1)
+        self.assertEqual(
+            list(keep.ingredients.values_list("name", flat=True)), ["Leek"]
+        )
+        self.assertFalse(Recipe.objects.filter(id=gone.id).exists())
+        self.assertTrue(Recipe.objects.filter(title="New").exists())
+
+    def test_bulk_update_replaces_ingredients(self):
+        """Test updates with ingredients replace the recipe's ingredients"""
+        recipe = Recipe.objects.create(title="Soup")
+        recipe.ingredients.add(Ingredient.objects.create(name="Leek"))
+
+        self.post(
+            [{"op": "update", "id": recipe.id, "ingredients": [{"name": "Onion"}]}]
+        )
+
+        self.assertEqual(
+            list(recipe.ingredients.values_list("name", flat=True)), ["Onion"]
+        )
+
+    def test_bulk_errors_apply_nothing(self):
+        """Test an invalid item rejects the whole batch with per-item errors"""
+        recipe = Recipe.objects.create(title="Soup")
+
+        res = self.post(
+            [
+                {"op": "create", "title": "Valid"},
+                {"op": "create"},
+                {"op": "update", "title": "No id"},
+                {"op": "delete", "id": recipe.id + 100},
+                {"op": "explode", "id": recipe.id},
+            ]
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([e["index"] for e in res.data["errors"]], [1, 2, 4])
+        self.assertEqual(Recipe.objects.count(), 1)
+
+        res = self.post([{"op": "delete", "id": recipe.id + 100}])
+        self.assertEqual(res.data["errors"][0]["index"], 0)
+
+    def test_bulk_rejects_duplicate_ids(self):
+        """Test the same recipe cannot be targeted twice in one batch"""
+        recipe = Recipe.objects.create(title="Soup")
+
+        res = self.post(
+            [
+                {"op": "update", "id": recipe.id, "title": "Broth"},
+                {"op": "delete", "id": recipe.id},
+            ]
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Recipe.objects.filter(id=recipe.id).exists())
+
+    def test_bulk_rejects_non_list(self):
+        """Test the request body must be a list"""
+        res = self.post({"op": "create", "title": "Soup"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_query_budget(self):
+        """Test the number of queries does not grow with the batch size"""
+        for count in (2, 50):
+            existing = [
+                Recipe.objects.create(title=f"Existing {i}") for i in range(count)
+            ]
+            items = [
+                {
+                    "op": "create",
+                    "title": f"Recipe {count}-{i}",
+                    "ingredients": [{"name": f"Ingredient {count}-{i}"}],
+                }
+                for i in range(count)
+            ] + [
+                {"op": "update", "id": r.id, "ingredients": [{"name": "Salt"}]}
+                for r in existing
+            ]
+            with self.assertNumQueries(12):
+                res = self.post(items)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
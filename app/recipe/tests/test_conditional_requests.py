@@ -0,0 +1,162 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredient
+from recipe.tests.test_jobs import run_queue
+
+
+RECIPES_URL = reverse("recipe:recipe-list")
+INGREDIENTS_URL = reverse("recipe:ingredient-list")
+
+
+def recipe_detail_url(recipe_id):
+    """Return recipe detail URL"""
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+def ingredient_detail_url(ingredient_id):
+    """Return ingredient detail URL"""
+    return reverse("recipe:ingredient-detail", args=[ingredient_id])
+
+
+class ConditionalRequestTests(TestCase):
+    """Test ETag based conditional requests"""
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.recipe = Recipe.objects.create(title="Soup")
+        self.leek = Ingredient.objects.create(name="Leek")
+        self.recipe.ingredients.add(self.leek)
+
+    def test_detail_not_modified(self):
+        """Test a matching If-None-Match gets an empty 304"""
+        url = recipe_detail_url(self.recipe.id)
+        etag = self.client.get(url)["ETag"]
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+        self.assertFalse(res.content)
+
+    def test_not_modified_skips_serialization(self):
+        """Test a 304 is answered before ingredients are loaded"""
+        url = recipe_detail_url(self.recipe.id)
+        detail_etag = self.client.get(url)["ETag"]
+        list_etag = self.client.get(RECIPES_URL)["ETag"]
+        cache.clear()
+
+        with self.assertNumQueries(1):
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_changes_on_update(self):
+        """Test updating a recipe changes its ETag and the list ETag"""
+        url = recipe_detail_url(self.recipe.id)
+        detail_etag = self.client.get(url)["ETag"]
+        list_etag = self.client.get(RECIPES_URL)["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.patch(url, {"title": "Broth"})
+        self.assertNotEqual(res["ETag"], detail_etag)
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_ingredient_rename_changes_recipe_etag(self):
+        """Test renaming an ingredient changes the ETag of its recipes"""
+        url = recipe_detail_url(self.recipe.id)
+        etag = self.client.get(url)["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(ingredient_detail_url(self.leek.id), {"name": "Onion"})
+            run_queue()
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["ingredients"][0]["name"], "Onion")
+
+    def test_create_returns_etag(self):
+        """Test the created recipe's ETag matches its detail ETag"""
+        res = self.client.post(RECIPES_URL, {"title": "Stew"})
+
+        detail = self.client.get(recipe_detail_url(res.data["id"]))
+        self.assertEqual(res["ETag"], detail["ETag"])
+
+    def test_if_match_update(self):
+        """Test updates with a current If-Match succeed, stale ones get 412"""
+        url = recipe_detail_url(self.recipe.id)
+        etag = self.client.get(url)["ETag"]
+
+        res = self.client.patch(url, {"title": "Broth"}, HTTP_IF_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.put(url, {"title": "Stock"}, HTTP_IF_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.title, "Broth")
+
+    def test_if_match_rejects_weak_etag(self):
+        """Test If-Match only matches strong ETags"""
+        url = recipe_detail_url(self.recipe.id)
+        etag = self.client.get(url)["ETag"]
+
+        res = self.client.patch(url, {"title": "Broth"}, HTTP_IF_MATCH=f"W/{etag}")
+
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.title, "Soup")
+
+    def test_if_match_lost_update(self):
+        """Test a write racing between the check and the update is rejected"""
+        url = recipe_detail_url(self.recipe.id)
+        etag = self.client.get(url)["ETag"]
+        Recipe.objects.filter(pk=self.recipe.pk).update(version=5)
+
+        res = self.client.patch(url, {"title": "Broth"}, HTTP_IF_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+    def test_if_match_delete(self):
+        """Test deletes honour If-Match"""
+        url = recipe_detail_url(self.recipe.id)
+
+        res = self.client.delete(url, HTTP_IF_MATCH='"recipe-0-v0"')
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+        etag = self.client.get(url)["ETag"]
+        res = self.client.delete(url, HTTP_IF_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_ingredient_list_not_modified(self):
+        """Test the ingredient list supports If-None-Match"""
+        etag = self.client.get(INGREDIENTS_URL)["ETag"]
+
+        res = self.client.get(INGREDIENTS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Ingredient.objects.create(name="Salt")
+        res = self.client.get(INGREDIENTS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_ingredient_if_match(self):
+        """Test ingredient updates and deletes honour If-Match"""
+        url = ingredient_detail_url(self.leek.id)
+        res = self.client.patch(url, {"name": "Onion"})
+        etag = res["ETag"]
+
+        res = self.client.patch(url, {"name": "Shallot"}, HTTP_IF_MATCH='"x"')
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        res = self.client.delete(url, HTTP_IF_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
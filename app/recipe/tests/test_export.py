@@ -0,0 +1,116 @@
+"""
+Tests for the streaming recipe export
+"""
+import csv
+import io
+import json
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredient
+from recipe import export
+
+
+EXPORT_URL = reverse("recipe:recipe-export")
+
+
+def create_catalogue():
+    salt = Ingredient.objects.create(name="Salt")
+    pepper = Ingredient.objects.create(name="Pepper")
+    soup = Recipe.objects.create(title="Soup", description="Hot, salty")
+    soup.ingredients.add(salt, pepper)
+    Recipe.objects.create(title="Toast")
+    return soup, salt, pepper
+
+
+class ExportTests(TestCase):
+    """Test exporting the recipe catalogue"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_export_ndjson(self):
+        """Test the export streams one JSON document per recipe"""
+        soup, salt, pepper = create_catalogue()
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in res.getvalue().decode().splitlines()]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(
+            rows[0],
+            {
+                "id": soup.id,
+                "title": "Soup",
+                "description": "Hot, salty",
+                "ingredients": [
+                    {"id": salt.id, "name": "Salt"},
+                    {"id": pepper.id, "name": "Pepper"},
+                ],
+            },
+        )
+        self.assertEqual(rows[1]["ingredients"], [])
+
+    def test_export_csv(self):
+        """Test the export can be requested as CSV"""
+        soup, salt, pepper = create_catalogue()
+
+        res = self.client.get(EXPORT_URL, {"format": "csv"})
+
+        self.assertEqual(res["Content-Type"], "text/csv")
+        rows = list(csv.reader(io.StringIO(res.getvalue().decode())))
+        self.assertEqual(rows[0], export.CSV_HEADER)
+        self.assertEqual(
+            rows[1],
+            [
+                str(soup.id),
+                "Soup",
+                "Hot, salty",
+                f"{salt.id}|{pepper.id}",
+                "Salt|Pepper",
+            ],
+        )
+        self.assertEqual(len(rows), 3)
+
+    def test_export_errors_are_json(self):
+        """Test errors of the export are sent as JSON, whatever the format"""
+        for res in (
+            self.client.post(f"{EXPORT_URL}?format=csv"),
+            self.client.get(EXPORT_URL, HTTP_ACCEPT="application/xml"),
+        ):
+            self.assertGreaterEqual(res.status_code, 400)
+            self.assertEqual(res["Content-Type"], "application/json")
+            self.assertIn("detail", json.loads(res.content))
+
+    def test_export_reads_in_chunks(self):
+        """Test each chunk costs one query however many ingredients it has"""
+        for i in range(5):
+            recipe = Recipe.objects.create(title=f"Recipe {i}")
+            for j in range(3):
+                recipe.ingredients.add(
+                    Ingredient.objects.create(name=f"Ingredient {i}-{j}")
+                )
+
+        # Three chunks of recipes, then an empty chunk.
+        with self.assertNumQueries(4):
+            rows = list(export.iter_recipes(chunk_size=2))
+
+        self.assertEqual(len(rows), 5)
+        self.assertEqual([len(row["ingredients"]) for row in rows], [3] * 5)
+
+    def test_export_command(self):
+        """Test the export command writes the catalogue to stdout"""
+        create_catalogue()
+        out = io.StringIO()
+
+        call_command("export_recipes", "--format", "csv", stdout=out)
+
+        rows = list(csv.reader(io.StringIO(out.getvalue())))
+        self.assertEqual([row[1] for row in rows[1:]], ["Soup", "Toast"])
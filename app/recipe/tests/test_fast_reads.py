@@ -0,0 +1,98 @@
+"""
+Parity tests for the serializer-free recipe read path
+"""
+import json
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredient
+
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL"""
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+@override_settings(RECIPE_CACHE_RESPONSES=False)
+class FastReadParityTests(TestCase):
+    """Test the fast read path returns what the serializers would"""
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        salt = Ingredient.objects.create(name="Salt")
+        leek = Ingredient.objects.create(name="Leek")
+        potato = Ingredient.objects.create(name="Potato")
+        self.soup = Recipe.objects.create(title="Leek soup", description="Warm")
+        # Linked out of id order, to check both paths order ingredients alike
+        self.soup.ingredients.add(potato)
+        self.soup.ingredients.add(salt, leek)
+        chips = Recipe.objects.create(title="Chips")
+        chips.ingredients.add(potato, salt)
+        Recipe.objects.create(title="Water")
+
+    def get_both(self, url, params=None):
+        """Return the (fast, serializer) responses to the same request"""
+        responses = []
+        for fast in (True, False):
+            with self.settings(RECIPE_FAST_READS=fast):
+                responses.append(self.client.get(url, params))
+        return responses
+
+    def assertParity(self, url, params=None):
+        fast, slow = self.get_both(url, params)
+        self.assertEqual(fast.status_code, slow.status_code)
+        self.assertEqual(json.loads(fast.content), json.loads(slow.content))
+        self.assertEqual(fast.get("ETag"), slow.get("ETag"))
+        return fast
+
+    def test_list_parity(self):
+        """Test listing recipes"""
+        res = self.assertParity(RECIPES_URL, {"expand": "ingredients"})
+
+        self.assertEqual(len(res.data["results"]), 3)
+        self.assertEqual(
+            [i["name"] for i in res.data["results"][0]["ingredients"]],
+            ["Salt", "Leek", "Potato"],
+        )
+
+    def test_paginated_list_parity(self):
+        """Test both paths produce the same pages and cursors"""
+        res = self.assertParity(RECIPES_URL, {"page_size": 2})
+
+        self.assertParity(res.data["next"])
+
+    def test_unexpanded_list_parity(self):
+        """Test listing recipes without their ingredients"""
+        self.assertParity(RECIPES_URL)
+
+    def test_sparse_fields_parity(self):
+        """Test selecting fields"""
+        self.assertParity(RECIPES_URL, {"fields": "title,ingredients"})
+        self.assertParity(detail_url(self.soup.id), {"fields": "description"})
+
+    def test_search_parity(self):
+        """Test searching recipes"""
+        self.assertParity(RECIPES_URL, {"search": "leek"})
+
+    def test_ingredient_filter_parity(self):
+        """Test filtering recipes by ingredient"""
+        potato = Ingredient.objects.get(name="Potato")
+        self.assertParity(RECIPES_URL, {"ingredients": str(potato.id)})
+
+    def test_detail_parity(self):
+        """Test retrieving a recipe"""
+        res = self.assertParity(detail_url(self.soup.id))
+
+        self.assertEqual(res.data["description"], "Warm")
+
+    def test_missing_detail_parity(self):
+        """Test retrieving a missing recipe"""
+        self.assertParity(detail_url(0))
@@ -0,0 +1,192 @@
+"""
+Tests for recipe image uploads and thumbnails
+"""
+import io
+import shutil
+import tempfile
+
+from PIL import Image
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Job, Recipe
+from recipe import images, jobs, thumbnails
+from recipe.tests.test_jobs import run_queue
+
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+def detail_url(recipe_id):
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+def upload_url(recipe_id):
+    return reverse("recipe:recipe-upload-image", args=[recipe_id])
+
+
+def image_file(size=(2000, 1000), image_format="JPEG", color="orange"):
+    data = io.BytesIO()
+    Image.new("RGB", size, color).save(data, image_format)
+    data.seek(0)
+    data.name = f"upload.{thumbnails.extension(image_format)}"
+    return data
+
+
+class ImageUploadTests(TestCase):
+    """Test uploading recipe images"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.media_root = media_root
+        self.client = APIClient()
+        cache.clear()
+        self.recipe = Recipe.objects.create(title="Soup")
+
+    def upload(self, upload=None, **extra):
+        return self.client.post(
+            upload_url(self.recipe.id),
+            {"image": upload or image_file()},
+            format="multipart",
+            **extra,
+        )
+
+    def test_upload_image(self):
+        """Test the upload is stored under its content hash"""
+        res = self.upload()
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.recipe.refresh_from_db()
+        name = self.recipe.image.name
+        self.assertRegex(name, r"^recipes/[0-9a-f]{32}\.jpg$")
+        self.assertEqual(self.recipe.version, 2)
+        self.assertEqual(
+            res.data["images"], dict.fromkeys(images.size_names(), f"/media/{name}")
+        )
+        self.assertEqual(res.data["job"]["kind"], jobs.THUMBNAILS)
+        self.assertEqual(res["ETag"], f'"recipe-{self.recipe.id}-v2"')
+
+    def test_same_content_same_name(self):
+        """Test uploading the same image twice reuses the stored file"""
+        self.upload(image_file())
+        first = Recipe.objects.get().image.name
+        self.upload(image_file())
+
+        self.assertEqual(Recipe.objects.get().image.name, first)
+
+    def test_upload_invalid_image(self):
+        """Test files that are not images are rejected"""
+        data = io.BytesIO(b"not an image")
+        data.name = "notes.txt"
+
+        res = self.upload(data)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(RECIPE_IMAGE_MAX_BYTES=100)
+    def test_upload_too_large(self):
+        """Test images over the size limit are rejected"""
+        res = self.upload()
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_thumbnails(self):
+        """Test the job renders every size and the API links to them"""
+        self.upload()
+
+        [job] = run_queue()
+
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.recipe.refresh_from_db()
+        for size, pixels in images.sizes().items():
+            name = self.recipe.image_thumbnails[size]
+            self.assertRegex(name, r"^recipes/[0-9a-f]{32}\.jpg$")
+            with Image.open(f"{self.media_root}/{name}") as thumbnail:
+                self.assertEqual(thumbnail.size, (pixels, pixels // 2))
+
+        res = self.client.get(detail_url(self.recipe.id), {"image_size": "small"})
+        small = f"/media/{self.recipe.image_thumbnails['small']}"
+        self.assertEqual(res.data["image"], small)
+        res = self.client.get(RECIPES_URL, {"image_size": "small"})
+        self.assertEqual(res.data["results"][0]["image"], small)
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertEqual(res.data["image"], f"/media/{self.recipe.image.name}")
+
+    def test_replaced_image(self):
+        """Test thumbnails of a replaced image are not recorded"""
+        self.upload(image_file(color="red"))
+        self.upload(image_file(color="blue"))
+
+        first, second = run_queue()
+
+        self.assertFalse(first.result["recorded"])
+        self.assertTrue(second.result["recorded"])
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image.name, second.payload["image"])
+        self.assertEqual(
+            f"/media/{self.recipe.image_thumbnails['small']}",
+            second.result["images"]["small"],
+        )
+
+    def test_image_size_etag(self):
+        """Test each image size has its own ETag"""
+        original = self.client.get(detail_url(self.recipe.id))
+        small = self.client.get(detail_url(self.recipe.id), {"image_size": "small"})
+
+        self.assertNotEqual(original["ETag"], small["ETag"])
+
+    def test_unknown_image_size(self):
+        """Test unknown image sizes are rejected"""
+        res = self.client.get(detail_url(self.recipe.id), {"image_size": "huge"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(DEBUG=True)
+    def test_media_cache_headers(self):
+        """Test images are served with long-lived cache headers"""
+        url = self.upload().data["images"]["original"]
+
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "image/jpeg")
+        self.assertIn("max-age=31536000", res["Cache-Control"])
+        self.assertIn("immutable", res["Cache-Control"])
+
+    def test_media_not_served_in_production(self):
+        """Test the application only serves media files under DEBUG"""
+        url = self.upload().data["images"]["original"]
+
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ThumbnailTests(TestCase):
+    """Test rendering thumbnails"""
+
+    def test_keeps_aspect_ratio(self):
+        data = image_file(size=(300, 600), image_format="PNG").getvalue()
+
+        thumbnail, image_format = thumbnails.make_thumbnail(data, 100)
+
+        self.assertEqual(image_format, "PNG")
+        with Image.open(io.BytesIO(thumbnail)) as image:
+            self.assertEqual(image.size, (50, 100))
+
+    def test_converts_other_formats(self):
+        data = image_file(size=(300, 300), image_format="GIF").getvalue()
+
+        _, image_format = thumbnails.make_thumbnail(data, 100)
+
+        self.assertEqual(image_format, "PNG")
@@ -1,3 +1,5 @@
+from unittest import mock
+
 from django.urls import reverse
 from django.test import TestCase
 
@@ -31,7 +33,7 @@ class IngredientsApiTests(TestCase):
         serializer = IngredientSerializer(ingredients, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_update_ingredient(self):
         """Tests for updating an ingredient"""
@@ -45,6 +47,33 @@ class IngredientsApiTests(TestCase):
         ingredient.refresh_from_db()
         self.assertEqual(ingredient.name, payload["name"])
 
+    def test_update_ingredient_name_clash(self):
+        """Test renaming an ingredient to an existing name is rejected"""
+        Ingredient.objects.create(name="Kale")
+        ingredient = Ingredient.objects.create(name="Cabbage")
+
+        res = self.client.patch(detail_url(ingredient.id), {"name": "kale"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        ingredient.refresh_from_db()
+        self.assertEqual(ingredient.name, "Cabbage")
+
+    def test_update_ingredient_name_taken_concurrently(self):
+        """Test a rename losing a race for the name is rejected"""
+        Ingredient.objects.create(name="Kale")
+        ingredient = Ingredient.objects.create(name="Cabbage")
+
+        # As if "Kale" was taken between validation and the write
+        with mock.patch.object(
+            IngredientSerializer, "validate_name", lambda self, value: value
+        ):
+            res = self.client.patch(detail_url(ingredient.id), {"name": "KALE"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("name", res.data)
+        ingredient.refresh_from_db()
+        self.assertEqual(ingredient.name, "Cabbage")
+
     def test_delete_ingredient(self):
         """Tests for deleting an ingredient"""
         ingredient = Ingredient.objects.create(name="Kale")
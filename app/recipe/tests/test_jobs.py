@@ -0,0 +1,274 @@
+"""
+Tests for background jobs
+"""
+import io
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Job, Recipe
+from recipe import jobs
+
+
+RECIPES_URL = reverse("recipe:recipe-list")
+BULK_URL = reverse("recipe:recipe-bulk")
+EXPORT_URL = reverse("recipe:recipe-export")
+
+
+def job_url(job_id):
+    return reverse("recipe:job-detail", args=[job_id])
+
+
+def run_queue():
+    """Run every queued job, returning the jobs run"""
+    done = []
+    while True:
+        job = jobs.claim("test")
+        if job is None:
+            return done
+        done.append(jobs.run(job))
+
+
+class AsyncApiTests(TestCase):
+    """Test submitting operations as jobs through the API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def test_create_async(self):
+        """Test a create with Prefer: respond-async is queued"""
+        payload = {"title": "Stew", "ingredients": [{"name": "Leek"}]}
+
+        res = self.client.post(
+            RECIPES_URL, payload, format="json", HTTP_PREFER="respond-async"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data["status"], Job.QUEUED)
+        self.assertEqual(res["Preference-Applied"], "respond-async")
+        self.assertTrue(res["Location"].endswith(job_url(res.data["id"])))
+        self.assertFalse(Recipe.objects.exists())
+
+        [job] = run_queue()
+
+        recipe = Recipe.objects.get()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result["id"], recipe.id)
+        self.assertEqual(recipe.ingredient_count, 1)
+        self.assertEqual(recipe.ingredients.get().name, "Leek")
+
+    def test_create_async_invalid(self):
+        """Test invalid payloads are rejected before being queued"""
+        res = self.client.post(
+            RECIPES_URL, {"title": ""}, format="json", HTTP_PREFER="respond-async"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Job.objects.exists())
+
+    def test_create_without_preference(self):
+        """Test creates run in the request unless asked otherwise"""
+        res = self.client.post(
+            RECIPES_URL, {"title": "Stew"}, format="json", HTTP_PREFER="return=minimal"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(Job.objects.exists())
+
+    def test_job_status(self):
+        """Test polling a job until it has finished"""
+        job = jobs.submit(jobs.CREATE, {"title": "Stew"})
+
+        queued = self.client.get(job_url(job.id))
+        run_queue()
+        finished = self.client.get(job_url(job.id))
+
+        self.assertEqual(queued.data["status"], Job.QUEUED)
+        self.assertEqual(queued["Retry-After"], "1")
+        self.assertEqual(finished.data["status"], Job.SUCCEEDED)
+        self.assertEqual(finished.data["result"]["title"], "Stew")
+        self.assertEqual(finished.data["attempts"], 1)
+        self.assertNotIn("Retry-After", finished)
+
+    def test_bulk_async(self):
+        """Test a bulk request is validated, then applied by a job"""
+        gone = Recipe.objects.create(title="Gone")
+        items = [
+            {"op": "create", "title": "New", "ingredients": [{"name": "Salt"}]},
+            {"op": "delete", "id": gone.id},
+        ]
+
+        res = self.client.post(
+            BULK_URL, items, format="json", HTTP_PREFER="respond-async"
+        )
+        [job] = run_queue()
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        new = Recipe.objects.get()
+        self.assertEqual(new.title, "New")
+        self.assertEqual(
+            job.result["results"],
+            [
+                {"index": 0, "op": "create", "id": new.id, "status": 201},
+                {"index": 1, "op": "delete", "id": gone.id, "status": 204},
+            ],
+        )
+
+    def test_bulk_async_invalid(self):
+        """Test bulk items are checked before being queued"""
+        res = self.client.post(
+            BULK_URL,
+            [{"op": "delete", "id": 12345}],
+            format="json",
+            HTTP_PREFER="respond-async",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Job.objects.exists())
+
+    def test_failed_job_rolls_back(self):
+        """Test a failing job records its error and leaves no writes"""
+        gone = Recipe.objects.create(title="Gone")
+        self.client.post(
+            BULK_URL,
+            [{"op": "create", "title": "New"}, {"op": "delete", "id": gone.id}],
+            format="json",
+            HTTP_PREFER="respond-async",
+        )
+        gone.delete()
+
+        with self.assertLogs("recipe.jobs", "ERROR"):
+            [job] = run_queue()
+
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn("VersionConflict", job.error)
+        self.assertFalse(Recipe.objects.exists())
+        res = self.client.get(job_url(job.id))
+        self.assertEqual(res.data["status"], Job.FAILED)
+
+    def test_export_async(self):
+        """Test an export job writes the catalogue to a file"""
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        soup = Recipe.objects.create(title="Soup")
+        soup.ingredients.add(Ingredient.objects.create(name="Salt"))
+
+        with override_settings(MEDIA_ROOT=media_root):
+            res = self.client.get(
+                EXPORT_URL, {"format": "ndjson"}, HTTP_PREFER="respond-async"
+            )
+            [job] = run_queue()
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res["Content-Type"], "application/json")
+        self.assertEqual(json.loads(res.content)["kind"], jobs.EXPORT)
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result["format"], "ndjson")
+        path = job.result["url"].split("/media/", 1)[1]
+        with open(f"{media_root}/{path}") as exported:
+            [row] = [json.loads(line) for line in exported]
+        self.assertEqual(row["title"], "Soup")
+        self.assertEqual(row["ingredients"][0]["name"], "Salt")
+
+    def test_ingredient_rename_refreshes_recipes_in_job(self):
+        """Test renaming an ingredient queues the refresh of its recipes"""
+        soup = Recipe.objects.create(title="Soup")
+        leek = Ingredient.objects.create(name="Leek")
+        soup.ingredients.add(leek)
+        soup.refresh_from_db()
+
+        self.client.patch(
+            reverse("recipe:ingredient-detail", args=[leek.id]), {"name": "Onion"}
+        )
+        self.assertEqual(Recipe.objects.get().version, soup.version)
+        [job] = run_queue()
+
+        self.assertEqual(job.kind, jobs.REFRESH_RECIPES)
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result, {"recipes": 1})
+        soup.refresh_from_db()
+        self.assertIn("Onion", str(soup.ingredient_summary))
+
+
+class QueueTests(TestCase):
+    """Test claiming jobs from the queue"""
+
+    def test_claim_oldest_once(self):
+        """Test jobs are claimed oldest first, and only once"""
+        first = jobs.submit(jobs.CREATE, {"title": "First"})
+        second = jobs.submit(jobs.CREATE, {"title": "Second"})
+
+        claimed = [jobs.claim("a"), jobs.claim("b"), jobs.claim("c")]
+
+        self.assertEqual([job.id for job in claimed[:2]], [first.id, second.id])
+        self.assertIsNone(claimed[2])
+        self.assertEqual(claimed[0].status, Job.RUNNING)
+        self.assertEqual(claimed[0].worker, "a")
+
+    def test_unknown_kind(self):
+        """Test only registered kinds of job can be queued"""
+        with self.assertRaises(ValueError):
+            jobs.submit("recipe.unknown", {})
+
+    def test_requeue_stalled(self):
+        """Test jobs of dead workers are queued again, up to a limit"""
+        long_ago = timezone.now() - timedelta(hours=1)
+        stalled = Job.objects.create(
+            kind=jobs.CREATE, status=Job.RUNNING, attempts=1, started_at=long_ago
+        )
+        exhausted = Job.objects.create(
+            kind=jobs.CREATE, status=Job.RUNNING, attempts=3, started_at=long_ago
+        )
+        running = Job.objects.create(
+            kind=jobs.CREATE, status=Job.RUNNING, attempts=1, started_at=timezone.now()
+        )
+
+        requeued = jobs.requeue_stalled(timeout=60, max_attempts=3)
+
+        self.assertEqual(requeued, 1)
+        statuses = dict(Job.objects.values_list("id", "status"))
+        self.assertEqual(statuses[stalled.id], Job.QUEUED)
+        self.assertEqual(statuses[exhausted.id], Job.FAILED)
+        self.assertEqual(statuses[running.id], Job.RUNNING)
+
+    def test_late_outcome_ignored(self):
+        """Test a requeued job's first worker cannot record an outcome"""
+        job = jobs.submit(jobs.CREATE, {"title": "Stew"})
+        claimed = jobs.claim("slow")
+        Job.objects.filter(pk=job.pk).update(status=Job.QUEUED, worker="")
+
+        jobs.run(claimed)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertFalse(Recipe.objects.exists())
+
+
+class WorkerCommandTests(TransactionTestCase):
+    """Test the run_worker command"""
+
+    def test_burst(self):
+        """Test a burst worker runs the queue and exits"""
+        for title in ("One", "Two", "Three"):
+            jobs.submit(jobs.CREATE, {"title": title})
+
+        call_command("run_worker", "--burst", stdout=io.StringIO())
+
+        self.assertEqual(
+            sorted(Recipe.objects.values_list("title", flat=True)),
+            ["One", "Three", "Two"],
+        )
+        self.assertEqual(
+            set(Job.objects.values_list("status", flat=True)), {Job.SUCCEEDED}
+        )
@@ -0,0 +1,109 @@
+import json
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredient
+
+
+RECIPES_URL = reverse("recipe:recipe-list")
+INGREDIENTS_URL = reverse("recipe:ingredient-list")
+SCHEMA_URL = reverse("api-json")
+
+
+class PaginationTests(TestCase):
+    """Test cursor pagination of the list endpoints"""
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def test_walk_recipe_pages(self):
+        """Test following next links returns every recipe once, in id order"""
+        recipes = [Recipe.objects.create(title=f"Recipe {i}") for i in range(7)]
+
+        seen = []
+        url = RECIPES_URL + "?page_size=3"
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            seen += [recipe["id"] for recipe in res.data["results"]]
+            url = res.data["next"]
+
+        self.assertEqual(seen, [recipe.id for recipe in recipes])
+
+    def test_walk_search_pages_with_tied_ranks(self):
+        """Test pages of equally ranked search results do not repeat or end"""
+        Recipe.objects.bulk_create(
+            [Recipe(title=f"Soup {i}") for i in range(2200)]
+        )
+
+        seen = []
+        url = f"{RECIPES_URL}?search=soup&page_size=500"
+        while url and len(seen) < 5000:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            seen += [recipe["id"] for recipe in res.data["results"]]
+            url = res.data["next"]
+            last = res
+
+        self.assertEqual(len(seen), 2200)
+        self.assertEqual(seen, sorted(seen))
+        previous = self.client.get(last.data["previous"])
+        self.assertEqual(
+            [recipe["id"] for recipe in previous.data["results"]], seen[1500:2000]
+        )
+
+    def test_invalid_search_cursor(self):
+        """Test a malformed cursor of a search is rejected"""
+        res = self.client.get(RECIPES_URL, {"search": "soup", "cursor": "cD01"})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_is_stable_under_inserts(self):
+        """Test rows inserted before the cursor do not shift the next page"""
+        for i in range(4):
+            Ingredient.objects.create(name=f"Ingredient {i}")
+        first = self.client.get(INGREDIENTS_URL, {"page_size": 2})
+
+        Ingredient.objects.create(name="Late arrival")
+        second = self.client.get(first.data["next"])
+
+        self.assertEqual(
+            [i["name"] for i in second.data["results"]],
+            ["Ingredient 2", "Ingredient 3"],
+        )
+
+    def test_page_size_is_capped(self):
+        """Test clients cannot request pages above the hard cap"""
+        Ingredient.objects.bulk_create(
+            [Ingredient(name=f"Ingredient {i}") for i in range(510)]
+        )
+
+        res = self.client.get(INGREDIENTS_URL, {"page_size": 10000})
+
+        self.assertEqual(len(res.data["results"]), 500)
+
+    def test_no_count_query(self):
+        """Test listing does not count the table"""
+        Recipe.objects.create(title="Recipe")
+
+        with self.assertNumQueries(1) as ctx:
+            self.client.get(RECIPES_URL)
+
+        for query in ctx.captured_queries:
+            self.assertNotIn("COUNT(", query["sql"].upper())
+
+    def test_schema_documents_cursor(self):
+        """Test the OpenAPI schema describes the pagination parameters"""
+        res = self.client.get(SCHEMA_URL)
+        paths = json.loads(res.content)["paths"]
+
+        for path in ("/api/recipe/recipes/", "/api/recipe/ingredients/"):
+            params = {p["name"] for p in paths[path]["get"]["parameters"]}
+            self.assertIn("cursor", params)
+            self.assertIn("page_size", params)
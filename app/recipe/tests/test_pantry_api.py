@@ -0,0 +1,103 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredient
+
+
+RECIPES_URL = reverse("recipe:recipe-list")
+PANTRY_URL = reverse("recipe:recipe-pantry")
+
+
+def create_recipe(title, *ingredients):
+    """Create a recipe using the given ingredients"""
+    recipe = Recipe.objects.create(title=title)
+    recipe.ingredients.add(*ingredients)
+    return recipe
+
+
+def ids(*objects):
+    """Return the ids of the objects as a query string value"""
+    return ",".join(str(obj.id) for obj in objects)
+
+
+class PantryApiTests(TestCase):
+    """Test matching recipes against ingredients"""
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.eggs = Ingredient.objects.create(name="Eggs")
+        self.milk = Ingredient.objects.create(name="Milk")
+        self.flour = Ingredient.objects.create(name="Flour")
+        self.sugar = Ingredient.objects.create(name="Sugar")
+        self.omelette = create_recipe("Omelette", self.eggs, self.milk)
+        self.pancakes = create_recipe("Pancakes", self.eggs, self.milk, self.flour)
+        self.cake = create_recipe(
+            "Cake", self.eggs, self.milk, self.flour, self.sugar
+        )
+        self.meringue = create_recipe("Meringue", self.eggs, self.sugar)
+        create_recipe("Bread", self.flour)
+
+    def test_pantry_ranks_by_coverage(self):
+        """Test makeable recipes come first, then fewest missing"""
+        res = self.client.get(PANTRY_URL, {"ingredients": ids(self.eggs, self.milk)})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(r["title"], r["matched_count"], r["missing_count"]) for r in res.data],
+            [
+                ("Omelette", 2, 0),
+                ("Pancakes", 2, 1),
+                ("Meringue", 1, 1),
+                ("Cake", 2, 2),
+            ],
+        )
+
+    def test_pantry_limit(self):
+        """Test the number of matches can be limited"""
+        res = self.client.get(
+            PANTRY_URL, {"ingredients": ids(self.eggs), "limit": 2}
+        )
+
+        self.assertEqual([r["title"] for r in res.data], ["Omelette", "Meringue"])
+
+    def test_pantry_requires_ingredients(self):
+        """Test the ingredient list is required and validated"""
+        res = self.client.get(PANTRY_URL)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(PANTRY_URL, {"ingredients": "1,eggs"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_pantry_query_budget(self):
+        """Test matching costs the same regardless of the number of matches"""
+        with self.assertNumQueries(2):
+            self.client.get(
+                PANTRY_URL, {"ingredients": ids(self.eggs, self.flour, self.milk)}
+            )
+
+    def test_filter_recipes_by_ingredients(self):
+        """Test filtering the recipe list to recipes using all ingredients"""
+        res = self.client.get(
+            RECIPES_URL, {"ingredients": ids(self.milk, self.flour)}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r["id"] for r in res.data["results"]],
+            [self.pancakes.id, self.cake.id],
+        )
+
+    def test_filter_recipes_by_no_ingredients(self):
+        """Test an empty ingredients filter lists every recipe"""
+        res = self.client.get(RECIPES_URL, {"ingredients": ""})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r["id"] for r in res.data["results"]],
+            list(Recipe.objects.order_by("id").values_list("id", flat=True)),
+        )
@@ -0,0 +1,136 @@
+"""
+Query budgets for the recipe API endpoints.
+
+Each endpoint must issue a fixed number of queries regardless of how many
+recipes or ingredients are involved, so N+1 regressions fail the suite.
+The budgets are the same on SQLite and PostgreSQL: search vectors are
+kept by triggers, so no backend-specific query is issued by the API.
+"""
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredient
+
+
+RECIPES_URL = reverse("recipe:recipe-list")
+INGREDIENTS_URL = reverse("recipe:ingredient-list")
+
+
+def recipe_detail_url(recipe_id):
+    """Return recipe detail URL"""
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+def ingredient_detail_url(ingredient_id):
+    """Return ingredient detail URL"""
+    return reverse("recipe:ingredient-detail", args=[ingredient_id])
+
+
+def create_recipes(count, ingredients_per_recipe):
+    """Create recipes that each have their own set of ingredients"""
+    recipes = []
+    for i in range(count):
+        recipe = Recipe.objects.create(title=f"Recipe {i}")
+        for j in range(ingredients_per_recipe):
+            recipe.ingredients.add(
+                Ingredient.objects.create(name=f"Ingredient {recipe.id}-{j}")
+            )
+        recipes.append(recipe)
+    return recipes
+
+
+@override_settings(RECIPE_CACHE_RESPONSES=False)
+class QueryBudgetTests(TestCase):
+    """Test the number of queries issued per endpoint"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_recipe_list_budget(self):
+        """Test listing recipes reads only the recipe table"""
+        params = {"expand": "ingredients"}
+        create_recipes(2, 1)
+        with self.assertNumQueries(1):
+            self.client.get(RECIPES_URL, params)
+
+        create_recipes(20, 5)
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual(len(res.data["results"]), 22)
+
+    def test_recipe_list_without_ingredients_budget(self):
+        """Test listing recipes without ingredients skips their query"""
+        create_recipes(20, 5)
+        with self.assertNumQueries(1):
+            self.client.get(RECIPES_URL)
+
+    def test_recipe_list_search_budget(self):
+        """Test searching recipes uses a constant number of queries"""
+        create_recipes(10, 3)
+        with self.assertNumQueries(1):
+            self.client.get(RECIPES_URL, {"search": "Recipe", "expand": "ingredients"})
+
+    def test_recipe_detail_budget(self):
+        """Test retrieving a recipe uses a constant number of queries"""
+        recipe = create_recipes(1, 10)[0]
+        with self.assertNumQueries(1):
+            self.client.get(recipe_detail_url(recipe.id))
+
+    def test_recipe_create_budget(self):
+        """Test creating a recipe costs the same for any ingredient count"""
+        Ingredient.objects.create(name="Salt")
+        for count in (2, 30):
+            payload = {
+                "title": "Stew",
+                "ingredients": [{"name": "salt"}]
+                + [{"name": f"New {count}-{i}"} for i in range(count)],
+            }
+            with self.assertNumQueries(8):
+                self.client.post(RECIPES_URL, payload, format="json")
+
+    def test_recipe_update_ingredients_budget(self):
+        """Test replacing ingredients costs the same for any ingredient count"""
+        recipe = create_recipes(1, 10)[0]
+        for count in (2, 30):
+            payload = {
+                "ingredients": [{"name": f"New {count}-{i}"} for i in range(count)],
+            }
+            with self.assertNumQueries(12):
+                self.client.patch(
+                    recipe_detail_url(recipe.id), payload, format="json"
+                )
+
+    def test_recipe_partial_update_budget(self):
+        """Test updating recipe fields uses a constant number of queries"""
+        recipe = create_recipes(1, 10)[0]
+        with self.assertNumQueries(6):
+            self.client.patch(recipe_detail_url(recipe.id), {"title": "New"})
+
+    def test_recipe_delete_budget(self):
+        """Test deleting a recipe uses a constant number of queries"""
+        recipe = create_recipes(1, 10)[0]
+        with self.assertNumQueries(6):
+            self.client.delete(recipe_detail_url(recipe.id))
+
+    def test_ingredient_list_budget(self):
+        """Test listing ingredients uses a constant number of queries"""
+        create_recipes(10, 5)
+        with self.assertNumQueries(1):
+            self.client.get(INGREDIENTS_URL)
+
+    def test_ingredient_update_budget(self):
+        """Test updating an ingredient uses a constant number of queries"""
+        ingredient = create_recipes(5, 1)[0].ingredients.get()
+        with self.assertNumQueries(8):
+            self.client.patch(
+                ingredient_detail_url(ingredient.id), {"name": "Cabbage"}
+            )
+
+    def test_ingredient_delete_budget(self):
+        """Test deleting an ingredient uses a constant number of queries"""
+        ingredient = create_recipes(5, 1)[0].ingredients.get()
+        with self.assertNumQueries(7):
+            self.client.delete(ingredient_detail_url(ingredient.id))
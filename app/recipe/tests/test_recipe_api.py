@@ -1,3 +1,4 @@
+from django.core.cache import cache
 from django.test import TestCase
 
 from django.urls import reverse
@@ -34,19 +35,20 @@ class RecipeApiTests(TestCase):
 
     def setUp(self):
         self.client = APIClient()
+        cache.clear()
 
     def test_retrieve_recipes(self):
         """Test retrieving a list of recipes"""
         create_recipe()
         create_recipe()
 
-        res = self.client.get(RECIPES_URL)
+        res = self.client.get(RECIPES_URL, {"expand": "ingredients"})
 
         recipes = Recipe.objects.all().order_by("id")
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_get_recipe_detail(self):
         """Test get the recipe detail"""
@@ -106,6 +108,53 @@ class RecipeApiTests(TestCase):
         for k, v in payload.items():
             self.assertEqual(getattr(recipe, k), v)
 
+    def test_search_recipes(self):
+        """Test searching matches title, description and ingredients"""
+        by_title = create_recipe(title="Prawn curry", description="")
+        by_description = create_recipe(title="Stir fry", description="Add prawns")
+        by_ingredient = create_recipe(title="Paella", description="")
+        by_ingredient.ingredients.add(Ingredient.objects.create(name="Prawns"))
+        create_recipe(title="Porridge", description="Oats and milk")
+
+        res = self.client.get(RECIPES_URL, {"search": "PRAWN"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [recipe["id"] for recipe in res.data["results"]],
+            [by_title.id, by_description.id, by_ingredient.id],
+        )
+
+    def test_search_recipes_ranks_by_relevance(self):
+        """Test recipes matching more terms rank higher"""
+        partial = create_recipe(title="Green curry", description="")
+        full = create_recipe(title="Thai green curry", description="")
+
+        res = self.client.get(RECIPES_URL, {"search": "thai curry"})
+
+        self.assertEqual(
+            [recipe["id"] for recipe in res.data["results"]], [full.id]
+        )
+        res = self.client.get(RECIPES_URL, {"search": "curry"})
+        self.assertEqual(
+            [recipe["id"] for recipe in res.data["results"]], [partial.id, full.id]
+        )
+
+    def test_search_recipes_paginates_by_rank(self):
+        """Test following the next link of a search keeps the rank order"""
+        for i in range(3):
+            create_recipe(title=f"Soup {i}", description="")
+            create_recipe(title=f"Stew {i}", description="soup base")
+
+        res = self.client.get(RECIPES_URL, {"search": "soup", "page_size": 4})
+        ids = [recipe["id"] for recipe in res.data["results"]]
+        res = self.client.get(res.data["next"])
+        ids += [recipe["id"] for recipe in res.data["results"]]
+
+        titles = [Recipe.objects.get(id=i).title for i in ids]
+        self.assertEqual(len(ids), 6)
+        self.assertTrue(all(t.startswith("Soup") for t in titles[:3]))
+        self.assertTrue(all(t.startswith("Stew") for t in titles[3:]))
+
     """Ingredient tests"""
 
     def test_create_recipe_with_new_ingredients(self):
@@ -146,6 +195,37 @@ class RecipeApiTests(TestCase):
             exists = recipe.ingredients.filter(name=ingredient["name"]).exists()
             self.assertTrue(exists)
 
+    def test_create_recipe_matches_ingredients_case_insensitively(self):
+        """Test ingredient names are reused regardless of case"""
+        ingredient = Ingredient.objects.create(name="Prawns")
+        payload = {
+            "title": "Thai Prawn curry",
+            "ingredients": [{"name": "prawns"}, {"name": "PRAWNS"}, {"name": "Lime"}],
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Ingredient.objects.count(), 2)
+        recipe = Recipe.objects.get(id=res.data["id"])
+        self.assertEqual(recipe.ingredients.count(), 2)
+        self.assertIn(ingredient, recipe.ingredients.all())
+
+    def test_create_recipe_with_non_ascii_ingredients(self):
+        """Test non-ASCII ingredient names are created once and then reused"""
+        payload = {"title": "Strudel", "ingredients": [{"name": "Äpfel"}]}
+
+        first = self.client.post(RECIPES_URL, payload, format="json")
+        second = self.client.post(RECIPES_URL, payload, format="json")
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        ingredient = Ingredient.objects.get()
+        self.assertEqual(ingredient.name, "Äpfel")
+        for res in (first, second):
+            recipe = Recipe.objects.get(id=res.data["id"])
+            self.assertEqual(list(recipe.ingredients.all()), [ingredient])
+
     def test_create_ingredient_on_update(self):
         """Test creating ingredient when updating a recipe"""
         recipe = create_recipe()
@@ -0,0 +1,98 @@
+"""
+Tests for content negotiation of the API's formats
+"""
+import json
+
+import msgpack
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredient
+
+
+RECIPES_URL = reverse("recipe:recipe-list")
+BULK_URL = reverse("recipe:recipe-bulk")
+INGREDIENTS_URL = reverse("recipe:ingredient-list")
+MSGPACK = "application/msgpack"
+
+
+class ContentNegotiationTests(TestCase):
+    """Test requesting and sending JSON and MessagePack"""
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        recipe = Recipe.objects.create(title="Soup", description="Hot")
+        recipe.ingredients.add(Ingredient.objects.create(name="Leek"))
+
+    def test_json_by_default(self):
+        """Test responses are JSON unless asked otherwise"""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res["Content-Type"], "application/json")
+        self.assertEqual(json.loads(res.content)["results"][0]["title"], "Soup")
+
+    def test_indented_json(self):
+        """Test indented JSON is still honoured"""
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT="application/json; indent=2")
+
+        self.assertIn(b'\n  "next"', res.content)
+
+    def test_msgpack_response(self):
+        """Test lists are rendered as MessagePack when accepted"""
+        expected = self.client.get(RECIPES_URL).data
+
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT=MSGPACK)
+
+        self.assertEqual(res["Content-Type"], MSGPACK)
+        self.assertEqual(msgpack.unpackb(res.content), json.loads(json.dumps(expected)))
+
+    def test_msgpack_ingredients(self):
+        """Test ingredient lists can be rendered as MessagePack"""
+        res = self.client.get(INGREDIENTS_URL, {"format": "msgpack"})
+
+        self.assertEqual(msgpack.unpackb(res.content)["results"][0]["name"], "Leek")
+
+    def test_msgpack_request(self):
+        """Test a recipe can be created from a MessagePack body"""
+        payload = {"title": "Chips", "ingredients": [{"name": "Potato"}]}
+
+        res = self.client.post(
+            RECIPES_URL,
+            msgpack.packb(payload),
+            content_type=MSGPACK,
+            HTTP_ACCEPT=MSGPACK,
+        )
+
+        self.assertEqual(res.status_code, 201)
+        data = msgpack.unpackb(res.content)
+        self.assertEqual(data["ingredients"][0]["name"], "Potato")
+        self.assertTrue(Recipe.objects.filter(title="Chips").exists())
+
+    def test_msgpack_bulk(self):
+        """Test the bulk endpoint takes and returns MessagePack"""
+        payload = [{"op": "create", "title": "Toast"}]
+
+        res = self.client.post(
+            BULK_URL, msgpack.packb(payload), content_type=MSGPACK, HTTP_ACCEPT=MSGPACK
+        )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(msgpack.unpackb(res.content)["results"][0]["status"], 201)
+
+    def test_invalid_msgpack(self):
+        """Test a malformed MessagePack body is a 400"""
+        res = self.client.post(RECIPES_URL, b"\xc1", content_type=MSGPACK)
+
+        self.assertEqual(res.status_code, 400)
+
+    def test_invalid_json(self):
+        """Test a malformed JSON body is a 400"""
+        res = self.client.post(RECIPES_URL, b"{", content_type="application/json")
+
+        self.assertEqual(res.status_code, 400)
+        self.assertIn("JSON parse error", res.data["detail"])
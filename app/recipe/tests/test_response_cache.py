@@ -0,0 +1,194 @@
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredient
+from recipe import cache as response_cache
+from recipe.tests.test_jobs import run_queue
+
+
+RECIPES_URL = reverse("recipe:recipe-list")
+CACHE_STATS_URL = reverse("recipe:cache-stats")
+
+
+def recipe_detail_url(recipe_id):
+    """Return recipe detail URL"""
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+def ingredient_detail_url(ingredient_id):
+    """Return ingredient detail URL"""
+    return reverse("recipe:ingredient-detail", args=[ingredient_id])
+
+
+class ResponseCacheTests(TestCase):
+    """Test the versioned recipe response cache"""
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.recipe = Recipe.objects.create(title="Soup")
+        self.leek = Ingredient.objects.create(name="Leek")
+        self.recipe.ingredients.add(self.leek)
+
+    def get(self, url, **params):
+        res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res
+
+    def test_reads_are_cached(self):
+        """Test repeated reads are served without touching the database"""
+        detail = recipe_detail_url(self.recipe.id)
+        self.assertEqual(self.get(RECIPES_URL)["X-Cache"], "MISS")
+        self.assertEqual(self.get(detail)["X-Cache"], "MISS")
+
+        with self.assertNumQueries(0):
+            list_res = self.get(RECIPES_URL)
+            detail_res = self.get(detail)
+
+        self.assertEqual(list_res["X-Cache"], "HIT")
+        self.assertEqual(detail_res["X-Cache"], "HIT")
+        self.assertEqual(detail_res.data["ingredients"][0]["name"], "Leek")
+
+    def test_query_string_is_part_of_key(self):
+        """Test different list queries are cached separately"""
+        self.get(RECIPES_URL)
+
+        res = self.get(RECIPES_URL, search="soup")
+
+        self.assertEqual(res["X-Cache"], "MISS")
+
+    def test_create_invalidates_list(self):
+        """Test creating a recipe invalidates cached lists"""
+        self.get(RECIPES_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(RECIPES_URL, {"title": "Stew"})
+
+        res = self.get(RECIPES_URL)
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(len(res.data["results"]), 2)
+
+    def test_update_invalidates_only_that_recipe(self):
+        """Test updating a recipe invalidates it and the list, not others"""
+        other = Recipe.objects.create(title="Salad")
+        self.get(RECIPES_URL)
+        self.get(recipe_detail_url(self.recipe.id))
+        self.get(recipe_detail_url(other.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(recipe_detail_url(self.recipe.id), {"title": "Broth"})
+
+        res = self.get(recipe_detail_url(self.recipe.id))
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data["title"], "Broth")
+        self.assertEqual(self.get(RECIPES_URL)["X-Cache"], "MISS")
+        self.assertEqual(self.get(recipe_detail_url(other.id))["X-Cache"], "HIT")
+
+    def test_delete_invalidates_recipe(self):
+        """Test a deleted recipe is no longer served from the cache"""
+        detail = recipe_detail_url(self.recipe.id)
+        self.get(detail)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(detail)
+
+        self.assertEqual(self.client.get(detail).status_code, 404)
+
+    def test_ingredient_changes_invalidate_recipes(self):
+        """Test renaming or deleting an ingredient invalidates its recipes"""
+        detail = recipe_detail_url(self.recipe.id)
+        self.get(detail)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(ingredient_detail_url(self.leek.id), {"name": "Onion"})
+            run_queue()
+        self.assertEqual(self.get(detail).data["ingredients"][0]["name"], "Onion")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(ingredient_detail_url(self.leek.id))
+            run_queue()
+        self.assertEqual(self.get(detail).data["ingredients"], [])
+
+    def test_invalidation_waits_for_commit(self):
+        """Test versions are only bumped once the write commits"""
+        self.get(RECIPES_URL)
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.client.post(RECIPES_URL, {"title": "Stew"})
+        self.assertEqual(self.get(RECIPES_URL)["X-Cache"], "HIT")
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.get(RECIPES_URL)["X-Cache"], "MISS")
+
+    def test_stats(self):
+        """Test hit and miss counters are exposed"""
+        self.get(RECIPES_URL)
+        self.get(RECIPES_URL)
+        self.get(RECIPES_URL)
+
+        res = self.get(CACHE_STATS_URL)
+
+        self.assertEqual(res.data, {"hits": 2, "misses": 1})
+
+    def test_file_based_backend(self):
+        """Test the cache works with the file-based backend"""
+        with tempfile.TemporaryDirectory() as location:
+            backend = "django.core.cache.backends.filebased.FileBasedCache"
+            caches = {"default": {"BACKEND": backend, "LOCATION": location}}
+            with override_settings(CACHES=caches):
+                self.assertEqual(self.get(RECIPES_URL)["X-Cache"], "MISS")
+                self.assertEqual(self.get(RECIPES_URL)["X-Cache"], "HIT")
+
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.client.post(RECIPES_URL, {"title": "Stew"})
+
+                self.assertEqual(self.get(RECIPES_URL)["X-Cache"], "MISS")
+
+
+@override_settings(DEBUG=False, TESTING=False, RECIPE_CACHE_RESPONSES=True)
+class ResponseCacheCheckTests(TestCase):
+    """Test the system check for a cache fit for versioned responses"""
+
+    def test_per_process_cache(self):
+        """Test a per-process cache is an error outside DEBUG"""
+        [error] = response_cache.check_cache()
+
+        self.assertEqual(error.id, "recipe.E002")
+
+    def test_file_based_cache(self):
+        """Test a cache without atomic increments is an error"""
+        backend = "django.core.cache.backends.filebased.FileBasedCache"
+        caches = {"default": {"BACKEND": backend, "LOCATION": "/tmp/cache"}}
+        with override_settings(CACHES=caches):
+            [error] = response_cache.check_cache()
+
+        self.assertEqual(error.id, "recipe.E002")
+
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.redis.RedisCache",
+                "LOCATION": "redis://127.0.0.1:6379",
+            }
+        }
+    )
+    def test_shared_cache(self):
+        """Test Redis passes"""
+        self.assertEqual(response_cache.check_cache(), [])
+
+    @override_settings(RECIPE_CACHE_RESPONSES=False)
+    def test_caching_off(self):
+        """Test any cache passes when responses are not cached"""
+        self.assertEqual(response_cache.check_cache(), [])
+
+    @override_settings(DEBUG=True)
+    def test_debug(self):
+        """Test the in-memory cache is fine for development"""
+        self.assertEqual(response_cache.check_cache(), [])
@@ -0,0 +1,90 @@
+"""
+Tests for sparse fieldsets and ingredient expansion on recipe reads
+"""
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredient
+
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL"""
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+class SparseFieldsTests(TestCase):
+    """Test choosing the fields of recipe responses"""
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.recipe = Recipe.objects.create(title="Soup", description="Hot")
+        self.recipe.ingredients.add(Ingredient.objects.create(name="Leek"))
+
+    def test_list_leaves_out_ingredients(self):
+        """Test lists only include ingredients when expanded"""
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(
+            res.data["results"],
+            [{"id": self.recipe.id, "title": "Soup", "image": None}],
+        )
+
+        res = self.client.get(RECIPES_URL, {"expand": "ingredients"})
+        self.assertEqual(res.data["results"][0]["ingredients"][0]["name"], "Leek")
+
+    def test_detail_includes_ingredients(self):
+        """Test the detail view expands ingredients by default"""
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertEqual(res.data["ingredients"][0]["name"], "Leek")
+        self.assertEqual(res.data["description"], "Hot")
+
+    def test_fields(self):
+        """Test ?fields= selects a subset of the fields"""
+        res = self.client.get(RECIPES_URL, {"fields": "title"})
+        self.assertEqual(res.data["results"], [{"title": "Soup"}])
+
+        res = self.client.get(detail_url(self.recipe.id), {"fields": "id,description"})
+        self.assertEqual(res.data, {"id": self.recipe.id, "description": "Hot"})
+
+    def test_unknown_fields(self):
+        """Test unknown fields and expansions are rejected"""
+        res = self.client.get(RECIPES_URL, {"fields": "title,secret"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(RECIPES_URL, {"expand": "owner"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_etag_varies_with_fields(self):
+        """Test a sparse response has its own ETag that If-Match accepts"""
+        url = detail_url(self.recipe.id)
+        full = self.client.get(url)
+        sparse = self.client.get(url, {"fields": "title"})
+        self.assertNotEqual(full["ETag"], sparse["ETag"])
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=sparse["ETag"])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.patch(
+            url, {"title": "Broth"}, format="json", HTTP_IF_MATCH=sparse["ETag"]
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(RECIPE_CACHE_RESPONSES=False)
+    def test_queries_skip_unrequested_data(self):
+        """Test unrequested columns and ingredients are not fetched"""
+        for fast in (True, False):
+            with self.settings(RECIPE_FAST_READS=fast):
+                with self.assertNumQueries(1) as ctx:
+                    self.client.get(detail_url(self.recipe.id), {"fields": "title"})
+
+            sql = ctx.captured_queries[0]["sql"]
+            self.assertIn('"title"', sql)
+            self.assertNotIn('"description"', sql)
@@ -0,0 +1,151 @@
+"""
+Tests for the denormalized ingredient summaries
+"""
+import io
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredient
+from recipe.loader import RecipeLoader
+from recipe.service import RecipeService
+from recipe.summary import compute_summaries
+from recipe.tests.test_jobs import run_queue
+
+
+class IngredientSummaryTests(TestCase):
+    """Test the summaries follow every change to a recipe's ingredients"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.service = RecipeService()
+
+    def assertSummaryCurrent(self, *recipes):
+        expected = compute_summaries([recipe.pk for recipe in recipes])
+        for recipe in recipes:
+            recipe.refresh_from_db()
+            self.assertEqual(recipe.ingredient_summary, expected[recipe.pk])
+            self.assertEqual(recipe.ingredient_count, len(expected[recipe.pk]))
+
+    def test_service_create_and_update(self):
+        """Test the service sets the summary"""
+        Ingredient.objects.create(name="Salt")
+        recipe = self.service.create(
+            {"title": "Soup", "ingredients": [{"name": "Leek"}, {"name": "salt"}]}
+        )
+        self.assertEqual(recipe.ingredient_count, 2)
+        self.assertEqual(
+            [item["name"] for item in recipe.ingredient_summary], ["Salt", "Leek"]
+        )
+        self.assertSummaryCurrent(recipe)
+
+        self.service.update(recipe, {"ingredients": [{"name": "Potato"}]})
+        self.assertSummaryCurrent(recipe)
+        self.assertEqual(recipe.ingredient_count, 1)
+
+        self.service.update(recipe, {"title": "Potato soup"})
+        self.assertSummaryCurrent(recipe)
+
+    def test_service_bulk(self):
+        """Test bulk creates and updates set the summaries"""
+        existing = self.service.create({"title": "Toast"})
+
+        created = self.service.bulk(
+            creates=[
+                {"title": "Soup", "ingredients": [{"name": "Leek"}]},
+                {"title": "Tea"},
+            ],
+            updates={existing.pk: {"ingredients": [{"name": "Bread"}]}},
+        )
+
+        self.assertSummaryCurrent(existing, *created)
+        existing.refresh_from_db()
+        self.assertEqual(existing.ingredient_count, 1)
+
+    def test_ingredient_rename_and_delete(self):
+        """Test renaming or deleting an ingredient updates its recipes"""
+        recipe = self.service.create(
+            {"title": "Soup", "ingredients": [{"name": "Leek"}, {"name": "Salt"}]}
+        )
+        leek = Ingredient.objects.get(name="Leek")
+        url = reverse("recipe:ingredient-detail", args=[leek.id])
+
+        self.client.patch(url, {"name": "Onion"})
+        run_queue()
+        self.assertSummaryCurrent(recipe)
+        self.assertIn("Onion", str(recipe.ingredient_summary))
+
+        self.client.delete(url)
+        run_queue()
+        self.assertSummaryCurrent(recipe)
+        self.assertEqual(recipe.ingredient_count, 1)
+
+    def test_orm_link_changes(self):
+        """Test changing links through the ORM updates the summaries"""
+        recipe = Recipe.objects.create(title="Soup")
+        other = Recipe.objects.create(title="Stew")
+        leek = Ingredient.objects.create(name="Leek")
+        salt = Ingredient.objects.create(name="Salt")
+
+        recipe.ingredients.add(leek, salt)
+        self.assertSummaryCurrent(recipe)
+        recipe.ingredients.remove(leek)
+        self.assertSummaryCurrent(recipe)
+
+        salt.recipe_set.add(other)
+        self.assertSummaryCurrent(recipe, other)
+        salt.recipe_set.clear()
+        self.assertSummaryCurrent(recipe, other)
+        self.assertEqual(recipe.ingredient_count, 0)
+
+    def test_loader(self):
+        """Test loaded recipes get their summaries"""
+        RecipeLoader(batch_size=2).load(
+            [
+                ("Soup", "", ["Leek", "Salt"]),
+                ("Stew", "", ["salt"]),
+                ("Tea", "", []),
+            ]
+        )
+
+        self.assertSummaryCurrent(*Recipe.objects.all())
+
+    def test_check_and_rebuild_command(self):
+        """Test the command finds and repairs stale summaries"""
+        recipe = self.service.create(
+            {"title": "Soup", "ingredients": [{"name": "Leek"}]}
+        )
+        call_command("ingredient_summaries", "--check", stdout=io.StringIO())
+
+        Recipe.objects.update(ingredient_count=0, ingredient_summary=[])
+        with self.assertRaisesMessage(CommandError, f": {recipe.pk}"):
+            call_command("ingredient_summaries", "--check", stdout=io.StringIO())
+
+        out = io.StringIO()
+        call_command("ingredient_summaries", "--chunk-size", "1", stdout=out)
+        self.assertIn("Rebuilt 1 ", out.getvalue())
+        self.assertSummaryCurrent(recipe)
+        call_command("ingredient_summaries", "--check", stdout=io.StringIO())
+
+    def test_rebuild_refreshes_cached_responses(self):
+        """Test repaired summaries get a new ETag and are not served stale"""
+        cache.clear()
+        recipe = self.service.create(
+            {"title": "Soup", "ingredients": [{"name": "Leek"}]}
+        )
+        Recipe.objects.update(ingredient_count=0, ingredient_summary=[])
+        url = reverse("recipe:recipe-detail", args=[recipe.pk])
+        stale = self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("ingredient_summaries", stdout=io.StringIO())
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=stale["ETag"])
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res["ETag"], stale["ETag"])
+        self.assertEqual([i["name"] for i in res.data["ingredients"]], ["Leek"])
@@ -0,0 +1,165 @@
+"""
+Tests for request throttling
+"""
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from recipe import throttling
+
+RECIPES_URL = reverse("recipe:recipe-list")
+INGREDIENTS_URL = reverse("recipe:ingredient-list")
+
+
+def rates(**rates):
+    return override_settings(
+        REST_FRAMEWORK={**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": rates}
+    )
+
+
+@patch("recipe.throttling.time.time", return_value=1000.0)
+class TokenBucketThrottleTests(TestCase):
+    """Test clients are throttled per scope and action"""
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def create(self, client=None):
+        return (client or self.client).post(
+            RECIPES_URL, {"title": "Soup"}, format="json"
+        )
+
+    @rates(read="3/min", write="2/min")
+    def test_burst_then_refill(self, now):
+        """Test a full bucket allows a burst, then one request per refill"""
+        for _ in range(3):
+            self.assertEqual(self.client.get(RECIPES_URL).status_code, 200)
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, 429)
+        self.assertEqual(res["Retry-After"], "20")
+
+        now.return_value += 19
+        self.assertEqual(self.client.get(RECIPES_URL).status_code, 429)
+        now.return_value += 1
+        self.assertEqual(self.client.get(RECIPES_URL).status_code, 200)
+        self.assertEqual(self.client.get(RECIPES_URL).status_code, 429)
+
+    @rates(read="2/min", write="1/min")
+    def test_separate_budgets(self, now):
+        """Test reads, writes and actions have their own buckets"""
+        self.assertEqual(self.create().status_code, 201)
+        self.assertEqual(self.create().status_code, 429)
+
+        self.assertEqual(self.client.get(RECIPES_URL).status_code, 200)
+        self.assertEqual(self.client.get(INGREDIENTS_URL).status_code, 200)
+        self.assertEqual(self.client.get(INGREDIENTS_URL).status_code, 200)
+        self.assertEqual(self.client.get(INGREDIENTS_URL).status_code, 429)
+
+    @rates(write="1/min")
+    def test_per_client(self, now):
+        """Test clients are throttled independently"""
+        other = APIClient(REMOTE_ADDR="10.0.0.2")
+
+        self.assertEqual(self.create().status_code, 201)
+        self.assertEqual(self.create().status_code, 429)
+        self.assertEqual(self.create(other).status_code, 201)
+
+    @rates(write="1/min")
+    def test_forwarded_for_ignored(self, now):
+        """Test clients cannot get a new bucket by sending X-Forwarded-For"""
+        self.assertEqual(self.create().status_code, 201)
+        res = self.client.post(
+            RECIPES_URL,
+            {"title": "Soup"},
+            format="json",
+            HTTP_X_FORWARDED_FOR="203.0.113.7",
+        )
+
+        self.assertEqual(res.status_code, 429)
+
+    @rates(write="1/min")
+    def test_forwarded_for_behind_proxy(self, now):
+        """Test the entry added by a trusted proxy identifies the client"""
+        with self.settings(
+            REST_FRAMEWORK={**settings.REST_FRAMEWORK, "NUM_PROXIES": 1}
+        ):
+            for forged in ("1.1.1.1", "2.2.2.2"):
+                res = self.client.post(
+                    RECIPES_URL,
+                    {"title": "Soup"},
+                    format="json",
+                    HTTP_X_FORWARDED_FOR=f"{forged}, 203.0.113.7",
+                )
+            other = self.client.post(
+                RECIPES_URL,
+                {"title": "Soup"},
+                format="json",
+                HTTP_X_FORWARDED_FOR="203.0.113.8",
+            )
+
+        self.assertEqual(res.status_code, 429)
+        self.assertEqual(other.status_code, 201)
+
+    @rates(write="100/min", **{"write:recipe.create": "1/min"})
+    def test_action_rate(self, now):
+        """Test an action can have its own rate"""
+        self.assertEqual(self.create().status_code, 201)
+        res = self.create()
+
+        self.assertEqual(res.status_code, 429)
+        self.assertEqual(res["Retry-After"], "60")
+
+    @rates(read="1/min")
+    def test_async_views(self, now):
+        """Test the async read views are throttled too"""
+        url = reverse("recipe:async-recipe-list")
+
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.get(url).status_code, 429)
+
+    def test_unthrottled_without_rate(self, now):
+        """Test actions without a rate are not throttled"""
+        for _ in range(5):
+            self.assertEqual(self.create().status_code, 201)
+
+    def test_parse_rate(self, now):
+        """Test rates are parsed like DRF's"""
+        self.assertEqual(throttling.parse_rate("5/s"), (5, 1))
+        self.assertEqual(throttling.parse_rate("100/min"), (100, 60))
+        self.assertEqual(throttling.parse_rate("1000/day"), (1000, 86400))
+
+
+@rates(read="10/min")
+@override_settings(DEBUG=False, TESTING=False)
+class ThrottleCacheCheckTests(TestCase):
+    """Test the system check for a cache shared between workers"""
+
+    def test_per_process_cache(self):
+        """Test a per-process cache is an error outside DEBUG"""
+        [error] = throttling.check_cache()
+
+        self.assertEqual(error.id, "recipe.E001")
+
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+                "LOCATION": "cache",
+            }
+        }
+    )
+    def test_shared_cache(self):
+        """Test a cache shared between processes passes"""
+        self.assertEqual(throttling.check_cache(), [])
+
+    @override_settings(DEBUG=True)
+    def test_debug(self):
+        """Test the in-memory cache is fine for development"""
+        self.assertEqual(throttling.check_cache(), [])
@@ -0,0 +1,88 @@
+"""
+Token bucket request throttling
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+READ_SCOPE = "read"
+WRITE_SCOPE = "write"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+PER_PROCESS_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def cache_alias():
+    return getattr(settings, "THROTTLE_CACHE_ALIAS", "default")
+
+
+def parse_rate(rate):
+    """Return (requests, seconds) for a rate such as "100/min" or "5/s" """
+    requests, period = rate.split("/")
+    return int(requests), PERIODS[period[0]]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttle each client per scope and viewset action"""
+
+    def bucket(self, request, view):
+        scope = READ_SCOPE if request.method in SAFE_METHODS else WRITE_SCOPE
+        name = getattr(view, "basename", None) or type(view).__name__
+        action = getattr(view, "action", None) or request.method.lower()
+        return scope, f"{name}.{action}"
+
+    def get_rate(self, scope, bucket):
+        rates = api_settings.DEFAULT_THROTTLE_RATES or {}
+        return rates.get(f"{scope}:{bucket}", rates.get(scope))
+
+    def allow_request(self, request, view):
+        scope, bucket = self.bucket(request, view)
+        rate = self.get_rate(scope, bucket)
+        if rate is None:
+            return True
+        requests, period = parse_rate(rate)
+        interval = period / requests
+
+        cache = caches[cache_alias()]
+        key = f"throttle:{scope}:{bucket}:{self.get_ident(request)}"
+        now = time.time()
+        full_at = max(cache.get(key, now), now) + interval
+        if full_at - now > period + 1e-9:
+            # Fewer than one token left: wait for the next one
+            self.retry_after = full_at - now - period
+            return False
+        cache.set(key, full_at, timeout=math.ceil(full_at - now) + 1)
+        return True
+
+    def wait(self):
+        return getattr(self, "retry_after", None)
+
+
+def check_cache(app_configs=None, **kwargs):
+    """System check that the buckets are shared by every worker process"""
+    if settings.DEBUG or getattr(settings, "TESTING", False):
+        return []
+    if not api_settings.DEFAULT_THROTTLE_RATES:
+        return []
+    backend = settings.CACHES[cache_alias()]["BACKEND"]
+    if backend not in PER_PROCESS_BACKENDS:
+        return []
+    return [
+        checks.Error(
+            f"Throttling buckets are kept in {backend}, which is not shared "
+            "between worker processes.",
+            hint=(
+                "Point THROTTLE_CACHE_ALIAS at a shared cache, e.g. Redis, "
+                "memcached or the database cache (see CACHE_BACKEND)."
+            ),
+            id="recipe.E001",
+        )
+    ]
@@ -0,0 +1,32 @@
+"""
+Image resizing for recipe thumbnails, importable without Django
+"""
+import io
+
+from PIL import Image, ImageOps
+
+# Formats thumbnails are written in as is; anything else becomes PNG
+KEPT_FORMATS = {"JPEG", "PNG", "WEBP"}
+EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "GIF": "gif"}
+
+
+def extension(image_format):
+    """Return the file extension for a Pillow format name"""
+    return EXTENSIONS.get(image_format, (image_format or "bin").lower())
+
+
+def make_thumbnail(data, size):
+    """
+    Return (bytes, format) of the image in `data` scaled down to fit in a
+    `size` x `size` box, upright according to its EXIF orientation
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        image_format = image.format if image.format in KEPT_FORMATS else "PNG"
+        image.draft("RGB", (size, size))
+        thumbnail = ImageOps.exif_transpose(image)
+        thumbnail.thumbnail((size, size), Image.LANCZOS)
+        if image_format == "JPEG" and thumbnail.mode not in ("RGB", "L"):
+            thumbnail = thumbnail.convert("RGB")
+        out = io.BytesIO()
+        thumbnail.save(out, image_format, optimize=True)
+    return out.getvalue(), image_format
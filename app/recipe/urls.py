@@ -2,12 +2,37 @@ from django.urls import path, include
 
 from rest_framework.routers import DefaultRouter
 
-from recipe import views
+from recipe import async_views, views
 
 router = DefaultRouter()
 router.register("recipes", views.RecipeViewSet, basename="recipe")
 router.register("ingredients", views.IngredientViewSet, basename="ingredient")
+router.register("jobs", views.JobViewSet, basename="job")
 
 app_name = "recipe"
 
-urlpatterns = [path("", include(router.urls))]
+urlpatterns = [
+    path("cache-stats/", views.CacheStatsView.as_view(), name="cache-stats"),
+    # Async versions of the read endpoints, for ASGI deployments
+    path(
+        "async/recipes/",
+        async_views.RecipeListView.as_view(),
+        name="async-recipe-list",
+    ),
+    path(
+        "async/recipes/<int:pk>/",
+        async_views.RecipeDetailView.as_view(),
+        name="async-recipe-detail",
+    ),
+    path(
+        "async/ingredients/",
+        async_views.IngredientListView.as_view(),
+        name="async-ingredient-list",
+    ),
+    path(
+        "async/ingredients/<int:pk>/",
+        async_views.IngredientDetailView.as_view(),
+        name="async-ingredient-detail",
+    ),
+    path("", include(router.urls)),
+]
@@ -1,7 +1,27 @@
-from rest_framework import viewsets, mixins
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from rest_framework import status, viewsets, mixins
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from rest_framework.views import APIView
 
-from core.models import Ingredient, Recipe
+from core.models import Ingredient, Job, Recipe
+from recipe import cache as response_cache
+from recipe import images, jobs
+from recipe import rows as recipe_rows
 from recipe import serializers
+from recipe.autocomplete import ingredient_index
+from recipe import export as recipe_export
+from recipe.conditional import ConditionalViewMixin, etag
+from recipe.pantry import filter_by_ingredients, match_pantry
+from recipe.renderers import CSVRenderer, NDJSONRenderer, ORJSONRenderer
+from recipe.search import search_recipes
+from recipe.service import IngredientService, RecipeService
 from drf_spectacular.utils import (
     extend_schema,
     extend_schema_view,
@@ -9,51 +29,507 @@ from drf_spectacular.utils import (
     OpenApiTypes,
 )
 
+DEFAULT_SUGGESTIONS = 10
+MAX_SUGGESTIONS = 50
+DEFAULT_PANTRY_MATCHES = 20
+MAX_PANTRY_MATCHES = 100
+MAX_BULK_ITEMS = 1000
+
+
+def _limit_param(request, default, maximum):
+    """Read `?limit=` clamped to 1..maximum"""
+    try:
+        limit = int(request.query_params.get("limit", default))
+    except ValueError:
+        limit = default
+    return max(1, min(limit, maximum))
+
+
+def _ids_param(request, name):
+    """Read a comma separated list of ids from the query string"""
+    value = request.query_params.get(name, "")
+    try:
+        return [int(item) for item in value.split(",") if item.strip()]
+    except ValueError:
+        raise ValidationError({name: "Expected a comma separated list of ids."})
+
+
+def wants_async(request):
+    """Whether the client sent `Prefer: respond-async`"""
+    preferences = request.headers.get("Prefer", "").split(",")
+    return any(
+        item.split(";")[0].strip().lower() == "respond-async" for item in preferences
+    )
+
+
+def accepted(request, job):
+    """Answer 202 with the queued job and where to poll it"""
+    response = Response(
+        serializers.JobSerializer(job).data, status=status.HTTP_202_ACCEPTED
+    )
+    response["Location"] = reverse("recipe:job-detail", args=[job.pk], request=request)
+    response["Preference-Applied"] = "respond-async"
+    return response
+
+
+ASYNC_PARAMETER = OpenApiParameter(
+    "Prefer",
+    OpenApiTypes.STR,
+    location=OpenApiParameter.HEADER,
+    enum=["respond-async"],
+    description=(
+        "Queue the operation as a background job and answer 202 with the "
+        "job, to be polled at the Location header"
+    ),
+)
+ASYNC_RESPONSE = {202: serializers.JobSerializer}
+FIELDS_PARAMETER = OpenApiParameter(
+    "fields",
+    OpenApiTypes.STR,
+    description="Comma separated list of the fields to return",
+)
+IMAGE_SIZE_PARAMETER = OpenApiParameter(
+    "image_size",
+    OpenApiTypes.STR,
+    enum=images.size_names(),
+    description="Size of the image to link to; defaults to the original",
+)
+EXPAND_PARAMETER = OpenApiParameter(
+    "expand",
+    OpenApiTypes.STR,
+    enum=["ingredients"],
+    description="Include the nested ingredients of each recipe in lists",
+)
+
 
 @extend_schema_view(
+    create=extend_schema(
+        parameters=[ASYNC_PARAMETER],
+        responses={201: serializers.RecipeDetailSerializer, **ASYNC_RESPONSE},
+    ),
+    retrieve=extend_schema(parameters=[FIELDS_PARAMETER, IMAGE_SIZE_PARAMETER]),
     list=extend_schema(
         parameters=[
+            FIELDS_PARAMETER,
+            EXPAND_PARAMETER,
+            IMAGE_SIZE_PARAMETER,
             OpenApiParameter(
                 "search",
                 OpenApiTypes.STR,
-                description="Fuzzy search of the recipe title",
+                description=(
+                    "Full-text search of the recipe title, description and "
+                    "ingredient names. Results are ordered by relevance."
+                ),
+            ),
+            OpenApiParameter(
+                "ingredients",
+                OpenApiTypes.STR,
+                description=(
+                    "Comma separated list of ingredient IDs. Only recipes "
+                    "using all of them are returned."
+                ),
             ),
         ]
     )
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalViewMixin, viewsets.ModelViewSet):
     """Manage recipes in the database"""
 
     serializer_class = serializers.RecipeDetailSerializer
+    recipeService = RecipeService()
+    read_prefetch = [
+        Prefetch("ingredients", queryset=Ingredient.objects.order_by("id"))
+    ]
 
     def get_queryset(self):
         """Return objects for authenticated user"""
         search = self.request.query_params.get("search")
-        queryset = Recipe.objects.all()
-        if search:
-            queryset = queryset.filter(title__contains=search)
+        queryset = Recipe.objects.defer("search_vector")
+        if self.action == "pantry":
+            queryset = queryset.prefetch_related("ingredients")
+        if self.action == "list" and "ingredients" in self.request.query_params:
+            queryset = filter_by_ingredients(
+                queryset, _ids_param(self.request, "ingredients")
+            )
+        if search and self.action == "list":
+            self.cursor_ordering = ("-rank", "id")
+            queryset = search_recipes(queryset, search).order_by(*self.cursor_ordering)
+        else:
+            queryset = queryset.order_by("id")
+
+        if self.action not in ("list", "retrieve"):
+            return queryset
+        fields = self._read_fields()
+        if self._fast_reads():
+            return recipe_rows.recipe_values(queryset, fields)
+        columns = [field for field in fields if field != "ingredients"]
+        if "image" in columns:
+            columns.append("image_thumbnails")
+        return queryset.only("id", "version", *columns)
 
-        return queryset.order_by("id").distinct()
+    def _fast_reads(self):
+        """Whether list and retrieve skip the serializers, see recipe.rows"""
+        return self.action in ("list", "retrieve") and getattr(
+            settings, "RECIPE_FAST_READS", True
+        )
+
+    def _read_fields(self):
+        """
+        Return the fields list and retrieve should render.
+
+        `?fields=` picks a subset of the serializer's fields. Otherwise
+        lists leave out the ingredients unless `?expand=ingredients` asks
+        for them, so they cost no extra query.
+        """
+        if hasattr(self, "_fields"):
+            return self._fields
+        available = self.get_serializer_class().Meta.fields
+        params = self.request.query_params
+        if params.get("fields"):
+            requested = {field.strip() for field in params["fields"].split(",")}
+            requested.discard("")
+            unknown = requested - set(available)
+            if unknown:
+                raise ValidationError(
+                    {"fields": f"Unknown fields: {', '.join(sorted(unknown))}."}
+                )
+            self._fields = [field for field in available if field in requested]
+            return self._fields
+
+        expand = {item.strip() for item in params.get("expand", "").split(",")}
+        expand.discard("")
+        if expand - {"ingredients"}:
+            raise ValidationError({"expand": "Only ingredients can be expanded."})
+        self._fields = [
+            field
+            for field in available
+            if field != "ingredients"
+            or self.action != "list"
+            or "ingredients" in expand
+        ]
+        return self._fields
+
+    def _image_size(self):
+        """Return the image size `?image_size=` asks for"""
+        size = self.request.query_params.get("image_size", images.ORIGINAL)
+        if size not in images.size_names():
+            raise ValidationError(
+                {"image_size": f"Expected one of {', '.join(images.size_names())}."}
+            )
+        return size
+
+    def etag_variant(self):
+        fields = self._read_fields()
+        variant = ""
+        if fields != self.get_serializer_class().Meta.fields:
+            variant = "+".join(fields)
+        if "image" in fields and self._image_size() != images.ORIGINAL:
+            variant += f"@{self._image_size()}"
+        return variant
+
+    def get_read_prefetch(self):
+        if "ingredients" not in self._read_fields():
+            return []
+        return self.read_prefetch
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in ("list", "retrieve"):
+            kwargs.setdefault("fields", self._read_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request is not None:
+            context["image_size"] = self._image_size()
+        return context
+
+    def serialize_rows(self, rows):
+        if self._fast_reads():
+            return recipe_rows.represent(
+                rows, self._read_fields(), self._image_size()
+            )
+        return super().serialize_rows(rows)
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
         if self.action == "list":
             return serializers.RecipeSerializer
+        if self.action == "pantry":
+            return serializers.PantryMatchSerializer
 
         return self.serializer_class
 
+    def cache_key(self, request):
+        if not response_cache.is_enabled():
+            return None
+        if self.action == "list":
+            return response_cache.list_key(request)
+        return response_cache.detail_key(request, self.kwargs[self.lookup_field])
+
+    def list(self, request, *args, **kwargs):
+        return self.cached(request, self.conditional_list)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached(request, self.conditional_retrieve)
+
+    def create(self, request, *args, **kwargs):
+        if not wants_async(request):
+            return super().create(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return accepted(request, jobs.submit(jobs.CREATE, serializer.validated_data))
+
+    def perform_destroy(self, instance):
+        self.recipeService.delete(instance, expected_version=self.if_match(instance))
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "ingredients",
+                OpenApiTypes.STR,
+                required=True,
+                description="Comma separated list of ingredient IDs available",
+            ),
+            OpenApiParameter(
+                "limit",
+                OpenApiTypes.INT,
+                description=f"Maximum number of recipes (1-{MAX_PANTRY_MATCHES})",
+            ),
+        ],
+    )
+    @action(detail=False, methods=["get"], pagination_class=None)
+    def pantry(self, request):
+        """List recipes that can be made from the given ingredients"""
+        ingredient_ids = _ids_param(request, "ingredients")
+        if not ingredient_ids:
+            raise ValidationError({"ingredients": "This parameter is required."})
+        limit = _limit_param(request, DEFAULT_PANTRY_MATCHES, MAX_PANTRY_MATCHES)
+
+        queryset = match_pantry(self.get_queryset(), ingredient_ids)[:limit]
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+    @extend_schema(
+        request={"multipart/form-data": serializers.RecipeImageSerializer},
+        responses={202: serializers.RecipeImageResponseSerializer},
+    )
+    @action(
+        detail=True,
+        methods=["post"],
+        url_path="upload-image",
+        parser_classes=[MultiPartParser],
+    )
+    def upload_image(self, request, pk=None):
+        """
+        Upload an image for a recipe.
+
+        The image is stored as sent and answered straight away; a
+        background job renders its thumbnails, and until it has every
+        `image_size` links to the original.
+        """
+        recipe = self.get_object()
+        serializer = serializers.RecipeImageSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.validated_data["image"]
+        name = images.store(upload, upload.image.format)
+        with transaction.atomic():
+            self.recipeService.set_image(
+                recipe, name, expected_version=self.if_match(recipe)
+            )
+            job = jobs.submit(jobs.THUMBNAILS, {"recipe": recipe.pk, "image": name})
+
+        response = accepted(request, job)
+        response.data = {
+            "id": recipe.pk,
+            "images": {
+                size: images.image_url(name, {}, size) for size in images.size_names()
+            },
+            "job": response.data,
+        }
+        response["ETag"] = etag(recipe)
+        return response
+
+    @extend_schema(
+        request=serializers.RecipeBulkItemSerializer(many=True),
+        parameters=[ASYNC_PARAMETER],
+        responses={
+            200: serializers.RecipeBulkResponseSerializer,
+            400: serializers.RecipeBulkErrorResponseSerializer,
+            **ASYNC_RESPONSE,
+        },
+    )
+    @action(detail=False, methods=["post"], pagination_class=None)
+    def bulk(self, request):
+        """
+        Create, update and delete many recipes in one transaction.
+
+        Either every operation is applied or, if any item is invalid, none
+        are and the errors are reported per item. With `Prefer:
+        respond-async` the items are validated and then applied by a
+        background job.
+        """
+        serializer = serializers.RecipeBulkItemSerializer(
+            data=request.data, many=True, max_length=MAX_BULK_ITEMS
+        )
+        if not serializer.is_valid():
+            if not isinstance(serializer.errors, list):
+                raise ValidationError(serializer.errors)
+            return self._bulk_errors(
+                (index, errors) for index, errors in enumerate(serializer.errors)
+            )
+
+        items = serializer.validated_data
+        ids = [item["id"] for item in items if item["op"] != "create"]
+        existing = set(Recipe.objects.filter(pk__in=ids).values_list("pk", flat=True))
+        seen = set()
+        errors = []
+        for index, item in enumerate(items):
+            if item["op"] == "create":
+                continue
+            if item["id"] not in existing:
+                errors.append((index, {"id": "Recipe not found."}))
+            elif item["id"] in seen:
+                errors.append((index, {"id": "Recipe appears more than once."}))
+            seen.add(item["id"])
+        if errors:
+            return self._bulk_errors(errors)
+
+        if wants_async(request):
+            return accepted(request, jobs.submit(jobs.BULK, {"items": items}))
+        return Response({"results": self.recipeService.bulk_operations(items)})
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "format",
+                OpenApiTypes.STR,
+                enum=[*recipe_export.EXPORTERS],
+                description="Export format; may also be chosen with Accept",
+            ),
+            ASYNC_PARAMETER,
+        ],
+        responses={
+            (200, "application/x-ndjson"): OpenApiTypes.STR,
+            (202, "application/json"): serializers.JobSerializer,
+        },
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        pagination_class=None,
+        renderer_classes=[NDJSONRenderer, CSVRenderer],
+    )
+    def export(self, request):
+        """
+        Stream every recipe with its ingredients as NDJSON or CSV.
+
+        Rows are written as they are read, a chunk of recipes at a time, so
+        the response starts straight away and never holds the whole
+        catalogue in memory. With `Prefer: respond-async` a background job
+        writes the export to a file instead, whose URL is the job's result.
+        """
+        file_format = request.accepted_renderer.format
+        if wants_async(request):
+            job = jobs.submit(jobs.EXPORT, {"format": file_format})
+            # The job is described in JSON, whichever format it exports
+            request.accepted_renderer = ORJSONRenderer()
+            request.accepted_media_type = ORJSONRenderer.media_type
+            return accepted(request, job)
+        response = StreamingHttpResponse(
+            recipe_export.export(file_format),
+            content_type=request.accepted_renderer.media_type,
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="recipes.{file_format}"'
+        )
+        return response
+
+    def _bulk_errors(self, errors):
+        return Response(
+            {
+                "errors": [
+                    {"index": index, "errors": item_errors}
+                    for index, item_errors in errors
+                    if item_errors
+                ]
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+
+class CacheStatsView(APIView):
+    """Report the recipe response cache counters"""
+
+    @extend_schema(responses=serializers.CacheStatsSerializer)
+    def get(self, request):
+        return Response(response_cache.stats())
+
+
+class JobViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """Report the status and result of background jobs"""
+
+    serializer_class = serializers.JobSerializer
+    queryset = Job.objects.all()
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        if response.data["status"] in (Job.QUEUED, Job.RUNNING):
+            response["Retry-After"] = "1"
+        return response
+
 
 class IngredientViewSet(
+    ConditionalViewMixin,
     mixins.DestroyModelMixin,
     mixins.UpdateModelMixin,
     mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
     viewsets.GenericViewSet,
 ):
     """Manage ingredients in the database"""
 
     serializer_class = serializers.IngredientSerializer
+    ingredientService = IngredientService()
 
     def get_queryset(self):
         """Retrieve ingredients"""
         queryset = Ingredient.objects.all()
-        return queryset.order_by("id").distinct()
+        return queryset.order_by("id")
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_list(request)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_retrieve(request)
+
+    def perform_destroy(self, instance):
+        self.ingredientService.delete(
+            instance, expected_version=self.if_match(instance)
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "q",
+                OpenApiTypes.STR,
+                required=True,
+                description="Ingredient name prefix; tolerates typos",
+            ),
+            OpenApiParameter(
+                "limit",
+                OpenApiTypes.INT,
+                description=f"Maximum number of suggestions (1-{MAX_SUGGESTIONS})",
+            ),
+        ],
+        responses=serializers.IngredientSuggestionSerializer(many=True),
+    )
+    @action(detail=False, methods=["get"], pagination_class=None)
+    def autocomplete(self, request):
+        """Suggest ingredients by name, most used first"""
+        limit = _limit_param(request, DEFAULT_SUGGESTIONS, MAX_SUGGESTIONS)
+        suggestions = ingredient_index.search(
+            request.query_params.get("q", ""), limit=limit
+        )
+        return Response(
+            serializers.IngredientSuggestionSerializer(suggestions, many=True).data
+        )